@@ -0,0 +1,209 @@
+"""
+Streaming full-account export.
+
+iter_export() yields one JSON-serialisable dict per row (chats, journals,
+habits, emotion records, milestones) after a single header line. Each table
+is read with ``yield_per`` so only one batch of ciphertext is in memory, and
+rows are decrypted a batch at a time; memory stays flat however large the
+account is. Archived chats (one month in memory at a time) are merged with
+the hot rows in time order. The NDJSON produced here is the format
+account_import reads.
+"""
+
+import heapq
+import json
+from datetime import datetime
+from typing import Callable, Iterator, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+import encryption_utils
+
+from . import chat_archive, crud, habit_log, models
+
+EXPORT_FORMAT = "mymitra-ndjson"
+EXPORT_VERSION = 1
+EXPORT_BATCH_SIZE = 500
+
+DECRYPTION_FAILED = "[decryption_failed]"
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def _decrypt(blob) -> Optional[str]:
+    if blob is None:
+        return None
+    try:
+        return encryption_utils.decrypt_field(blob)
+    except Exception:
+        return DECRYPTION_FAILED
+
+
+def _decrypt_batch(blobs: List) -> List[Optional[str]]:
+    return encryption_utils.decrypt_many(blobs, default=DECRYPTION_FAILED)
+
+
+def _maybe_decrypt(text: Optional[str]) -> Optional[str]:
+    """emotion_records.source_text is ciphertext for chat turns and plain text elsewhere."""
+    if not text:
+        return text
+    value = _decrypt(text)
+    return text if value == DECRYPTION_FAILED else value
+
+
+def _stream(db: Session, stmt, batch_size: int, to_records: Callable[[list], list]) -> Iterator[dict]:
+    result = db.execute(stmt.execution_options(yield_per=batch_size))
+    for batch in result.partitions():
+        yield from to_records(batch)
+
+
+def _chat_records(rows) -> list:
+    messages = _decrypt_batch([row.message_encrypted for row in rows])
+    responses = _decrypt_batch([row.response_encrypted for row in rows])
+    return [
+        {
+            "type": "chat_message",
+            "created_at": _iso(row.created_at),
+            "session_id": row.session_id,
+            "personality": row.personality_used,
+            "user_message": message,
+            "ai_response": response,
+            "_order": (_iso(row.created_at.replace(tzinfo=None) if row.created_at else None) or "", row.id),
+        }
+        for row, message, response in zip(rows, messages, responses)
+    ]
+
+
+def _archived_chat_records(db: Session, user_id: int) -> Iterator[dict]:
+    for record in chat_archive.iter_records(db, user_id):
+        yield {
+            "type": "chat_message",
+            "created_at": record.get("created_at"),
+            "session_id": record.get("session_id"),
+            "personality": record.get("personality"),
+            "user_message": chat_archive.text_of(record, "message"),
+            "ai_response": chat_archive.text_of(record, "response"),
+            "_order": (record.get("created_at") or "", record["id"]),
+        }
+
+
+def _merged_chat_records(db: Session, user_id: int, batch_size: int) -> Iterator[dict]:
+    """Archived and hot chats in (created_at, id) order."""
+    chat = models.ChatMessage
+    hot = _stream(db, select(
+        chat.id, chat.created_at, chat.session_id, chat.personality_used, chat.message_encrypted, chat.response_encrypted,
+    ).where(chat.user_id == user_id).order_by(chat.created_at, chat.id), batch_size, _chat_records)
+    for record in heapq.merge(_archived_chat_records(db, user_id), hot, key=lambda r: r["_order"]):
+        del record["_order"]
+        yield record
+
+
+def _journal_records(rows) -> list:
+    contents = _decrypt_batch([row.content_encrypted for row in rows])
+    return [
+        {
+            "type": "journal",
+            "created_at": _iso(row.created_at),
+            "content": content,
+            "mood": row.mood,
+            "tags": row.tags,
+        }
+        for row, content in zip(rows, contents)
+    ]
+
+
+def _emotion_records(rows) -> list:
+    return [
+        {
+            "type": "emotion_record",
+            "timestamp": _iso(row.timestamp),
+            "emotion": row.primary_emotion,
+            "intensity": row.primary_intensity,
+            "confidence": row.confidence,
+            "polarity": row.sentiment_polarity,
+            "subjectivity": row.sentiment_subjectivity,
+            "detection_method": row.detection_method,
+            "source_type": row.source_type,
+            "source_text": _maybe_decrypt(row.source_text),
+        }
+        for row in rows
+    ]
+
+
+def _milestone_records(rows) -> list:
+    return [
+        {
+            "type": "growth_milestone",
+            "created_at": _iso(row.created_at),
+            "milestone_type": row.milestone_type,
+            "recognition": row.recognition,
+            "source_snippet": row.source_snippet,
+            "weight": row.weight,
+        }
+        for row in rows
+    ]
+
+
+def iter_export(db: Session, user_id: int, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[dict]:
+    """Yield the header and then every exportable row for ``user_id``."""
+    yield {
+        "type": "export",
+        "format": EXPORT_FORMAT,
+        "version": EXPORT_VERSION,
+        "exported_at": datetime.utcnow().isoformat(),
+    }
+
+    yield from _merged_chat_records(db, user_id, batch_size)
+
+    journal = models.Journal
+    yield from _stream(db, select(
+        journal.created_at, journal.content_encrypted, journal.mood, journal.tags,
+    ).where(journal.user_id == user_id).order_by(journal.created_at, journal.id), batch_size, _journal_records)
+
+    # Habits are few per user; their completion bitmaps come from one query.
+    completions = crud.get_habit_completions(db, user_id, from_year=1)
+    habit = models.Habit
+    habits = db.execute(
+        select(habit).where(habit.user_id == user_id).order_by(habit.id)
+    ).scalars().all()
+    titles = _decrypt_batch([h.title_encrypted for h in habits])
+    descriptions = _decrypt_batch([h.description_encrypted for h in habits])
+    for h, title, description in zip(habits, titles, descriptions):
+        yield {
+            "type": "habit",
+            "created_at": _iso(h.created_at),
+            "title": title,
+            "description": description,
+            "frequency": h.frequency,
+            "streak_count": h.streak_count,
+            "last_completed": _iso(h.last_completed),
+            "is_active": h.is_active,
+            "archived": h.archived,
+            "completed_days": {
+                str(year): habit_log.year_days(bitmap)
+                for year, bitmap in sorted(completions.get(h.id, {}).items())
+            },
+        }
+
+    emotion = models.EmotionRecord
+    yield from _stream(db, select(emotion).where(emotion.user_id == user_id).order_by(emotion.timestamp, emotion.id),
+                       batch_size, lambda batch: _emotion_records([row[0] for row in batch]))
+
+    milestone = models.GrowthMilestone
+    yield from _stream(db, select(
+        milestone.created_at, milestone.milestone_type, milestone.recognition, milestone.source_snippet, milestone.weight,
+    ).where(milestone.user_id == user_id).order_by(milestone.created_at, milestone.id), batch_size, _milestone_records)
+
+
+def iter_ndjson(session_factory, user_id: int, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[str]:
+    """NDJSON lines for a StreamingResponse. Owns its own session so the export
+    outlives the request's dependency scope."""
+    db = session_factory()
+    try:
+        for record in iter_export(db, user_id, batch_size):
+            yield json.dumps(record, ensure_ascii=False) + "\n"
+    finally:
+        db.close()
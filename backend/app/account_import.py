@@ -0,0 +1,355 @@
+"""
+Bulk account import.
+
+Reads NDJSON incrementally (the format account_export writes; a bare stream
+of ``{"type": "journal", "content": ...}`` lines from another app works too)
+and writes it in batches: one encryption pass, one executemany INSERT and one
+commit per IMPORT_BATCH_SIZE records of a type. Journal embeddings for
+LongTermMemory are queued and added EMBED_BATCH_SIZE at a time. Derived
+tables (chat_sessions, user_stats, emotion rollups, search postings) are
+rebuilt for the user once at the end instead of being bumped per row.
+
+iter_import() yields a progress dict after every flush so callers can stream
+it back to the client.
+
+Usage:
+    python -m app.account_import --user ID export.ndjson
+"""
+
+import argparse
+import json
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.orm import Session
+
+import encryption_utils
+
+from . import crud, emotion_rollups, habit_log, models, search_index
+from .account_export import DECRYPTION_FAILED
+
+IMPORT_BATCH_SIZE = 500
+EMBED_BATCH_SIZE = 256
+MAX_REPORTED_ERRORS = 20
+
+RECORD_TYPES = ("chat_message", "journal", "habit", "emotion_record", "growth_milestone")
+
+
+def _ts(value) -> datetime:
+    if not value:
+        return datetime.utcnow()
+    return datetime.fromisoformat(str(value).replace("Z", "+00:00")).replace(tzinfo=None)
+
+
+def _encrypt_batch(values: List[Optional[str]]) -> List[Optional[bytes]]:
+    return encryption_utils.encrypt_many(values)
+
+
+def iter_records(lines: Iterable) -> Iterator[dict]:
+    """Parse NDJSON lines lazily. Malformed lines are yielded as ``{"type": "_error"}``."""
+    for number, line in enumerate(lines, start=1):
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError("not a JSON object")
+        except ValueError as e:
+            yield {"type": "_error", "line": number, "error": str(e)}
+            continue
+        record.setdefault("_line", number)
+        yield record
+
+
+class AccountImporter:
+    """Buffers parsed records per type and flushes them in batches."""
+
+    def __init__(self, db: Session, user_id: int, memory=None, batch_size: int = IMPORT_BATCH_SIZE):
+        self.db = db
+        self.user_id = user_id
+        self.memory = memory if memory is not None and self._journals_feed_memory() else None
+        self.batch_size = batch_size
+        self.buffers: Dict[str, List[dict]] = {kind: [] for kind in RECORD_TYPES}
+        self.embed_queue: List[str] = []
+        self.counts: Dict[str, int] = {kind: 0 for kind in RECORD_TYPES}
+        self.processed = 0
+        self.skipped = 0
+        self.errors: List[dict] = []
+
+    def _journals_feed_memory(self) -> bool:
+        """Same consent gate as POST /journals."""
+        settings_obj = crud.get_user_settings(self.db, self.user_id)
+        return bool(getattr(settings_obj, "enable_long_term_memory", True)
+                    and getattr(settings_obj, "allow_mental_health_inference", False))
+
+    def progress(self, done: bool = False) -> dict:
+        return {
+            "processed": self.processed,
+            "imported": dict(self.counts),
+            "skipped": self.skipped,
+            "errors": self.errors[:MAX_REPORTED_ERRORS],
+            "done": done,
+        }
+
+    def _skip(self, record: dict, error: str) -> None:
+        self.skipped += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": record.get("line", record.get("_line")), "error": error})
+
+    def add(self, record: dict) -> bool:
+        """Buffer one record. Returns True when a flush happened."""
+        kind = record.get("type")
+        if kind == "_error":
+            self._skip(record, record["error"])
+            return False
+        if kind == "export":
+            return False
+        self.processed += 1
+        if kind not in self.buffers:
+            self._skip(record, f"unknown record type {kind!r}")
+            return False
+        if DECRYPTION_FAILED in (record.get("user_message"), record.get("content"), record.get("title")):
+            self._skip(record, "entry was not decryptable in the source export")
+            return False
+        self.buffers[kind].append(record)
+        if len(self.buffers[kind]) >= self.batch_size:
+            self.flush(kind)
+            return True
+        return False
+
+    def flush(self, kind: str) -> None:
+        batch, self.buffers[kind] = self.buffers[kind], []
+        if not batch:
+            return
+        queued = len(self.embed_queue)
+        try:
+            inserted = getattr(self, f"_insert_{kind}")(batch)
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            del self.embed_queue[queued:]
+            for record in batch:
+                self._skip(record, f"batch failed: {e}")
+            return
+        self.counts[kind] += inserted
+        if len(self.embed_queue) >= EMBED_BATCH_SIZE:
+            self.flush_embeddings()
+
+    def flush_embeddings(self) -> None:
+        if not self.memory:
+            self.embed_queue = []
+            return
+        while self.embed_queue:
+            chunk, self.embed_queue = self.embed_queue[:EMBED_BATCH_SIZE], self.embed_queue[EMBED_BATCH_SIZE:]
+            try:
+                self.memory.store_memories_with_category(
+                    self.user_id, chunk, memory_type="journal_entry", memory_category="mental_health",
+                )
+            except Exception as e:
+                if len(self.errors) < MAX_REPORTED_ERRORS:
+                    self.errors.append({"line": None, "error": f"embedding batch failed: {e}"})
+
+    # -- per-type batch inserts (executemany) ---------------------------------
+
+    def _insert_chat_message(self, batch: List[dict]) -> int:
+        messages = _encrypt_batch([r.get("user_message") or "" for r in batch])
+        responses = _encrypt_batch([r.get("ai_response") or "" for r in batch])
+        self.db.execute(models.ChatMessage.__table__.insert(), [
+            {
+                "user_id": self.user_id,
+                "message_encrypted": message,
+                "response_encrypted": response,
+                "personality_used": r.get("personality") or "default",
+                "session_id": r.get("session_id"),
+                "created_at": _ts(r.get("created_at") or r.get("timestamp")),
+            }
+            for r, message, response in zip(batch, messages, responses)
+        ])
+        return len(batch)
+
+    def _insert_journal(self, batch: List[dict]) -> int:
+        batch = [r for r in batch if r.get("content")]
+        if not batch:
+            return 0
+        contents = _encrypt_batch([r["content"] for r in batch])
+        self.db.execute(models.Journal.__table__.insert(), [
+            {
+                "user_id": self.user_id,
+                "content_encrypted": content,
+                "mood": r.get("mood"),
+                "tags": r.get("tags"),
+                "created_at": _ts(r.get("created_at")),
+            }
+            for r, content in zip(batch, contents)
+        ])
+        for r in batch:
+            content = r["content"].strip()
+            if len(content) > 700:
+                content = content[:700] + "..."
+            self.embed_queue.append(f"[mental_health] New journal entry: {content}")
+        return len(batch)
+
+    def _insert_habit(self, batch: List[dict]) -> int:
+        batch = [r for r in batch if r.get("title")]
+        if not batch:
+            return 0
+        titles = _encrypt_batch([r["title"] for r in batch])
+        descriptions = _encrypt_batch([r.get("description") for r in batch])
+        habits = [
+            models.Habit(
+                user_id=self.user_id,
+                title_encrypted=title,
+                description_encrypted=description,
+                frequency=r.get("frequency"),
+                streak_count=r.get("streak_count") or 0,
+                last_completed=_ts(r["last_completed"]) if r.get("last_completed") else None,
+                is_active=r.get("is_active", True),
+                archived=r.get("archived", False),
+                created_at=_ts(r.get("created_at")),
+            )
+            for r, title, description in zip(batch, titles, descriptions)
+        ]
+        self.db.add_all(habits)
+        self.db.flush()  # assigns ids for the completion bitmaps
+        bitmaps = []
+        for habit, r in zip(habits, batch):
+            for year, days in (r.get("completed_days") or {}).items():
+                bits = 0
+                for day in days:
+                    bits |= 1 << (int(day) - 1)
+                bitmaps.append({
+                    "habit_id": habit.id,
+                    "user_id": self.user_id,
+                    "year": int(year),
+                    "days": bits.to_bytes(habit_log.YEAR_BYTES, "little"),
+                })
+        if bitmaps:
+            self.db.execute(models.HabitCompletionYear.__table__.insert(), bitmaps)
+        return len(batch)
+
+    def _insert_emotion_record(self, batch: List[dict]) -> int:
+        batch = [r for r in batch if r.get("emotion")]
+        if not batch:
+            return 0
+        # Stored as encrypt_data text, like the /chat route writes it
+        sources = [encryption_utils.encrypt_data(r["source_text"]) if r.get("source_text") else None for r in batch]
+        self.db.execute(models.EmotionRecord.__table__.insert(), [
+            {
+                "user_id": self.user_id,
+                "timestamp": _ts(r.get("timestamp")),
+                "primary_emotion": r["emotion"],
+                "primary_intensity": r.get("intensity") or "medium",
+                "confidence": r.get("confidence") if r.get("confidence") is not None else 1.0,
+                "sentiment_polarity": r.get("polarity"),
+                "sentiment_subjectivity": r.get("subjectivity"),
+                "detection_method": r.get("detection_method") or "import",
+                "source_type": r.get("source_type") or "import",
+                "source_text": source,
+            }
+            for r, source in zip(batch, sources)
+        ])
+        return len(batch)
+
+    def _insert_growth_milestone(self, batch: List[dict]) -> int:
+        self.db.execute(models.GrowthMilestone.__table__.insert(), [
+            {
+                "user_id": self.user_id,
+                "milestone_type": r.get("milestone_type") or "growth",
+                "recognition": r.get("recognition"),
+                "source_snippet": (r.get("source_snippet") or "")[:200],
+                "weight": r.get("weight") or 2,
+                "created_at": _ts(r.get("created_at")),
+            }
+            for r in batch
+        ])
+        return len(batch)
+
+    # -- finalisation -----------------------------------------------------------
+
+    def finish(self) -> None:
+        """Flush what is left and rebuild the user's derived tables once."""
+        for kind in RECORD_TYPES:
+            self.flush(kind)
+        self.flush_embeddings()
+        if not any(self.counts.values()):
+            return
+        self._rebuild_chat_sessions()
+        emotion_rollups.rebuild(self.db, self.user_id)
+        self._rebuild_user_stats()
+        search_index.index_missing(self.db, self.user_id)
+        self.db.commit()
+
+    def _rebuild_chat_sessions(self) -> None:
+        self.db.execute(delete(models.ChatSession).where(models.ChatSession.user_id == self.user_id))
+        crud.backfill_chat_sessions(self.db, self.user_id)
+
+    def _rebuild_user_stats(self) -> None:
+        chat = models.ChatMessage
+        total, first, last = self.db.execute(
+            select(func.count(chat.id), func.min(chat.created_at), func.max(chat.created_at))
+            .where(chat.user_id == self.user_id)
+        ).one()
+
+        def _count(model):
+            return select(func.count(model.id)).where(model.user_id == self.user_id).scalar_subquery()
+
+        self.db.execute(crud.user_stats_upsert(self.user_id))
+        self.db.execute(update(models.UserStats).where(models.UserStats.user_id == self.user_id).values(
+            total_messages=total,
+            first_chat_at=first,
+            last_chat_at=last,
+            journal_count=_count(models.Journal),
+            habit_count=_count(models.Habit),
+            milestone_count=_count(models.GrowthMilestone),
+        ))
+
+
+def iter_import(db: Session, user_id: int, lines: Iterable, memory=None,
+                batch_size: int = IMPORT_BATCH_SIZE) -> Iterator[dict]:
+    """Import NDJSON ``lines`` for ``user_id``, yielding progress after each batch
+    and a final summary with ``done: True``."""
+    importer = AccountImporter(db, user_id, memory=memory, batch_size=batch_size)
+    for record in iter_records(lines):
+        if importer.add(record):
+            yield importer.progress()
+    importer.finish()
+    yield importer.progress(done=True)
+
+
+def iter_import_ndjson(session_factory, user_id: int, lines: Iterable, memory=None) -> Iterator[str]:
+    """Progress as NDJSON lines for a StreamingResponse (owns its own session)."""
+    db = session_factory()
+    try:
+        for progress in iter_import(db, user_id, lines, memory=memory):
+            yield json.dumps(progress) + "\n"
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    from .config import settings
+    from .database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Import an NDJSON account export")
+    parser.add_argument("path", help="NDJSON file (one record per line)")
+    parser.add_argument("--user", type=int, required=True, help="user id to import into")
+    parser.add_argument("--no-embeddings", action="store_true", help="skip LongTermMemory embeddings")
+    args = parser.parse_args()
+
+    memory = None
+    if settings.ENABLE_LONG_TERM_MEMORY and not args.no_embeddings:
+        try:
+            import sys, os
+            sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+            from vector_memory import LongTermMemory
+            memory = LongTermMemory()
+        except Exception as e:
+            print(f"Long-term memory unavailable, importing without embeddings: {e}")
+
+    with open(args.path, "rb") as fh:
+        for line in iter_import_ndjson(SessionLocal, args.user, fh, memory=memory):
+            print(line, end="", flush=True)
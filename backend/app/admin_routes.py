@@ -3,17 +3,24 @@ Admin Dashboard Routes for My Mitra: Builder's Redemption
 Provides secure admin interface for user management and encrypted message control.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import literal
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from pydantic import BaseModel
 from datetime import datetime
+import asyncio
 import logging
 
-from . import models, schemas, crud, security
-from .database import get_db
-from encryption_utils import decrypt_data
+from . import models, schemas, crud, security, pagination, shards
+from .response_cache import response_cache
+from .semantic_cache import semantic_cache
+from .write_queue import write_queue
+from .connection_hold import stream_hold
+from .config import settings
+from .database import SessionLocal, get_db
+from encryption_utils import decrypt_field
 
 logger = logging.getLogger(__name__)
 
@@ -58,29 +65,77 @@ class AdminChatMessageResponse(BaseModel):
     session_id: Optional[str]
     created_at: datetime
 
+# Dashboard stats snapshot
+
+_stats_snapshot: dict = {"stats": None, "generated_at": None}
+
+
+def refresh_stats_snapshot() -> dict:
+    """Recompute dashboard totals into the in-process snapshot."""
+    db = SessionLocal()
+    try:
+        _stats_snapshot["stats"] = crud.get_admin_totals(db)
+        _stats_snapshot["generated_at"] = datetime.utcnow()
+    finally:
+        db.close()
+    return _stats_snapshot
+
+
+async def stats_snapshot_worker():
+    """Refresh the snapshot every ADMIN_STATS_REFRESH_SECONDS (started with the app)."""
+    while True:
+        try:
+            await asyncio.to_thread(refresh_stats_snapshot)
+        except Exception as e:
+            logger.warning(f"Admin stats refresh failed: {e}")
+        await asyncio.sleep(settings.ADMIN_STATS_REFRESH_SECONDS)
+
+
+def _current_stats_snapshot() -> dict:
+    """Snapshot, refreshed inline only if the worker has not produced a fresh one."""
+    generated_at = _stats_snapshot["generated_at"]
+    max_age = 2 * settings.ADMIN_STATS_REFRESH_SECONDS
+    if generated_at is None or (datetime.utcnow() - generated_at).total_seconds() > max_age:
+        refresh_stats_snapshot()
+    return _stats_snapshot
+
 # Admin Routes
 
 @router.get("/dashboard/stats")
 async def get_dashboard_stats(
     current_admin: models.User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
 ):
-    """Get overall dashboard statistics"""
-    total_users = db.query(models.User).count()
-    active_users = db.query(models.User).filter(models.User.is_active == True).count()
-    total_messages = db.query(models.ChatMessage).count()
-    total_habits = db.query(models.Habit).count()
-    total_journals = db.query(models.Journal).count()
+    """Get overall dashboard statistics (from the periodically refreshed snapshot)"""
+    snapshot = await asyncio.to_thread(_current_stats_snapshot)
     
     return {
-        "total_users": total_users,
-        "active_users": active_users,
-        "total_messages": total_messages,
-        "total_habits": total_habits,
-        "total_journals": total_journals,
+        **snapshot["stats"],
+        "generated_at": snapshot["generated_at"].isoformat(),
         "admin_user": current_admin.username
     }
 
+@router.get("/cache/stats")
+async def get_response_cache_stats(
+    current_admin: models.User = Depends(get_current_admin_user),
+):
+    """Response cache counters (LRU hits/misses/evictions, DB fallbacks, write-behind,
+    semantic tier hit rate and best-similarity histogram)"""
+    return {**response_cache.stats(), "semantic": semantic_cache.stats()}
+
+@router.get("/write-queue/stats")
+async def get_write_queue_stats(
+    current_admin: models.User = Depends(get_current_admin_user),
+):
+    """Group-commit writer counters (batches, ops per batch, failures, queue depth)"""
+    return write_queue.stats()
+
+@router.get("/stream/stats")
+async def get_stream_stats(
+    current_admin: models.User = Depends(get_current_admin_user),
+):
+    """Per-request database hold time of /chat/stream (mean, p50, p95, max)"""
+    return stream_hold.stats()
+
 @router.get("/users", response_model=List[AdminUserResponse])
 async def list_users(
     skip: int = 0,
@@ -88,18 +143,24 @@ async def list_users(
     current_admin: models.User = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
-    """List all users with their activity stats"""
-    users = db.query(models.User).offset(skip).limit(limit).all()
+    """List all users with their activity stats (one query per page)"""
+    if shards.enabled():
+        # user_stats lives in the shards: page the catalog, then one query per shard.
+        users = db.query(models.User).order_by(models.User.id).offset(skip).limit(limit).all()
+        activity = crud.get_user_activity(db, [user.id for user in users])
+        rows = [(user, *activity.get(user.id, (0, None))) for user in users]
+    else:
+        rows = (
+            db.query(models.User, models.UserStats.total_messages, models.UserStats.last_chat_at)
+            .outerjoin(models.UserStats, models.UserStats.user_id == models.User.id)
+            .order_by(models.User.id)
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
     
-    user_responses = []
-    for user in users:
-        # Get message count and last activity
-        message_count = db.query(models.ChatMessage).filter(models.ChatMessage.user_id == user.id).count()
-        last_message = db.query(models.ChatMessage).filter(
-            models.ChatMessage.user_id == user.id
-        ).order_by(models.ChatMessage.created_at.desc()).first()
-        
-        user_responses.append(AdminUserResponse(
+    return [
+        AdminUserResponse(
             id=user.id,
             username=user.username,
             email=user.email,
@@ -107,41 +168,63 @@ async def list_users(
             is_active=user.is_active,
             preferred_personality=user.preferred_personality,
             created_at=user.created_at,
-            total_messages=message_count,
-            last_activity=last_message.created_at if last_message else None
-        ))
-    
-    return user_responses
+            total_messages=total_messages or 0,
+            last_activity=last_activity
+        )
+        for user, total_messages, last_activity in rows
+    ]
 
 @router.get("/messages")
 async def list_messages(
+    response: Response,
     user_id: Optional[int] = None,
     skip: int = 0,
     limit: int = 20,
+    cursor: Optional[str] = None,
     current_admin: models.User = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
-    """List encrypted messages with preview (admin can see first 100 chars)"""
-    query = db.query(models.ChatMessage).join(models.User)
+    """List encrypted messages with preview (admin can see first 100 chars).
+    Newest first; follow the X-Next-Cursor header for further pages."""
+    if shards.enabled():
+        # Messages live in the user's shard; no cross-shard listing or join.
+        if not user_id:
+            raise HTTPException(status_code=400, detail="user_id is required when sharding is enabled")
+        shards.scope(db, user_id)
+        username = db.query(models.User.username).filter(models.User.id == user_id).scalar()
+        query = db.query(models.ChatMessage, literal(username))
+    else:
+        query = db.query(models.ChatMessage, models.User.username).join(models.User)
     
     if user_id:
         query = query.filter(models.ChatMessage.user_id == user_id)
     
-    messages = query.order_by(models.ChatMessage.created_at.desc()).offset(skip).limit(limit).all()
+    limit = pagination.clamp_limit(limit)
+    if skip and not cursor:
+        # Legacy offset paging (cost grows with skip)
+        query = query.order_by(models.ChatMessage.created_at.desc(), models.ChatMessage.id.desc()).offset(skip).limit(limit)
+    else:
+        try:
+            query = pagination.apply_keyset(query, models.ChatMessage.created_at, models.ChatMessage.id, cursor, limit)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    rows = query.all()
+
+    next_cursor = pagination.next_cursor([msg for msg, _ in rows], limit, "created_at")
+    if next_cursor:
+        response.headers[pagination.NEXT_CURSOR_HEADER] = next_cursor
     
     message_responses = []
-    for msg in messages:
+    for msg, username in rows:
         try:
             # Decrypt message for preview (admin privilege)
-            decrypted_message = decrypt_data(msg.message_encrypted.decode())
+            decrypted_message = decrypt_field(msg.message_encrypted)
             preview = decrypted_message[:100] + "..." if len(decrypted_message) > 100 else decrypted_message
             
-            user = db.query(models.User).filter(models.User.id == msg.user_id).first()
-            
             message_responses.append(AdminChatMessageResponse(
                 id=msg.id,
                 user_id=msg.user_id,
-                username=user.username if user else "Unknown",
+                username=username or "Unknown",
                 message_preview=preview,
                 personality_used=msg.personality_used,
                 session_id=msg.session_id,
@@ -152,7 +235,7 @@ async def list_messages(
             message_responses.append(AdminChatMessageResponse(
                 id=msg.id,
                 user_id=msg.user_id,
-                username="Unknown",
+                username=username or "Unknown",
                 message_preview="[Decryption Failed]",
                 personality_used=msg.personality_used,
                 session_id=msg.session_id,
@@ -184,17 +267,19 @@ async def toggle_user_active(
 @router.delete("/messages/{message_id}")
 async def delete_message(
     message_id: int,
+    user_id: Optional[int] = None,
     current_admin: models.User = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
-    """Delete a specific message (admin privilege)"""
-    message = db.query(models.ChatMessage).filter(models.ChatMessage.id == message_id).first()
-    if not message:
+    """Delete a specific message (admin privilege). With sharding enabled,
+    message ids are per shard and ``user_id`` says whose message it is."""
+    if shards.enabled():
+        if not user_id:
+            raise HTTPException(status_code=400, detail="user_id is required when sharding is enabled")
+        shards.scope(db, user_id)
+    if not crud.delete_chat_message(db, message_id):
         raise HTTPException(status_code=404, detail="Message not found")
     
-    db.delete(message)
-    db.commit()
-    
     return {"message": f"Message {message_id} deleted successfully"}
 
 @router.post("/create-admin")
@@ -0,0 +1,187 @@
+"""
+Async versions of the crud helpers on the chat hot path.
+
+Each function mirrors its namesake in crud.py (same arguments and return
+shapes) but takes an AsyncSession, so streaming routes can await the
+database instead of stalling every other SSE stream on the worker.
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+import encryption_utils
+
+from . import chat_archive, models, pagination, read_models, search_index
+from .crud import chat_session_upsert, user_stats_dict, user_stats_upsert
+
+
+async def get_recent_chat_history(db: AsyncSession, user_id: int, limit: int = 10, session_id: Optional[str] = None) -> List[dict]:
+    """Get recent chat history for context. If session_id provided, filter to that session."""
+    page = await get_chat_history_page(db, user_id, limit=limit, session_id=session_id)
+    return page["messages"]
+
+
+async def get_chat_history_page(
+    db: AsyncSession,
+    user_id: int,
+    limit: int = 10,
+    session_id: Optional[str] = None,
+    cursor: Optional[str] = None,
+    include_archive: bool = False,
+) -> dict:
+    """One page of chat history, chronological within the page.
+
+    ``next_cursor`` points at the oldest message returned; pass it back to
+    fetch the page of older messages. With ``include_archive`` a page that
+    runs out of hot rows continues into the chat_archive tier. Raises
+    ValueError on a bad cursor.
+    """
+    stmt = pagination.apply_keyset(
+        read_models.chat_history_stmt(user_id, session_id),
+        models.ChatMessage.created_at, models.ChatMessage.id, cursor, limit,
+    )
+    messages = (await db.execute(stmt)).all()
+
+    archived = []
+    if include_archive and len(messages) < limit:
+        if messages:
+            before = (messages[-1].created_at, messages[-1].id)
+        else:
+            before = pagination.decode_cursor(cursor) if cursor else None
+        for archive_id in (await db.execute(chat_archive.months_before_stmt(user_id, before))).scalars().all():
+            payload = (await db.execute(chat_archive.payload_stmt(archive_id))).scalar()
+            archived.extend(chat_archive.records_before(payload, before, session_id))
+            if len(messages) + len(archived) >= limit:
+                break
+        archived = archived[:limit - len(messages)]
+
+    result = []
+    for record in reversed(archived):  # Oldest first, and all older than the hot rows
+        ts = record.get("created_at")
+        sid = record.get("session_id")
+        result.extend([
+            {"role": "user", "content": chat_archive.text_of(record, "message"), "timestamp": ts, "session_id": sid},
+            {"role": "assistant", "content": chat_archive.text_of(record, "response"), "timestamp": ts, "session_id": sid}
+        ])
+    result.extend(read_models.chat_turns(messages))
+
+    if archived:
+        oldest = archived[-1]
+        next_cursor = (
+            pagination.encode_cursor(oldest.get("created_at"), oldest["id"])
+            if len(messages) + len(archived) >= limit else None
+        )
+    else:
+        next_cursor = pagination.next_cursor(messages, limit, "created_at")
+    return {"messages": result, "next_cursor": next_cursor}
+
+
+async def create_chat_message(
+    db: AsyncSession,
+    user_id: int,
+    message: str,
+    response: str,
+    personality_used: str,
+    session_id: Optional[str] = None
+):
+    """Store an encrypted chat message and response."""
+    db_message = models.ChatMessage(
+        user_id=user_id,
+        message_encrypted=encryption_utils.encrypt_field(message),
+        response_encrypted=encryption_utils.encrypt_field(response),
+        personality_used=personality_used,
+        session_id=session_id
+    )
+    db.add(db_message)
+    await db.flush()
+    postings = search_index.posting_rows(user_id, search_index.CHAT, db_message.id, search_index.chat_text(message, response))
+    if postings:
+        await db.execute(models.SearchPosting.__table__.insert(), postings)
+    if session_id:
+        await db.execute(chat_session_upsert(user_id, session_id, personality_used))
+    await db.execute(user_stats_upsert(user_id, messages=1))
+    await db.commit()
+    await db.refresh(db_message)
+    return db_message
+
+
+async def get_cached_response(
+    db: AsyncSession,
+    question_key: str,
+    personality: str,
+    ttl_minutes: int = 10080,
+) -> Optional[str]:
+    """Return decrypted cached response if fresh, otherwise None (decrypted off the event loop)."""
+    try:
+        cache = models.ResponseCache
+        stmt = select(cache.created_at, cache.response_encrypted).where(
+            cache.question_key == question_key, cache.personality == personality
+        )
+        entry = (await db.execute(stmt)).first()
+        if not entry:
+            return None
+        created = entry.created_at or datetime.utcnow()
+        try:
+            if created < datetime.utcnow() - timedelta(minutes=ttl_minutes):
+                return None
+        except Exception:
+            pass  # created may be timezone-aware; treat as fresh, as crud does
+        return await asyncio.to_thread(encryption_utils.decrypt_field, entry.response_encrypted)
+    except Exception:
+        return None
+
+
+async def get_preferred_personality(db: AsyncSession, user_id: int) -> Optional[str]:
+    """The user's saved personality preference, if any."""
+    stmt = select(models.User.preferred_personality).where(models.User.id == user_id)
+    return (await db.execute(stmt)).scalar_one_or_none()
+
+
+async def get_user_settings(db: AsyncSession, user_id: int) -> models.UserSettings:
+    """Get or create per-user settings (adaptive memory opt-ins, retention)."""
+    stmt = select(models.UserSettings).where(models.UserSettings.user_id == user_id)
+    settings_obj = (await db.execute(stmt)).scalars().first()
+    if settings_obj:
+        return settings_obj
+    settings_obj = models.UserSettings(user_id=user_id)
+    db.add(settings_obj)
+    await db.commit()
+    await db.refresh(settings_obj)
+    return settings_obj
+
+
+async def get_recent_emotions(db: AsyncSession, user_id: int, limit: int = 30) -> List[dict]:
+    """Return recent emotion records as dicts for the growth engine."""
+    try:
+        rows = (await db.execute(read_models.recent_emotions_stmt(user_id, limit))).all()
+        return read_models.emotion_dicts(rows)
+    except Exception:
+        return []
+
+
+async def get_user_chat_stats(db: AsyncSession, user_id: int) -> dict:
+    """Return total message count and first chat date for a user."""
+    try:
+        stats = await get_user_stats(db, user_id)
+        return {"total_messages": stats["total_messages"], "first_chat_at": stats["first_chat_at"]}
+    except Exception:
+        return {"total_messages": 0, "first_chat_at": None}
+
+
+async def get_user_stats(db: AsyncSession, user_id: int) -> dict:
+    """Counters for a user from user_stats (a single primary-key read)."""
+    stmt = select(models.UserStats.__table__).where(models.UserStats.user_id == user_id)
+    return user_stats_dict((await db.execute(stmt)).mappings().first())
+
+
+async def get_user_milestones(db: AsyncSession, user_id: int) -> List[dict]:
+    """Return all growth milestones for a user."""
+    try:
+        return read_models.milestone_dicts((await db.execute(read_models.milestones_stmt(user_id))).all())
+    except Exception:
+        return []
@@ -0,0 +1,424 @@
+"""
+Cold archive tier for chat messages.
+
+Messages older than CHAT_ARCHIVE_AFTER_DAYS are moved out of the hot
+``chat_messages`` table into ``chat_archive``: one row per user and month
+whose payload is a sequence of frames, each a 4-byte big-endian length and
+a batch of the month's messages as JSON, zlib-compressed and AES-encrypted
+as one blob (months archived before framing are a single bare blob). The
+hot table (and its indexes) then only holds recent conversation, so it
+stays small enough to live in cache.
+
+Archiving runs at the start of the retention pass, before the purge, in
+RETENTION_BATCH_SIZE chunks, each one commit, with the usual pause between
+chunks. A chunk is appended to its month as a new frame, so the month's
+earlier frames are never decrypted or re-encrypted.
+
+CHAT_ARCHIVE_AFTER_DAYS defaults to the retention window. Users whose
+retention is not longer than it are skipped, since their messages are
+purged before they would be archived. Only users who keep history longer
+than the default window are archived, so readers of the hot table alone
+(pipeline context, topics, admin listings) still see at least that window.
+Counters and sessions are unaffected (an archived message still exists):
+chat_sessions and user_stats keep counting it. Archived messages stay
+searchable; their postings are re-tagged as doc_type "archive" (see
+search_index).
+
+Readers stitch the tiers back together: account export merges both in
+time order, and chat history pages continue into the archive once the hot
+rows before the cursor run out. Deletes and retention purges decrypt and
+rewrite (as one frame) only the months that can hold affected messages.
+"""
+
+import base64
+import json
+import logging
+import time
+import zlib
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session
+
+import encryption_utils
+
+from . import models, search_index, shards
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+DECRYPTION_FAILED = "[decryption_failed]"
+
+Position = Tuple[Optional[datetime], int]  # (created_at, id), as in pagination cursors
+
+
+def _naive(ts: Optional[datetime]) -> Optional[datetime]:
+    return ts.replace(tzinfo=None) if ts is not None else None
+
+
+def _record(row: models.ChatMessage) -> dict:
+    """Archive record for a hot row. Text that fails to decrypt keeps its
+    ciphertext (``<field>_blob``, base64 of the stored bytes)."""
+    record = {
+        "id": row.id,
+        "session_id": row.session_id,
+        "personality": row.personality_used,
+        "created_at": _naive(row.created_at).isoformat() if row.created_at else None,
+    }
+    for field, blob in (("message", row.message_encrypted), ("response", row.response_encrypted)):
+        try:
+            record[field] = encryption_utils.decrypt_field(blob)
+        except Exception:
+            record[f"{field}_blob"] = base64.b64encode(blob).decode("ascii")
+    return record
+
+
+def text_of(record: dict, field: str) -> str:
+    """``message`` or ``response`` of an archive record."""
+    if field in record:
+        return record[field]
+    try:
+        if f"{field}_blob" in record:
+            return encryption_utils.decrypt_field(base64.b64decode(record[f"{field}_blob"]))
+        # Archived before the binary field format: the legacy base64 text.
+        return encryption_utils.decrypt_field(record[f"{field}_encrypted"])
+    except Exception:
+        return DECRYPTION_FAILED
+
+
+def record_text(record: dict) -> str:
+    """Searchable text of an archive record (as indexed for a hot message)."""
+    return search_index.chat_text(text_of(record, "message"), text_of(record, "response"))
+
+
+def created_at_of(record: dict) -> Optional[datetime]:
+    value = record.get("created_at")
+    return datetime.fromisoformat(value) if value else None
+
+
+def _sort_key(record: dict) -> tuple:
+    return (record.get("created_at") or "", record["id"])
+
+
+_FRAME_HEADER = 4
+
+
+def _frame(blob: bytes) -> bytes:
+    return len(blob).to_bytes(_FRAME_HEADER, "big") + blob
+
+
+def _frames(payload: bytes) -> Optional[List[bytes]]:
+    """The encrypted blobs of a framed payload, or None when the lengths do
+    not tile it (a bare blob from before framing)."""
+    frames = []
+    pos = 0
+    while pos < len(payload):
+        end = pos + _FRAME_HEADER + int.from_bytes(payload[pos:pos + _FRAME_HEADER], "big")
+        if end > len(payload) or end == pos + _FRAME_HEADER:
+            return None
+        frames.append(payload[pos + _FRAME_HEADER:end])
+        pos = end
+    return frames or None
+
+
+def _framed(payload: bytes) -> bytes:
+    """``payload`` in framed form, wrapping a bare blob as a single frame."""
+    return payload if _frames(payload) is not None else _frame(payload)
+
+
+def _open(payload: bytes) -> List[Tuple[int, bytes]]:
+    """(key id, plaintext) of every frame. A bare blob whose random nonce
+    happens to parse as frame lengths fails its tag and is read whole."""
+    payload = bytes(payload)
+    frames = _frames(payload)
+    if frames is not None:
+        try:
+            return [encryption_utils.decrypt_bytes_keyed(blob) for blob in frames]
+        except ValueError:
+            pass
+    return [encryption_utils.decrypt_bytes_keyed(payload)]
+
+
+def pack(records: List[dict]) -> bytes:
+    """One frame holding ``records``."""
+    raw = json.dumps(records, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return _frame(encryption_utils.encrypt_bytes(zlib.compress(raw, 6)))
+
+
+def unpack(payload: bytes) -> List[dict]:
+    """Records of one archived month, oldest first."""
+    parts = _open(payload)
+    records = [record for _, raw in parts for record in json.loads(zlib.decompress(raw))]
+    if len(parts) > 1:
+        records.sort(key=_sort_key)  # a later frame can hold older (imported) messages
+    return records
+
+
+def rekey(payload: bytes) -> Optional[bytes]:
+    """``payload`` with every frame encrypted under the current key, or None
+    if it already is (key rotation)."""
+    parts = _open(payload)
+    if all(key_id == encryption_utils.KEY_ID for key_id, _ in parts):
+        return None
+    return b"".join(_frame(encryption_utils.encrypt_bytes(raw)) for _, raw in parts)
+
+
+def _month_of(record: dict) -> str:
+    return (record.get("created_at") or "0000-00")[:7]
+
+
+def _write_month(db: Session, archive: Optional[models.ChatArchive], user_id: int, month: str, records: List[dict]) -> None:
+    """Store ``records`` as the month's payload (dropping the row when empty)."""
+    if not records:
+        if archive is not None:
+            db.delete(archive)
+        return
+    records.sort(key=_sort_key)
+    if archive is None:
+        archive = models.ChatArchive(user_id=user_id, month=month)
+        db.add(archive)
+    archive.payload = pack(records)
+    archive.message_count = len(records)
+    archive.first_at = created_at_of(records[0])
+    archive.last_at = created_at_of(records[-1])
+
+
+def _months(db: Session, user_id: int, first_month: Optional[str] = None,
+            last_month: Optional[str] = None) -> Dict[str, models.ChatArchive]:
+    """A user's archived months, optionally only those in [first_month, last_month]."""
+    archive = models.ChatArchive
+    query = db.query(archive).filter(archive.user_id == user_id)
+    if first_month is not None:
+        query = query.filter(archive.month >= first_month)
+    if last_month is not None:
+        query = query.filter(archive.month <= last_month)
+    return {a.month: a for a in query}
+
+
+def _append_month(db: Session, user_id: int, month: str, records: List[dict]) -> None:
+    """Add ``records`` to the month as a new frame, without decrypting the frames already stored."""
+    archive = models.ChatArchive
+    records.sort(key=_sort_key)
+    frame = pack(records)
+    first_at, last_at = created_at_of(records[0]), created_at_of(records[-1])
+    row = db.execute(
+        select(archive.id, archive.payload, archive.first_at, archive.last_at)
+        .where(archive.user_id == user_id, archive.month == month)
+    ).first()
+    if row is None:
+        db.add(models.ChatArchive(user_id=user_id, month=month, payload=frame, message_count=len(records),
+                                  first_at=first_at, last_at=last_at))
+        return
+    firsts = [ts for ts in (_naive(row.first_at), first_at) if ts is not None]
+    lasts = [ts for ts in (_naive(row.last_at), last_at) if ts is not None]
+    db.execute(
+        update(archive).where(archive.id == row.id).values(
+            payload=_framed(bytes(row.payload)) + frame,
+            message_count=archive.message_count + len(records),
+            first_at=min(firsts) if firsts else None,
+            last_at=max(lasts) if lasts else None,
+        ).execution_options(synchronize_session=False)
+    )
+
+
+# Archiving
+
+def archive_user(db: Session, user_id: int, cutoff: datetime) -> int:
+    """Move a user's messages older than cutoff into the archive, one chunk per
+    commit (appended to each month it touches). Returns messages archived."""
+    chat = models.ChatMessage
+    batch_size = settings.RETENTION_BATCH_SIZE
+    total = 0
+    while True:
+        rows = db.execute(
+            select(chat).where(chat.user_id == user_id, chat.created_at < cutoff)
+            .order_by(chat.created_at, chat.id).limit(batch_size)
+        ).scalars().all()
+        if not rows:
+            break
+        by_month: Dict[str, List[dict]] = defaultdict(list)
+        for row in rows:
+            record = _record(row)
+            by_month[_month_of(record)].append(record)
+
+        for month, records in by_month.items():
+            _append_month(db, user_id, month, records)
+
+        ids = [row.id for row in rows]
+        search_index.retag_documents(db, user_id, search_index.CHAT, search_index.ARCHIVE, ids)
+        db.execute(delete(chat).where(chat.id.in_(ids)).execution_options(synchronize_session=False))
+        db.commit()
+        db.expunge_all()
+        total += len(rows)
+        if len(rows) < batch_size:
+            break
+        time.sleep(settings.RETENTION_BATCH_PAUSE_MS / 1000.0)
+    return total
+
+
+def check_settings() -> bool:
+    """Warn when CHAT_ARCHIVE_AFTER_DAYS is set past the default retention, so
+    default users' messages are purged before they are old enough to archive
+    (checked when the retention worker starts). The default, equal to the
+    retention window, archives only users who keep history longer."""
+    days = settings.CHAT_ARCHIVE_AFTER_DAYS
+    if 0 < settings.CHAT_RETENTION_DAYS < days:
+        logger.warning(
+            f"CHAT_ARCHIVE_AFTER_DAYS={days} is above CHAT_RETENTION_DAYS={settings.CHAT_RETENTION_DAYS}; "
+            "messages are purged before they are old enough to archive"
+        )
+        return False
+    return True
+
+
+def archive_expired(db: Session, now: Optional[datetime] = None,
+                    retention_days: Optional[Dict[int, int]] = None) -> int:
+    """Archive every user's messages older than CHAT_ARCHIVE_AFTER_DAYS. Users
+    whose entry in ``retention_days`` (user_id -> days, 0 = keep forever) is
+    not longer than that are skipped. Returns messages archived."""
+    if settings.CHAT_ARCHIVE_AFTER_DAYS <= 0:
+        return 0
+    cutoff = (now or datetime.utcnow()) - timedelta(days=settings.CHAT_ARCHIVE_AFTER_DAYS)
+    if shards.enabled():
+        # No cross-shard query for who has old rows; ask each user's shard.
+        user_ids = db.execute(select(models.User.id)).scalars().all()
+    else:
+        chat = models.ChatMessage
+        user_ids = db.execute(select(chat.user_id).where(chat.created_at < cutoff).distinct()).scalars().all()
+    total = 0
+    for user_id in user_ids:
+        days = (retention_days or {}).get(user_id)
+        if days and 0 < days <= settings.CHAT_ARCHIVE_AFTER_DAYS:
+            continue
+        shards.scope(db, user_id)
+        total += archive_user(db, user_id, cutoff)
+    return total
+
+
+# Reading
+
+def iter_records(db: Session, user_id: int) -> Iterator[dict]:
+    """Every archived record of a user, oldest first, one month in memory at a time."""
+    archive = models.ChatArchive
+    ids = db.execute(
+        select(archive.id).where(archive.user_id == user_id).order_by(archive.month)
+    ).scalars().all()
+    for archive_id in ids:
+        payload = db.execute(select(archive.payload).where(archive.id == archive_id)).scalar()
+        if payload is not None:
+            yield from unpack(payload)
+
+
+def find_records(db: Session, user_id: int, record_ids) -> List[dict]:
+    """Archived records with the given ids, decrypting months newest first
+    until all are found (search hits)."""
+    wanted = set(record_ids)
+    archive = models.ChatArchive
+    found = []
+    for archive_id in db.execute(
+        select(archive.id).where(archive.user_id == user_id).order_by(archive.month.desc())
+    ).scalars().all():
+        for record in unpack(db.execute(payload_stmt(archive_id)).scalar()):
+            if record["id"] in wanted:
+                wanted.discard(record["id"])
+                found.append(record)
+        if not wanted:
+            break
+    return found
+
+
+def months_before_stmt(user_id: int, before: Optional[Position]):
+    """Ids of the archived months that can hold records before ``before``, newest first."""
+    archive = models.ChatArchive
+    stmt = select(archive.id).where(archive.user_id == user_id)
+    if before is not None and before[0] is not None:
+        stmt = stmt.where(archive.first_at <= before[0])
+    return stmt.order_by(archive.month.desc())
+
+
+def payload_stmt(archive_id: int):
+    return select(models.ChatArchive.payload).where(models.ChatArchive.id == archive_id)
+
+
+def records_before(payload: bytes, before: Optional[Position], session_id: Optional[str] = None) -> List[dict]:
+    """One month's records strictly before ``before`` (in a session, if given), newest first."""
+    limit_key = None
+    if before is not None:
+        limit_key = (_naive(before[0]) or datetime.min, before[1])
+    result = []
+    for record in reversed(unpack(payload)):
+        if session_id and record.get("session_id") != session_id:
+            continue
+        if limit_key is not None and (created_at_of(record) or datetime.min, record["id"]) >= limit_key:
+            continue
+        result.append(record)
+    return result
+
+
+# Deleting
+
+def _unindex(db: Session, user_id: int, record_ids: List[int]) -> None:
+    """Stage removal of deleted records' search postings, a chunk at a time."""
+    step = settings.RETENTION_BATCH_SIZE
+    for start in range(0, len(record_ids), step):
+        search_index.remove_documents(db, user_id, search_index.ARCHIVE, record_ids[start:start + step])
+
+
+def delete_session(db: Session, user_id: int, session_id: str) -> int:
+    """Stage removal of a session's archived messages, decrypting only the
+    months within the session's activity range. Returns messages removed."""
+    session = models.ChatSession
+    span = db.execute(
+        select(session.first_activity, session.last_activity)
+        .where(session.user_id == user_id, session.session_id == session_id)
+    ).first()
+    months = (
+        _months(db, user_id, _naive(span.first_activity).strftime("%Y-%m"), _naive(span.last_activity).strftime("%Y-%m"))
+        if span is not None and span.first_activity is not None and span.last_activity is not None
+        else _months(db, user_id)
+    )
+    removed: List[int] = []
+    for month, archive in months.items():
+        records = unpack(archive.payload)
+        kept = [r for r in records if r.get("session_id") != session_id]
+        if len(kept) != len(records):
+            removed += [r["id"] for r in records if r.get("session_id") == session_id]
+            _write_month(db, archive, user_id, month, kept)
+    _unindex(db, user_id, removed)
+    return len(removed)
+
+
+def purge_before(db: Session, user_id: int, cutoff: datetime) -> List[Optional[str]]:
+    """Stage removal of archived messages older than cutoff, decrypting only
+    the months up to the cutoff's. Returns the session id of every removed
+    message (for chat_sessions bookkeeping)."""
+    cutoff = _naive(cutoff)
+    removed: List[Optional[str]] = []
+    removed_ids: List[int] = []
+    for month, archive in _months(db, user_id, last_month=cutoff.strftime("%Y-%m")).items():
+        if archive.first_at is not None and _naive(archive.first_at) >= cutoff:
+            continue
+        records = unpack(archive.payload)
+        kept = []
+        for record in records:
+            created_at = created_at_of(record)
+            if created_at is not None and created_at < cutoff:
+                removed.append(record.get("session_id"))
+                removed_ids.append(record["id"])
+            else:
+                kept.append(record)
+        if len(kept) != len(records):
+            _write_month(db, archive, user_id, month, kept)
+    _unindex(db, user_id, removed_ids)
+    return removed
+
+
+def delete_user(db: Session, user_id: int) -> int:
+    """Stage removal of a user's whole archive. Returns messages removed."""
+    archive = models.ChatArchive
+    count = sum(db.execute(select(archive.message_count).where(archive.user_id == user_id)).scalars())
+    db.execute(delete(archive).where(archive.user_id == user_id))
+    search_index.remove_documents(db, user_id, search_index.ARCHIVE)
+    return count
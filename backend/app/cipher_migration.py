@@ -0,0 +1,135 @@
+"""
+Background rewrite of legacy ciphertext into the binary field format.
+
+Rows written before the binary format hold encrypt_data()'s base64 text as UTF-8
+bytes: a third larger than the raw ciphertext, and EAX rather than GCM.
+Readers handle both formats (``encryption_utils.decrypt_field``), so the
+rewrite can run alongside live traffic: each table is walked in id order,
+CIPHER_MIGRATION_BATCH_SIZE rows per transaction with a pause between
+batches. A row is only updated if its ciphertext is unchanged since it was
+read, so a concurrent edit is never overwritten. Rows already in v2 are
+skipped, which makes an interrupted run resume where it left off. (Moving
+binary values to a new key is app.key_rotation's job.)
+
+Values that fail to decrypt are left as they are (and counted).
+
+Usage:
+    python -m app.cipher_migration
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, bindparam, func, or_, select, update
+from sqlalchemy.engine import Engine
+
+import encryption_utils
+
+from . import models, shards
+from .config import settings
+from .database import engine
+
+logger = logging.getLogger(__name__)
+
+# Encrypted LargeBinary columns per table
+ENCRYPTED_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "chat_messages": ("message_encrypted", "response_encrypted"),
+    "journals": ("content_encrypted",),
+    "habits": ("title_encrypted", "description_encrypted"),
+    "response_cache": ("response_encrypted",),
+    "system_action_approvals": ("params_encrypted", "result_preview_encrypted"),
+}
+
+_BINARY = [bytes((encryption_utils.FORMAT_V2,)), bytes((encryption_utils.FORMAT_V3,))]
+
+
+def _legacy(column):
+    return and_(column.isnot(None), func.substr(column, 1, 1).notin_(_BINARY))
+
+
+def _rewrite(row, columns: Tuple[str, ...]) -> Tuple[Optional[dict], int]:
+    """Update parameters for one row (None when nothing could be rewritten)
+    and the number of values that failed to decrypt."""
+    params = {"_id": row.id}
+    changed = False
+    failed = 0
+    for name in columns:
+        value = getattr(row, name)
+        params[f"_old_{name}"] = params[name] = value
+        if value is None or not encryption_utils.is_legacy(value):
+            continue
+        try:
+            params[name] = encryption_utils.encrypt_field(encryption_utils.decrypt_field(value))
+            changed = True
+        except Exception:
+            failed += 1
+    return (params if changed else None), failed
+
+
+def migrate_table(bind: Engine, table_name: str, columns: Tuple[str, ...],
+                  batch_size: int, pause: float) -> Tuple[int, int]:
+    """Rewrite one table's legacy values. Returns (rows rewritten, values that failed)."""
+    table = models.Base.metadata.tables[table_name]
+    cols = [table.c[name] for name in columns]
+    stmt = (
+        update(table)
+        .where(table.c.id == bindparam("_id"), *[c.is_not_distinct_from(bindparam(f"_old_{c.name}")) for c in cols])
+        .values({c.name: bindparam(c.name) for c in cols})
+    )
+    rewritten = failed = 0
+    after_id = 0
+    while True:
+        with bind.begin() as conn:
+            rows = conn.execute(
+                select(table.c.id, *cols)
+                .where(table.c.id > after_id, or_(*[_legacy(c) for c in cols]))
+                .order_by(table.c.id).limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            batch: List[dict] = []
+            for row in rows:
+                params, row_failed = _rewrite(row, columns)
+                failed += row_failed
+                if params is not None:
+                    batch.append(params)
+            if batch:
+                rewritten += conn.execute(stmt, batch).rowcount
+        after_id = rows[-1].id
+        time.sleep(pause)
+    return rewritten, failed
+
+
+def migrate(bind: Engine = engine) -> dict:
+    """Rewrite every legacy value on the main database and any shard files."""
+    targets = [(bind, tuple(ENCRYPTED_COLUMNS))]
+    if shards.enabled():
+        sharded = tuple(name for name in ENCRYPTED_COLUMNS if name in shards.SHARDED_TABLES)
+        targets += [(shard_engine, sharded) for _, shard_engine in shards.router.all_engines()]
+    report = {"rows_rewritten": 0, "values_failed": 0}
+    for target, table_names in targets:
+        for table_name in table_names:
+            columns = ENCRYPTED_COLUMNS[table_name]
+            rewritten, failed = migrate_table(
+                target, table_name, columns,
+                settings.CIPHER_MIGRATION_BATCH_SIZE, settings.CIPHER_MIGRATION_PAUSE_MS / 1000.0,
+            )
+            report["rows_rewritten"] += rewritten
+            report["values_failed"] += failed
+    return report
+
+
+async def cipher_migration_worker():
+    """Run one migration pass in the background (started with the app)."""
+    try:
+        report = await asyncio.to_thread(migrate)
+        logger.info(f"Ciphertext migration: {report}")
+    except Exception as e:
+        logger.warning(f"Ciphertext migration failed: {e}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print(migrate())
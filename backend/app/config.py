@@ -16,7 +16,17 @@ class Settings:
     
     # Database
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./mymitra.db")
-    
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT: int = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+    # SQLite engine profile (applied to every new connection)
+    SQLITE_JOURNAL_MODE: str = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS: str = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_BUSY_TIMEOUT_MS: int = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    SQLITE_CACHE_SIZE_KB: int = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))  # 64 MiB
+    SQLITE_MMAP_SIZE: int = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+
     # Security
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-change-this-in-production")
     ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
@@ -36,6 +46,58 @@ class Settings:
     MAX_CHAT_HISTORY: int = int(os.getenv("MAX_CHAT_HISTORY", "50"))
     CHAT_RETENTION_DAYS: int = int(os.getenv("CHAT_RETENTION_DAYS", "30"))
     
+    # Retention worker: purges expired rows in small throttled batches
+    RETENTION_INTERVAL_MINUTES: int = int(os.getenv("RETENTION_INTERVAL_MINUTES", "360"))
+    RETENTION_BATCH_SIZE: int = int(os.getenv("RETENTION_BATCH_SIZE", "500"))
+    RETENTION_BATCH_PAUSE_MS: int = int(os.getenv("RETENTION_BATCH_PAUSE_MS", "50"))
+    RESPONSE_CACHE_TTL_DAYS: int = int(os.getenv("RESPONSE_CACHE_TTL_DAYS", "30"))
+    EMOTION_INSIGHT_RETENTION_DAYS: int = int(os.getenv("EMOTION_INSIGHT_RETENTION_DAYS", "90"))
+    APPROVAL_RETENTION_DAYS: int = int(os.getenv("APPROVAL_RETENTION_DAYS", "7"))
+
+    # Cold archive: chat messages older than this move to per-month compressed
+    # blobs in chat_archive during the retention pass (0 disables archiving).
+    # Defaults to the retention window, so only users who keep history longer
+    # are archived and hot-table readers always see the default window.
+    CHAT_ARCHIVE_AFTER_DAYS: int = int(os.getenv("CHAT_ARCHIVE_AFTER_DAYS", str(CHAT_RETENTION_DAYS)))
+
+    # Response cache: in-process LRU in front of the response_cache table
+    RESPONSE_CACHE_LRU_SIZE: int = int(os.getenv("RESPONSE_CACHE_LRU_SIZE", "2048"))
+    RESPONSE_CACHE_LRU_TTL_SECONDS: int = int(os.getenv("RESPONSE_CACHE_LRU_TTL_SECONDS", "3600"))
+    RESPONSE_CACHE_FLUSH_SECONDS: int = int(os.getenv("RESPONSE_CACHE_FLUSH_SECONDS", "5"))
+    RESPONSE_CACHE_MAX_ROWS: int = int(os.getenv("RESPONSE_CACHE_MAX_ROWS", "50000"))
+
+    # Semantic response cache: nearest prior question by embedding similarity
+    SEMANTIC_CACHE_ENABLED: bool = os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+    SEMANTIC_CACHE_THRESHOLD: float = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+    SEMANTIC_CACHE_SIZE: int = int(os.getenv("SEMANTIC_CACHE_SIZE", "1024"))
+
+    # Single-writer group commit: chat-turn writes are batched into one transaction
+    WRITE_QUEUE_ENABLED: bool = os.getenv("WRITE_QUEUE_ENABLED", "true").lower() == "true"
+    WRITE_QUEUE_BATCH_MS: float = float(os.getenv("WRITE_QUEUE_BATCH_MS", "5"))
+    WRITE_QUEUE_MAX_BATCH: int = int(os.getenv("WRITE_QUEUE_MAX_BATCH", "200"))
+
+    # Background rewrite of legacy (base64) ciphertext into the binary format
+    CIPHER_MIGRATION_ENABLED: bool = os.getenv("CIPHER_MIGRATION_ENABLED", "true").lower() == "true"
+    CIPHER_MIGRATION_BATCH_SIZE: int = int(os.getenv("CIPHER_MIGRATION_BATCH_SIZE", "500"))
+    CIPHER_MIGRATION_PAUSE_MS: int = int(os.getenv("CIPHER_MIGRATION_PAUSE_MS", "50"))
+
+    # Online key rotation: re-encrypt rows under the current key (runs at startup
+    # while ENCRYPTION_OLD_KEYS is set, until one pass under the current key completes)
+    KEY_ROTATION_ENABLED: bool = os.getenv("KEY_ROTATION_ENABLED", "true").lower() == "true"
+    KEY_ROTATION_BATCH_SIZE: int = int(os.getenv("KEY_ROTATION_BATCH_SIZE", "200"))
+    KEY_ROTATION_ROWS_PER_SEC: float = float(os.getenv("KEY_ROTATION_ROWS_PER_SEC", "1000"))
+
+    # Per-tenant sharding (SQLite): per-user tables in SHARD_COUNT files (0 = off)
+    SHARD_COUNT: int = int(os.getenv("SHARD_COUNT", "0"))
+    SHARD_DIR: str = os.getenv("SHARD_DIR", "./shards")
+    SHARD_MAX_OPEN: int = int(os.getenv("SHARD_MAX_OPEN", "64"))
+
+    # Largest NDJSON body /account/import accepts (larger uploads get 413)
+    ACCOUNT_IMPORT_MAX_BYTES: int = int(os.getenv("ACCOUNT_IMPORT_MAX_BYTES", str(512 * 1024 * 1024)))
+
+    # Admin dashboard totals are served from a snapshot refreshed this often
+    ADMIN_STATS_REFRESH_SECONDS: int = int(os.getenv("ADMIN_STATS_REFRESH_SECONDS", "60"))
+
     # Development
     DEBUG: bool = os.getenv("DEBUG", "false").lower() == "true"
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
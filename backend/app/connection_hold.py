@@ -0,0 +1,77 @@
+"""
+Per-request database hold time.
+
+Streaming routes open short-lived sessions around the steps that touch the
+database (``RequestHold.sessions``) instead of one session for the whole
+response, so no pooled connection is pinned while tokens are paced out.
+Each request's total time inside those scopes is recorded in a HoldStats
+window. That time is an upper bound on how long a connection was held
+(a session only checks one out on its first query).
+"""
+
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .database import AsyncSessionLocal, SessionLocal
+
+HOLD_WINDOW = 1000
+
+
+class HoldStats:
+    """Hold time of the last HOLD_WINDOW requests plus lifetime counters."""
+
+    def __init__(self, window: int = HOLD_WINDOW):
+        self._recent: deque = deque(maxlen=window)
+        self.requests = 0
+        self.total_seconds = 0.0
+
+    def record(self, seconds: float) -> None:
+        self._recent.append(seconds)
+        self.requests += 1
+        self.total_seconds += seconds
+
+    def stats(self) -> dict:
+        recent = sorted(self._recent)
+
+        def pct(p: float) -> float:
+            return round(recent[min(len(recent) - 1, int(p * len(recent)))] * 1000, 1) if recent else 0.0
+
+        return {
+            "requests": self.requests,
+            "mean_ms": round(self.total_seconds / self.requests * 1000, 1) if self.requests else 0.0,
+            "p50_ms": pct(0.50),
+            "p95_ms": pct(0.95),
+            "max_ms": round(recent[-1] * 1000, 1) if recent else 0.0,
+        }
+
+
+class RequestHold:
+    """Accumulates one request's time inside database session scopes."""
+
+    def __init__(self, stats: HoldStats):
+        self._stats = stats
+        self.seconds = 0.0
+
+    @asynccontextmanager
+    async def sessions(self) -> AsyncIterator[Tuple[Session, AsyncSession]]:
+        """A (sync, async) session pair for one step, closed when the step ends."""
+        start = time.perf_counter()
+        db = SessionLocal()
+        adb = AsyncSessionLocal()
+        try:
+            yield db, adb
+        finally:
+            db.close()
+            await adb.close()
+            self.seconds += time.perf_counter() - start
+
+    def finish(self) -> None:
+        self._stats.record(self.seconds)
+
+
+stream_hold = HoldStats()
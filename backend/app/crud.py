@@ -1,14 +1,41 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
-from . import models, schemas, security
+from sqlalchemy import desc, delete, select, func, text, case, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from . import models, schemas, security, pagination, habit_log, search_index, chat_archive, shards, read_models
+from .database import IS_SQLITE
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 import encryption_utils
 import json
 import hashlib
-from datetime import datetime, timedelta
-from typing import List, Optional
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+# Rows removed per DELETE statement; each chunk commits so the SQLite write
+# lock is released between chunks and live chat inserts can interleave.
+DELETE_CHUNK_SIZE = 1000
+
+
+def _chunked_delete(db: Session, model, *criteria, chunk_size: int = DELETE_CHUNK_SIZE, pause: float = 0.0) -> int:
+    """Set-based DELETE of rows matching criteria in id-chunks, optionally sleeping
+    ``pause`` seconds between chunks. Returns rows deleted."""
+    total = 0
+    while True:
+        ids = select(model.id).where(*criteria).limit(chunk_size).scalar_subquery()
+        result = db.execute(
+            delete(model).where(model.id.in_(ids)).execution_options(synchronize_session=False)
+        )
+        db.commit()
+        deleted = result.rowcount or 0
+        total += deleted
+        if deleted < chunk_size:
+            return total
+        if pause:
+            time.sleep(pause)
 
 # Users
 
@@ -90,6 +117,29 @@ def update_memory_rate_limit_timestamps(
     db.commit()
 
 
+def set_memory_rate_limit_timestamps(
+    db: Session,
+    user_id: int,
+    *,
+    update_preference_at: Optional[datetime] = None,
+    update_routine_at: Optional[datetime] = None,
+) -> None:
+    """Stage the rate-limit timestamps as one UPDATE (the settings row must
+    already exist). The caller commits."""
+    values = {}
+    if update_preference_at is not None:
+        values["last_preference_memory_at"] = update_preference_at
+    if update_routine_at is not None:
+        values["last_routine_memory_at"] = update_routine_at
+    if values:
+        db.execute(
+            update(models.UserSettings)
+            .where(models.UserSettings.user_id == user_id)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+
+
 def create_system_action_approval(
     db: Session,
     user_id: int,
@@ -103,7 +153,7 @@ def create_system_action_approval(
     # Canonicalize and hash the params to bind preview->execution.
     params_json = json.dumps(params, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
     params_hash = hashlib.sha256(params_json.encode("utf-8")).hexdigest()
-    params_encrypted = encryption_utils.encrypt_data(params_json).encode("utf-8")
+    params_encrypted = encryption_utils.encrypt_field(params_json)
 
     expires_at = datetime.utcnow() + timedelta(minutes=expires_minutes)
     approval = models.SystemActionApproval(
@@ -161,7 +211,7 @@ def mark_system_action_executed(
 
     if result_preview is not None:
         preview = result_preview[:5000]  # avoid huge DB rows
-        approval.result_preview_encrypted = encryption_utils.encrypt_data(preview).encode("utf-8")
+        approval.result_preview_encrypted = encryption_utils.encrypt_field(preview)
 
     db.commit()
     db.refresh(approval)
@@ -178,126 +228,358 @@ def create_chat_message(
     session_id: Optional[str] = None
 ):
     """Store an encrypted chat message and response."""
+    db_message = add_chat_message(db, user_id, message, response, personality_used, session_id)
+    db.commit()
+    db.refresh(db_message)
+    return db_message
+
+
+def add_chat_message(
+    db: Session,
+    user_id: int,
+    message: str,
+    response: str,
+    personality_used: str,
+    session_id: Optional[str] = None
+) -> models.ChatMessage:
+    """Stage an encrypted chat message with its session and stats bumps. The caller commits."""
     db_message = models.ChatMessage(
         user_id=user_id,
-        message_encrypted=encryption_utils.encrypt_data(message).encode('utf-8'),
-        response_encrypted=encryption_utils.encrypt_data(response).encode('utf-8'),
+        message_encrypted=encryption_utils.encrypt_field(message),
+        response_encrypted=encryption_utils.encrypt_field(response),
         personality_used=personality_used,
         session_id=session_id
     )
     db.add(db_message)
-    db.commit()
-    db.refresh(db_message)
+    db.flush()
+    search_index.add_document(db, user_id, search_index.CHAT, db_message.id, search_index.chat_text(message, response))
+    if session_id:
+        db.execute(chat_session_upsert(user_id, session_id, personality_used))
+    db.execute(user_stats_upsert(user_id, messages=1))
     return db_message
 
 
+def chat_session_upsert(user_id: int, session_id: str, personality_used: str):
+    """INSERT .. ON CONFLICT statement bumping the chat_sessions row for a new message."""
+    insert = sqlite_insert if IS_SQLITE else pg_insert
+    table = models.ChatSession.__table__
+    stmt = insert(table).values(
+        user_id=user_id,
+        session_id=session_id,
+        message_count=1,
+        last_personality=personality_used,
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c.session_id],
+        set_={
+            "last_activity": func.now(),
+            "message_count": table.c.message_count + 1,
+            "last_personality": stmt.excluded.last_personality,
+        },
+    )
+
+
+def user_stats_upsert(user_id: int, messages: int = 0, journals: int = 0, habits: int = 0, milestones: int = 0):
+    """INSERT .. ON CONFLICT statement applying counter deltas to a user_stats row.
+    Negative deltas (deletes) are clamped at zero."""
+    insert = sqlite_insert if IS_SQLITE else pg_insert
+    table = models.UserStats.__table__
+    deltas = {
+        "total_messages": messages,
+        "journal_count": journals,
+        "habit_count": habits,
+        "milestone_count": milestones,
+    }
+    values = {"user_id": user_id, **{col: max(delta, 0) for col, delta in deltas.items()}}
+    set_ = {
+        col: case((table.c[col] + delta < 0, 0), else_=table.c[col] + delta)
+        for col, delta in deltas.items() if delta
+    }
+    if messages > 0:
+        values.update(first_chat_at=func.now(), last_chat_at=func.now())
+        set_.update(first_chat_at=func.coalesce(table.c.first_chat_at, func.now()), last_chat_at=func.now())
+    stmt = insert(table).values(**values)
+    if not set_:
+        return stmt.on_conflict_do_nothing(index_elements=[table.c.user_id])
+    return stmt.on_conflict_do_update(index_elements=[table.c.user_id], set_=set_)
+
+
+def get_user_stats(db: Session, user_id: int) -> dict:
+    """Counters for a user from user_stats (a single primary-key read)."""
+    row = db.execute(
+        select(models.UserStats.__table__).where(models.UserStats.user_id == user_id)
+    ).mappings().first()
+    return user_stats_dict(row)
+
+
+def user_stats_dict(row) -> dict:
+    """Shape a user_stats row (or None) like get_user_stats()."""
+    def _iso(value):
+        return value.isoformat() if hasattr(value, "isoformat") else value
+
+    return {
+        "total_messages": row["total_messages"] if row else 0,
+        "first_chat_at": _iso(row["first_chat_at"]) if row else None,
+        "last_chat_at": _iso(row["last_chat_at"]) if row else None,
+        "journal_count": row["journal_count"] if row else 0,
+        "habit_count": row["habit_count"] if row else 0,
+        "milestone_count": row["milestone_count"] if row else 0,
+    }
+
+
+def get_admin_totals(db: Session) -> dict:
+    """Site-wide totals for the admin dashboard in one statement (one per
+    shard plus one for the catalog when sharding is enabled)."""
+    stats = models.UserStats
+    if shards.enabled():
+        users = db.execute(select(
+            func.count(models.User.id),
+            func.count(models.User.id).filter(models.User.is_active == True),
+        )).one()
+        sums = [0, 0, 0]
+        for row in shards.fan_out(lambda conn: conn.execute(select(
+            func.coalesce(func.sum(stats.total_messages), 0),
+            func.coalesce(func.sum(stats.habit_count), 0),
+            func.coalesce(func.sum(stats.journal_count), 0),
+        )).one()).values():
+            sums = [total + value for total, value in zip(sums, row)]
+        return {
+            "total_users": users[0],
+            "active_users": users[1],
+            "total_messages": sums[0],
+            "total_habits": sums[1],
+            "total_journals": sums[2],
+        }
+    row = db.execute(select(
+        select(func.count(models.User.id)).scalar_subquery(),
+        select(func.count(models.User.id)).where(models.User.is_active == True).scalar_subquery(),
+        select(func.coalesce(func.sum(stats.total_messages), 0)).scalar_subquery(),
+        select(func.coalesce(func.sum(stats.habit_count), 0)).scalar_subquery(),
+        select(func.coalesce(func.sum(stats.journal_count), 0)).scalar_subquery(),
+    )).one()
+    return {
+        "total_users": row[0],
+        "active_users": row[1],
+        "total_messages": row[2],
+        "total_habits": row[3],
+        "total_journals": row[4],
+    }
+
+
+def get_user_activity(db: Session, user_ids: List[int]) -> Dict[int, tuple]:
+    """(total_messages, last_chat_at) per user, one query per shard involved."""
+    by_shard: Dict[Optional[int], List[int]] = {}
+    for user_id in user_ids:
+        by_shard.setdefault(shards.shard_of(user_id) if shards.enabled() else None, []).append(user_id)
+    stats = models.UserStats
+    activity = {}
+    for ids in by_shard.values():
+        shards.scope(db, ids[0])
+        for row in db.execute(select(stats.user_id, stats.total_messages, stats.last_chat_at).where(stats.user_id.in_(ids))):
+            activity[row.user_id] = (row.total_messages, row.last_chat_at)
+    return activity
+
+
+def backfill_user_stats(db, user_id: int) -> int:
+    """Recompute one user's user_stats row from the source tables, archived
+    chats included (Session or Connection; the caller commits). A row the
+    live counters created meanwhile is overwritten, so it can run after
+    startup. Returns rows written."""
+    result = db.execute(text("""
+        INSERT INTO user_stats (user_id, total_messages, first_chat_at, last_chat_at,
+                                journal_count, habit_count, milestone_count)
+        SELECT :user_id,
+               (SELECT COUNT(*) FROM chat_messages m WHERE m.user_id = :user_id)
+                 + (SELECT COALESCE(SUM(a.message_count), 0) FROM chat_archive a WHERE a.user_id = :user_id),
+               (SELECT MIN(t) FROM (SELECT MIN(m.created_at) AS t FROM chat_messages m WHERE m.user_id = :user_id
+                                    UNION ALL SELECT MIN(a.first_at) FROM chat_archive a WHERE a.user_id = :user_id) f),
+               (SELECT MAX(t) FROM (SELECT MAX(m.created_at) AS t FROM chat_messages m WHERE m.user_id = :user_id
+                                    UNION ALL SELECT MAX(a.last_at) FROM chat_archive a WHERE a.user_id = :user_id) l),
+               (SELECT COUNT(*) FROM journals j WHERE j.user_id = :user_id),
+               (SELECT COUNT(*) FROM habits h WHERE h.user_id = :user_id),
+               (SELECT COUNT(*) FROM growth_milestones g WHERE g.user_id = :user_id)
+         WHERE 1 = 1
+        ON CONFLICT (user_id) DO UPDATE SET
+            total_messages = excluded.total_messages,
+            first_chat_at = excluded.first_chat_at,
+            last_chat_at = excluded.last_chat_at,
+            journal_count = excluded.journal_count,
+            habit_count = excluded.habit_count,
+            milestone_count = excluded.milestone_count
+    """), {"user_id": user_id})
+    return result.rowcount or 0
+
+
+def backfill_chat_sessions(db, user_id: Optional[int] = None) -> int:
+    """Rebuild chat_sessions rows from chat_messages, for every user or just
+    ``user_id`` (Session or Connection; the caller commits). A row the live
+    upsert created meanwhile is widened to cover the older messages rather
+    than skipped. Returns sessions written."""
+    user_filter = "AND m.user_id = :user_id" if user_id is not None else ""
+    result = db.execute(text(f"""
+        INSERT INTO chat_sessions (user_id, session_id, first_activity, last_activity, message_count, last_personality)
+        SELECT m.user_id, m.session_id, MIN(m.created_at), MAX(m.created_at), COUNT(*),
+               (SELECT p.personality_used FROM chat_messages p
+                 WHERE p.user_id = m.user_id AND p.session_id = m.session_id
+                 ORDER BY p.created_at DESC, p.id DESC LIMIT 1)
+          FROM chat_messages m
+         WHERE m.session_id IS NOT NULL {user_filter}
+         GROUP BY m.user_id, m.session_id
+        ON CONFLICT (user_id, session_id) DO UPDATE SET
+            first_activity = CASE WHEN excluded.first_activity < chat_sessions.first_activity
+                                  THEN excluded.first_activity ELSE chat_sessions.first_activity END,
+            message_count = CASE WHEN excluded.message_count > chat_sessions.message_count
+                                 THEN excluded.message_count ELSE chat_sessions.message_count END
+    """), {"user_id": user_id} if user_id is not None else {})
+    return result.rowcount or 0
+
+
 def get_recent_chat_history(db: Session, user_id: int, limit: int = 10, session_id: Optional[str] = None) -> List[dict]:
     """Get recent chat history for context. If session_id provided, filter to that session."""
-    query = db.query(models.ChatMessage).filter(models.ChatMessage.user_id == user_id)
-    if session_id:
-        query = query.filter(models.ChatMessage.session_id == session_id)
-    messages = query.order_by(desc(models.ChatMessage.created_at)).limit(limit).all()
-    
-    result = []
-    for msg in reversed(messages):  # Reverse to get chronological order
-        try:
-            user_message = encryption_utils.decrypt_data(msg.message_encrypted.decode('utf-8'))
-            ai_response = encryption_utils.decrypt_data(msg.response_encrypted.decode('utf-8'))
-            ts = msg.created_at.isoformat() if getattr(msg, 'created_at', None) else None
-            sid = msg.session_id
-            result.extend([
-                {"role": "user", "content": user_message, "timestamp": ts, "session_id": sid},
-                {"role": "assistant", "content": ai_response, "timestamp": ts, "session_id": sid}
-            ])
-        except Exception:
-            continue  # Skip corrupted messages
-    
-    return result
+    rows = db.execute(read_models.recent_chats_stmt(user_id, limit, session_id)).all()
+    return read_models.chat_turns(rows)
 
 
 def get_chat_messages_for_export(db: Session, user_id: int) -> List[dict]:
-    """Get all chat messages for data export."""
-    messages = db.query(models.ChatMessage).filter(
-        models.ChatMessage.user_id == user_id
-    ).order_by(models.ChatMessage.created_at).all()
-    
-    result = []
-    for msg in messages:
-        try:
-            user_message = encryption_utils.decrypt_data(msg.message_encrypted.decode('utf-8'))
-            ai_response = encryption_utils.decrypt_data(msg.response_encrypted.decode('utf-8'))
-            result.append({
-                "timestamp": msg.created_at.isoformat(),
-                "user_message": user_message,
-                "ai_response": ai_response,
-                "personality": msg.personality_used,
-                "session_id": msg.session_id
-            })
-        except Exception:
-            continue
-    
-    return result
+    """Get all chat messages for data export. Large accounts should stream
+    account_export.iter_export() instead of materialising this list."""
+    from .account_export import iter_export
+
+    return [
+        {
+            "timestamp": record["created_at"],
+            "user_message": record["user_message"],
+            "ai_response": record["ai_response"],
+            "personality": record["personality"],
+            "session_id": record["session_id"],
+        }
+        for record in iter_export(db, user_id)
+        if record["type"] == "chat_message" and record["user_message"] != "[decryption_failed]"
+    ]
 
 
 def list_chat_sessions(db: Session, user_id: int) -> List[dict]:
-    """List distinct chat sessions for a user with last activity timestamp."""
-    # SQLite does not support DISTINCT ON; use subquery approach
-    subq = db.query(models.ChatMessage.session_id, models.ChatMessage.created_at).\
-        filter(models.ChatMessage.user_id == user_id).\
-        order_by(models.ChatMessage.session_id, desc(models.ChatMessage.created_at)).subquery()
-    rows = db.query(subq.c.session_id, subq.c.created_at).all()
-    # Deduplicate keeping first occurrence (already sorted by created_at desc per session)
-    seen = set()
-    sessions = []
-    for sid, ts in rows:
-        if sid and sid not in seen:
-            seen.add(sid)
-            sessions.append({"id": sid, "last_activity": ts.isoformat() if ts else None})
-    return sessions
+    """List chat sessions for a user, most recently active first."""
+    rows = (
+        db.query(models.ChatSession)
+        .filter(models.ChatSession.user_id == user_id)
+        .order_by(desc(models.ChatSession.last_activity))
+        .all()
+    )
+    return [
+        {
+            "id": r.session_id,
+            "last_activity": r.last_activity.isoformat() if r.last_activity else None,
+            "first_activity": r.first_activity.isoformat() if r.first_activity else None,
+            "message_count": r.message_count,
+            "personality": r.last_personality,
+        }
+        for r in rows
+    ]
 
 
 def delete_chat_session(db: Session, user_id: int, session_id: str) -> int:
     """Delete all messages in a session for the user. Returns count deleted."""
-    msgs = db.query(models.ChatMessage).filter(
+    search_index.remove_documents(db, user_id, search_index.CHAT, select(models.ChatMessage.id).where(
         models.ChatMessage.user_id == user_id,
-        models.ChatMessage.session_id == session_id
-    ).all()
-    count = len(msgs)
-    for m in msgs:
-        db.delete(m)
+        models.ChatMessage.session_id == session_id,
+    ))
+    count = _chunked_delete(
+        db,
+        models.ChatMessage,
+        models.ChatMessage.user_id == user_id,
+        models.ChatMessage.session_id == session_id,
+    )
+    count += chat_archive.delete_session(db, user_id, session_id)
+    db.execute(delete(models.ChatSession).where(
+        models.ChatSession.user_id == user_id,
+        models.ChatSession.session_id == session_id,
+    ))
+    if count:
+        db.execute(user_stats_upsert(user_id, messages=-count))
     db.commit()
     return count
 
 
 def delete_all_chats(db: Session, user_id: int) -> int:
     """Delete all chat messages for a user. Returns count deleted."""
-    msgs = db.query(models.ChatMessage).filter(models.ChatMessage.user_id == user_id).all()
-    count = len(msgs)
-    for m in msgs:
-        db.delete(m)
+    search_index.remove_documents(db, user_id, search_index.CHAT)
+    count = _chunked_delete(db, models.ChatMessage, models.ChatMessage.user_id == user_id)
+    count += chat_archive.delete_user(db, user_id)
+    _chunked_delete(db, models.ChatSession, models.ChatSession.user_id == user_id)
+    db.execute(
+        update(models.UserStats)
+        .where(models.UserStats.user_id == user_id)
+        .values(total_messages=0, first_chat_at=None, last_chat_at=None)
+    )
     db.commit()
     return count
 
+
+def delete_chat_message(db: Session, message_id: int) -> bool:
+    """Delete a single chat message and keep its chat_sessions row in step."""
+    message = db.query(models.ChatMessage).filter(models.ChatMessage.id == message_id).first()
+    if not message:
+        return False
+    if message.session_id:
+        db.query(models.ChatSession).filter(
+            models.ChatSession.user_id == message.user_id,
+            models.ChatSession.session_id == message.session_id,
+        ).update(
+            {models.ChatSession.message_count: models.ChatSession.message_count - 1},
+            synchronize_session=False,
+        )
+        db.query(models.ChatSession).filter(
+            models.ChatSession.user_id == message.user_id,
+            models.ChatSession.session_id == message.session_id,
+            models.ChatSession.message_count <= 0,
+        ).delete(synchronize_session=False)
+    db.execute(user_stats_upsert(message.user_id, messages=-1))
+    search_index.remove_documents(db, message.user_id, search_index.CHAT, [message.id])
+    db.delete(message)
+    db.commit()
+    return True
+
+
+def delete_all_user_data(db: Session, user_id: int) -> dict:
+    """Erase a user's chats, journals, habits, emotion data and milestones.
+    The account and its settings are kept. Returns per-table delete counts."""
+    counts = {
+        "chat_messages": delete_all_chats(db, user_id),
+        "journals": _chunked_delete(db, models.Journal, models.Journal.user_id == user_id),
+        "habit_completion_years": _chunked_delete(db, models.HabitCompletionYear, models.HabitCompletionYear.user_id == user_id),
+        "habits": _chunked_delete(db, models.Habit, models.Habit.user_id == user_id),
+        "emotion_records": _chunked_delete(db, models.EmotionRecord, models.EmotionRecord.user_id == user_id),
+        "emotion_daily_rollups": _chunked_delete(db, models.EmotionDailyRollup, models.EmotionDailyRollup.user_id == user_id),
+        "emotion_insights": _chunked_delete(db, models.EmotionInsight, models.EmotionInsight.user_id == user_id),
+        "growth_milestones": _chunked_delete(db, models.GrowthMilestone, models.GrowthMilestone.user_id == user_id),
+    }
+    search_index.remove_documents(db, user_id)
+    db.execute(delete(models.UserStats).where(models.UserStats.user_id == user_id))
+    db.commit()
+    return counts
+
 # Habits
 
 def create_habit(db: Session, user_id: int, habit: schemas.HabitCreate):
     db_obj = models.Habit(
         user_id=user_id,
-        title_encrypted=encryption_utils.encrypt_data(habit.title).encode('utf-8'),
-        description_encrypted=encryption_utils.encrypt_data(habit.description).encode('utf-8') if habit.description else None,
+        title_encrypted=encryption_utils.encrypt_field(habit.title),
+        description_encrypted=encryption_utils.encrypt_field(habit.description) if habit.description else None,
         frequency=habit.frequency,
     )
     db.add(db_obj)
+    db.execute(user_stats_upsert(user_id, habits=1))
     db.commit()
     db.refresh(db_obj)
     
     # Return formatted response like list_habits
     try:
-        title = encryption_utils.decrypt_data(db_obj.title_encrypted.decode('utf-8'))
+        title = encryption_utils.decrypt_field(db_obj.title_encrypted)
     except Exception:
         title = "[decryption_failed]"
     try:
-        description = encryption_utils.decrypt_data(db_obj.description_encrypted.decode('utf-8')) if db_obj.description_encrypted else None
+        description = encryption_utils.decrypt_field(db_obj.description_encrypted) if db_obj.description_encrypted else None
     except Exception:
         description = "[decryption_failed]"
     
@@ -314,53 +596,94 @@ def create_habit(db: Session, user_id: int, habit: schemas.HabitCreate):
     }
 
 
-def list_habits(db: Session, user_id: int):
-    habits = db.query(models.Habit).filter(models.Habit.user_id == user_id).all()
+def streak_broken(frequency: Optional[str], last_completed: Optional[datetime], now: datetime) -> bool:
+    """True when the gap since last_completed has broken the habit's streak."""
+    if not last_completed:
+        return False
+    frequency = frequency or 'daily'
+    if frequency == 'weekly':
+        return (now - last_completed).days // 7 > 1  # More than 1 week gap
+    if frequency == 'monthly':
+        months_since = (now.year - last_completed.year) * 12 + (now.month - last_completed.month)
+        return months_since > 1  # More than 1 month gap
+    # daily, custom or unknown frequency
+    return (now - last_completed).days > 1
+
+
+def effective_streak(habit: models.Habit, now: Optional[datetime] = None) -> int:
+    """Streak as of now. A broken streak reads as 0 even before it is reset in the DB."""
+    if streak_broken(habit.frequency, habit.last_completed, now or datetime.now()):
+        return 0
+    return habit.streak_count or 0
+
+
+# Users whose broken streaks were swept (and committed) today in this
+# process. Only the current day is kept: the set is cleared on rollover.
+# Sync routes run in a threadpool, so both are guarded by the lock.
+_streak_sweep_lock = threading.Lock()
+_streak_sweep_day: Optional[date] = None
+_streak_swept_users: set = set()
+
+
+def mark_streaks_swept(user_id: int, day: date) -> None:
+    """Record a sweep once its commit has succeeded."""
+    global _streak_sweep_day
+    with _streak_sweep_lock:
+        if _streak_sweep_day != day:
+            _streak_sweep_day = day
+            _streak_swept_users.clear()
+        _streak_swept_users.add(user_id)
+
+
+def _streaks_swept(user_id: int, day: date) -> bool:
+    with _streak_sweep_lock:
+        return _streak_sweep_day == day and user_id in _streak_swept_users
+
+
+def reset_broken_streaks(db: Session, user_id: int, now: Optional[datetime] = None) -> int:
+    """Zero stored streaks that have lapsed, in one UPDATE, at most once a day
+    per user. Reads never depend on this (see effective_streak); it only keeps
+    the stored column honest. The caller commits, then calls
+    mark_streaks_swept. Returns habits reset."""
+    now = now or datetime.now()
+    if _streaks_swept(user_id, now.date()):
+        return 0
+    db.flush()
+    rows = db.query(models.Habit.id, models.Habit.frequency, models.Habit.last_completed).filter(
+        models.Habit.user_id == user_id,
+        models.Habit.streak_count > 0,
+    ).all()
+    broken = [row.id for row in rows if streak_broken(row.frequency, row.last_completed, now)]
+    if broken:
+        db.query(models.Habit).filter(models.Habit.id.in_(broken)).update(
+            {models.Habit.streak_count: 0}, synchronize_session=False
+        )
+    return len(broken)
+
+
+def list_habits(db: Session, user_id: int, limit: Optional[int] = None, cursor: Optional[str] = None):
+    """List a user's habits; pass limit/cursor for a newest-first keyset page.
+    Read-only: lapsed streaks are reported as 0 without writing."""
+    query = db.query(models.Habit).filter(models.Habit.user_id == user_id)
+    if limit is not None or cursor:
+        query = pagination.apply_keyset(
+            query, models.Habit.created_at, models.Habit.id, cursor, pagination.clamp_limit(limit)
+        )
+    habits = query.all()
+    now = datetime.now()
+    titles = encryption_utils.decrypt_many([h.title_encrypted for h in habits], default="[decryption_failed]")
+    descriptions = encryption_utils.decrypt_many(
+        [h.description_encrypted or None for h in habits], default="[decryption_failed]"
+    )
     result = []
-    for habit in habits:
-        try:
-            title = encryption_utils.decrypt_data(habit.title_encrypted.decode('utf-8'))
-        except Exception:
-            title = "[decryption_failed]"
-        try:
-            description = encryption_utils.decrypt_data(habit.description_encrypted.decode('utf-8')) if habit.description_encrypted else None
-        except Exception:
-            description = "[decryption_failed]"
-
-        # Validate current streak based on frequency
-        if habit.last_completed:
-            now = datetime.now()
-            frequency = habit.frequency or 'daily'
-            streak_broken = False
-            
-            if frequency == 'daily':
-                days_since = (now - habit.last_completed).days
-                if days_since > 1:  # More than 1 day gap breaks daily streak
-                    streak_broken = True
-            elif frequency == 'weekly':
-                weeks_since = (now - habit.last_completed).days // 7
-                if weeks_since > 1:  # More than 1 week gap breaks weekly streak
-                    streak_broken = True
-            elif frequency == 'monthly':
-                months_since = (now.year - habit.last_completed.year) * 12 + (now.month - habit.last_completed.month)
-                if months_since > 1:  # More than 1 month gap breaks monthly streak
-                    streak_broken = True
-            else:  # custom or unknown frequency, treat as daily
-                days_since = (now - habit.last_completed).days
-                if days_since > 1:
-                    streak_broken = True
-            
-            if streak_broken:
-                habit.streak_count = 0
-                db.commit()  # Update the database with corrected streak
-        
+    for habit, title, description in zip(habits, titles, descriptions):
         result.append({
             "id": habit.id,
             "user_id": habit.user_id,
             "title": title,
             "description": description,
             "frequency": habit.frequency,
-            "streak_count": habit.streak_count,
+            "streak_count": effective_streak(habit, now),
             "last_completed": habit.last_completed.isoformat() if habit.last_completed else None,
             "created_at": habit.created_at.isoformat() if habit.created_at else None,
             "archived": habit.archived if hasattr(habit, 'archived') else False
@@ -428,11 +751,92 @@ def complete_habit(db: Session, user_id: int, habit_id: int):
         habit.streak_count = 1  # First completion
     
     habit.last_completed = now
+    mark_habit_completed(db, habit, now.date())
+    reset_broken_streaks(db, user_id, now)
     db.commit()
+    mark_streaks_swept(user_id, now.date())
     
     return habit
 
 
+def mark_habit_completed(db: Session, habit: models.Habit, day: date) -> None:
+    """Set ``day`` in the habit's completion bitmap. The caller commits."""
+    row = db.query(models.HabitCompletionYear).filter(
+        models.HabitCompletionYear.habit_id == habit.id,
+        models.HabitCompletionYear.year == day.year,
+    ).first()
+    if row:
+        row.days = habit_log.set_day(row.days, day)
+    else:
+        db.add(models.HabitCompletionYear(
+            habit_id=habit.id, user_id=habit.user_id, year=day.year, days=habit_log.set_day(None, day)
+        ))
+
+
+def get_habit_completions(db: Session, user_id: int, from_year: int, to_year: Optional[int] = None) -> Dict[int, Dict[int, bytes]]:
+    """All of a user's completion bitmaps in a year range, as ``{habit_id: {year: bitmap}}``."""
+    query = db.query(
+        models.HabitCompletionYear.habit_id,
+        models.HabitCompletionYear.year,
+        models.HabitCompletionYear.days,
+    ).filter(
+        models.HabitCompletionYear.user_id == user_id,
+        models.HabitCompletionYear.year >= from_year,
+    )
+    if to_year is not None:
+        query = query.filter(models.HabitCompletionYear.year <= to_year)
+    result: Dict[int, Dict[int, bytes]] = {}
+    for habit_id, year, days in query.all():
+        result.setdefault(habit_id, {})[year] = days
+    return result
+
+
+def get_habit_heatmap(db: Session, user_id: int, from_year: int, to_year: int) -> List[dict]:
+    """Per-habit completed days (1-based day-of-year) for each year in the range."""
+    completions = get_habit_completions(db, user_id, from_year, to_year)
+    return [
+        {
+            "habit_id": habit_id,
+            "years": {
+                str(year): habit_log.year_days(bitmap)
+                for year, bitmap in sorted(years.items())
+            },
+        }
+        for habit_id, years in sorted(completions.items())
+    ]
+
+
+def backfill_habit_completions(db, user_id: int) -> int:
+    """Seed one user's completion bitmaps from streak_count/last_completed
+    (Session or Connection; the caller commits). Daily streaks are expanded
+    into their run of days; other habits get their last completion. The days
+    are OR-ed into any bitmap already written, so completions logged since
+    startup are kept and a rerun changes nothing. Returns habits seeded."""
+    table = models.HabitCompletionYear.__table__
+    habits = db.execute(
+        select(models.Habit.id, models.Habit.user_id, models.Habit.frequency,
+               models.Habit.streak_count, models.Habit.last_completed)
+        .where(models.Habit.user_id == user_id, models.Habit.last_completed.isnot(None))
+    ).all()
+    existing = {
+        (row.habit_id, row.year): row.days
+        for row in db.execute(select(table.c.habit_id, table.c.year, table.c.days).where(table.c.user_id == user_id))
+    }
+    for habit in habits:
+        last = habit.last_completed.date()
+        run = max(1, habit.streak_count or 0) if (habit.frequency or 'daily') == 'daily' else 1
+        years: Dict[int, Optional[bytes]] = {}
+        for offset in range(run):
+            day = last - timedelta(days=offset)
+            years[day.year] = habit_log.set_day(years.get(day.year, existing.get((habit.id, day.year))), day)
+        for year, bitmap in years.items():
+            if (habit.id, year) in existing:
+                db.execute(table.update().where(table.c.habit_id == habit.id, table.c.year == year).values(days=bitmap))
+            else:
+                db.execute(table.insert().values(habit_id=habit.id, user_id=habit.user_id, year=year, days=bitmap))
+    return len(habits)
+
+
 def get_habit_insights(db: Session, user_id: int):
     """Get emotional insights and analytics for user's habits."""
     habits = db.query(models.Habit).filter(models.Habit.user_id == user_id).all()
@@ -443,29 +847,33 @@ def get_habit_insights(db: Session, user_id: int):
     # Calculate completion rates and streaks
     completion_data = []
     total_streak = 0
+    now = datetime.now()
+    # 90-day windows reach back into the previous year at most
+    completions = get_habit_completions(db, user_id, from_year=(now.date() - timedelta(days=90)).year)
     
     for habit in habits:
+        streak = effective_streak(habit, now)
         try:
-            title = encryption_utils.decrypt_data(habit.title_encrypted.decode('utf-8'))
+            title = encryption_utils.decrypt_field(habit.title_encrypted)
         except Exception:
             title = "[decryption_failed]"
         
-        # Calculate completion rate (last 7 days)
-        days_since_created = (datetime.now() - habit.created_at).days
-        expected_completions = min(7, days_since_created + 1)
-        
-        # Simple completion rate based on streak vs expected
-        completion_rate = min(100, (habit.streak_count / max(1, expected_completions)) * 100)
+        # Completion rates from the day bitmap
+        summary = habit_log.summarize(completions.get(habit.id, {}), now.date())
         
         completion_data.append({
+            "habit_id": habit.id,
             "habit_title": title,
-            "streak": habit.streak_count,
-            "completion_rate": round(completion_rate, 1),
+            "streak": streak,
+            "longest_streak": summary["longest_streak"],
+            "completion_rate": summary["rate_7d"],
+            "completion_rate_30d": summary["rate_30d"],
+            "completion_rate_90d": summary["rate_90d"],
             "last_completed": habit.last_completed.isoformat() if habit.last_completed else None,
             "frequency": habit.frequency
         })
         
-        total_streak += habit.streak_count
+        total_streak += streak
     
     # Generate emotional insights
     insights = []
@@ -525,10 +933,10 @@ def update_habit(db: Session, user_id: int, habit_id: int, habit_update: schemas
     
     # Update fields if provided
     if habit_update.title:
-        habit.title_encrypted = encryption_utils.encrypt_data(habit_update.title).encode('utf-8')
+        habit.title_encrypted = encryption_utils.encrypt_field(habit_update.title)
     
     if habit_update.description is not None:
-        habit.description_encrypted = encryption_utils.encrypt_data(habit_update.description).encode('utf-8') if habit_update.description else None
+        habit.description_encrypted = encryption_utils.encrypt_field(habit_update.description) if habit_update.description else None
     
     if habit_update.frequency:
         habit.frequency = habit_update.frequency
@@ -545,11 +953,11 @@ def update_habit(db: Session, user_id: int, habit_id: int, habit_update: schemas
     
     # Return formatted response matching schemas.Habit (decrypt + ISO dates)
     try:
-        title = encryption_utils.decrypt_data(habit.title_encrypted.decode('utf-8'))
+        title = encryption_utils.decrypt_field(habit.title_encrypted)
     except Exception:
         title = "[decryption_failed]"
     try:
-        description = encryption_utils.decrypt_data(habit.description_encrypted.decode('utf-8')) if habit.description_encrypted else None
+        description = encryption_utils.decrypt_field(habit.description_encrypted) if habit.description_encrypted else None
     except Exception:
         description = "[decryption_failed]"
 
@@ -576,7 +984,11 @@ def delete_habit(db: Session, user_id: int, habit_id: int):
     if not habit:
         return False
     
+    db.query(models.HabitCompletionYear).filter(
+        models.HabitCompletionYear.habit_id == habit.id
+    ).delete(synchronize_session=False)
     db.delete(habit)
+    db.execute(user_stats_upsert(user_id, habits=-1))
     db.commit()
     return True
 
@@ -610,7 +1022,7 @@ def get_cached_response(
         if not is_fresh:
             return None
         try:
-            return encryption_utils.decrypt_data(entry.response_encrypted.decode('utf-8'))
+            return encryption_utils.decrypt_field(entry.response_encrypted)
         except Exception:
             return None
     except Exception:
@@ -627,7 +1039,7 @@ def upsert_cached_response(
     Returns True on success.
     """
     try:
-        encrypted = encryption_utils.encrypt_data(response).encode('utf-8')
+        encrypted = encryption_utils.encrypt_field(response)
         entry = db.query(models.ResponseCache).filter(
             models.ResponseCache.question_key == question_key,
             models.ResponseCache.personality == personality
@@ -649,7 +1061,7 @@ def upsert_cached_response(
 # Journals (encrypted at rest)
 
 def create_journal(db: Session, user_id: int, journal: schemas.JournalCreate):
-    encrypted = encryption_utils.encrypt_data(journal.content).encode('utf-8')
+    encrypted = encryption_utils.encrypt_field(journal.content)
     db_obj = models.Journal(
         user_id=user_id,
         content_encrypted=encrypted,
@@ -657,20 +1069,26 @@ def create_journal(db: Session, user_id: int, journal: schemas.JournalCreate):
         created_at=datetime.now() # Set created_at to current time
     )
     db.add(db_obj)
+    db.flush()
+    search_index.add_document(db, user_id, search_index.JOURNAL, db_obj.id, journal.content)
+    db.execute(user_stats_upsert(user_id, journals=1))
     db.commit()
     db.refresh(db_obj)
     return db_obj
 
 
-def list_journals(db: Session, user_id: int):
-    items = db.query(models.Journal).filter(models.Journal.user_id == user_id).all()
+def list_journals(db: Session, user_id: int, limit: Optional[int] = None, cursor: Optional[str] = None):
+    """List a user's journals; pass limit/cursor for a newest-first keyset page."""
+    query = db.query(models.Journal).filter(models.Journal.user_id == user_id)
+    if limit is not None or cursor:
+        query = pagination.apply_keyset(
+            query, models.Journal.created_at, models.Journal.id, cursor, pagination.clamp_limit(limit)
+        )
+    items = query.all()
     # map to API schema shape with decrypted content
+    contents = encryption_utils.decrypt_many([it.content_encrypted for it in items], default="[decryption_failed]")
     result = []
-    for it in items:
-        try:
-            content = encryption_utils.decrypt_data(it.content_encrypted.decode('utf-8'))
-        except Exception:
-            content = "[decryption_failed]"
+    for it, content in zip(items, contents):
         result.append({
             "id": it.id,
             "user_id": it.user_id,
@@ -686,21 +1104,7 @@ def list_journals(db: Session, user_id: int):
 def get_recent_emotions(db: Session, user_id: int, limit: int = 30) -> List[dict]:
     """Return recent emotion records as dicts for the growth engine."""
     try:
-        records = (
-            db.query(models.EmotionRecord)
-            .filter(models.EmotionRecord.user_id == user_id)
-            .order_by(desc(models.EmotionRecord.timestamp))
-            .limit(limit)
-            .all()
-        )
-        return [
-            {
-                "emotion": r.primary_emotion,
-                "intensity": r.primary_intensity,
-                "timestamp": r.timestamp.isoformat() if r.timestamp else None,
-            }
-            for r in records
-        ]
+        return read_models.emotion_dicts(db.execute(read_models.recent_emotions_stmt(user_id, limit)).all())
     except Exception:
         return []
 
@@ -708,21 +1112,8 @@ def get_recent_emotions(db: Session, user_id: int, limit: int = 30) -> List[dict
 def get_user_chat_stats(db: Session, user_id: int) -> dict:
     """Return total message count and first chat date for a user."""
     try:
-        first = (
-            db.query(models.ChatMessage)
-            .filter(models.ChatMessage.user_id == user_id)
-            .order_by(models.ChatMessage.created_at)
-            .first()
-        )
-        total = (
-            db.query(models.ChatMessage)
-            .filter(models.ChatMessage.user_id == user_id)
-            .count()
-        )
-        return {
-            "total_messages": total,
-            "first_chat_at": first.created_at.isoformat() if first and first.created_at else None,
-        }
+        stats = get_user_stats(db, user_id)
+        return {"total_messages": stats["total_messages"], "first_chat_at": stats["first_chat_at"]}
     except Exception:
         return {"total_messages": 0, "first_chat_at": None}
 
@@ -730,24 +1121,7 @@ def get_user_chat_stats(db: Session, user_id: int) -> dict:
 def get_user_milestones(db: Session, user_id: int) -> List[dict]:
     """Return all growth milestones for a user."""
     try:
-        milestones = (
-            db.query(models.GrowthMilestone)
-            .filter(models.GrowthMilestone.user_id == user_id)
-            .order_by(desc(models.GrowthMilestone.created_at))
-            .limit(20)
-            .all()
-        )
-        return [
-            {
-                "id": m.id,
-                "type": m.milestone_type,
-                "recognition": m.recognition,
-                "source_snippet": m.source_snippet,
-                "weight": m.weight,
-                "created_at": m.created_at.isoformat() if m.created_at else None,
-            }
-            for m in milestones
-        ]
+        return read_models.milestone_dicts(db.execute(read_models.milestones_stmt(user_id)).all())
     except Exception:
         return []
 
@@ -755,16 +1129,23 @@ def get_user_milestones(db: Session, user_id: int) -> List[dict]:
 def store_milestone(db: Session, user_id: int, milestone: dict) -> Optional[models.GrowthMilestone]:
     """Store a detected growth milestone."""
     try:
-        m = models.GrowthMilestone(
-            user_id=user_id,
-            milestone_type=milestone.get("type", "growth"),
-            recognition=milestone.get("recognition"),
-            source_snippet=milestone.get("source_snippet", "")[:200],
-            weight=milestone.get("weight", 2),
-        )
-        db.add(m)
+        m = add_milestone(db, user_id, milestone)
         db.commit()
         db.refresh(m)
         return m
     except Exception:
         return None
+
+
+def add_milestone(db: Session, user_id: int, milestone: dict) -> models.GrowthMilestone:
+    """Stage a growth milestone and its user_stats bump. The caller commits."""
+    m = models.GrowthMilestone(
+        user_id=user_id,
+        milestone_type=milestone.get("type", "growth"),
+        recognition=milestone.get("recognition"),
+        source_snippet=milestone.get("source_snippet", "")[:200],
+        weight=milestone.get("weight", 2),
+    )
+    db.add(m)
+    db.execute(user_stats_upsert(user_id, milestones=1))
+    return m
@@ -1,19 +1,123 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./mymitra.db"
+from .config import settings
+from .shards import ASYNC_KEY, RoutedSession
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
+
+_url = make_url(SQLALCHEMY_DATABASE_URL)
+IS_SQLITE = _url.get_backend_name() == "sqlite"
+_IN_MEMORY = IS_SQLITE and (_url.database in (None, "", ":memory:"))
+
+
+def _engine_kwargs() -> dict:
+    """Connection/pool options for the configured backend."""
+    kwargs = {"pool_pre_ping": True}
+    if IS_SQLITE:
+        # Sessions are handed across threads by FastAPI's threadpool.
+        kwargs["connect_args"] = {
+            "check_same_thread": False,
+            "timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000.0,
+        }
+    if not _IN_MEMORY:
+        kwargs["pool_size"] = settings.DB_POOL_SIZE
+        kwargs["max_overflow"] = settings.DB_MAX_OVERFLOW
+        kwargs["pool_timeout"] = settings.DB_POOL_TIMEOUT
+    return kwargs
+
+
+def _sqlite_pragmas() -> list:
+    """PRAGMA statements applied to every new SQLite connection."""
+    return [
+        # Only takes effect on a brand-new file; existing databases are switched
+        # once with `python -m app.retention --enable-incremental-vacuum`.
+        "PRAGMA auto_vacuum=INCREMENTAL",
+        f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}",
+        f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}",
+        f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}",
+        # Negative cache_size is interpreted by SQLite as KiB rather than pages.
+        f"PRAGMA cache_size=-{int(settings.SQLITE_CACHE_SIZE_KB)}",
+        f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record=None) -> None:
+    """Connect-event hook: WAL lets readers proceed while a writer commits."""
+    cursor = dbapi_connection.cursor()
+    try:
+        for stmt in _sqlite_pragmas():
+            cursor.execute(stmt)
+    finally:
+        cursor.close()
+
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **_engine_kwargs())
+if IS_SQLITE:
+    event.listen(engine, "connect", apply_sqlite_pragmas)
+
+# RoutedSession sends per-user tables to their shard when SHARD_COUNT > 0
+# (see shards); otherwise it behaves exactly like Session.
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=RoutedSession)
+
+
+# Async drivers for the configured backend (same database, non-blocking I/O)
+_ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def _async_url():
+    driver = _ASYNC_DRIVERS.get(_url.get_backend_name())
+    return _url.set(drivername=driver) if driver else _url
+
+
+def _async_engine_kwargs() -> dict:
+    """_engine_kwargs for the async engine. SQLAlchemy defaults aiosqlite file
+    databases to NullPool, which rejects the pool sizing options, so a queue
+    pool is requested explicitly whenever they are set."""
+    kwargs = _engine_kwargs()
+    if "pool_size" in kwargs:
+        kwargs["poolclass"] = AsyncAdaptedQueuePool
+    return kwargs
+
+
+async_engine = create_async_engine(_async_url(), **_async_engine_kwargs())
+if IS_SQLITE:
+    event.listen(async_engine.sync_engine, "connect", apply_sqlite_pragmas)
+
+# expire_on_commit=False: attributes stay readable after commit without
+# an implicit (and in async, illegal) lazy refresh.
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, class_=AsyncSession, sync_session_class=RoutedSession,
+    info={ASYNC_KEY: True}, autoflush=False, expire_on_commit=False,
 )
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+
+def describe_engine() -> dict:
+    """Report the active engine profile (read back from a live connection)."""
+    info = {
+        "url": _url.render_as_string(hide_password=True),
+        "pool": type(engine.pool).__name__,
+        "pool_size": getattr(engine.pool, "size", lambda: None)(),
+    }
+    if IS_SQLITE:
+        with engine.connect() as conn:
+            for pragma in ("journal_mode", "synchronous", "busy_timeout", "cache_size", "mmap_size", "auto_vacuum"):
+                info[pragma] = conn.exec_driver_sql(f"PRAGMA {pragma}").scalar()
+    return info
+
 # FastAPI dependency to provide a DB session per request
 # Ensures sessions are properly closed after use
-from typing import Generator
+from typing import AsyncGenerator, Generator
 
 def get_db() -> Generator:
     db = SessionLocal()
@@ -23,6 +127,12 @@ def get_db() -> Generator:
         db.close()
 
 
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """Async counterpart of get_db for routes that must not block the event loop."""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 def get_last_messages(user_id: str, limit: int = 8):
     """
     Returns the last N messages for a user.
@@ -43,4 +153,3 @@ def save_message(user_id: str, role: str, text: str):
     # In a real implementation, this would encrypt the message
     # and save it to the database.
     pass
-
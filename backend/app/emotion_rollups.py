@@ -0,0 +1,168 @@
+"""
+Per-user daily emotion rollups.
+
+Every EmotionRecord insert also bumps one ``emotion_daily_rollups`` row keyed
+on (user, UTC day, emotion, intensity), in the same transaction. The
+day/week/month insight endpoints aggregate at most ~30 days of those rows
+with a single GROUP BY instead of loading raw records into Python. Windows
+are rolling (the last ``days`` * 24 hours): the window's partial first day is
+counted from the raw records of that one day.
+
+Usage:
+    python -m app.emotion_rollups --rebuild [--user ID]
+"""
+
+import argparse
+from datetime import datetime, time, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import Date, cast, delete, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from . import models
+from .database import IS_SQLITE
+
+PERIOD_DAYS = {"day": 1, "week": 7, "month": 30}
+
+
+def rollup_upsert(record: models.EmotionRecord):
+    """INSERT .. ON CONFLICT statement counting ``record`` into its daily rollup."""
+    insert = sqlite_insert if IS_SQLITE else pg_insert
+    table = models.EmotionDailyRollup.__table__
+    polarity = record.sentiment_polarity
+    stmt = insert(table).values(
+        user_id=record.user_id,
+        day=(record.timestamp or datetime.utcnow()).date(),
+        emotion=record.primary_emotion,
+        intensity=record.primary_intensity,
+        count=1,
+        polarity_sum=polarity or 0.0,
+        polarity_count=0 if polarity is None else 1,
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c.day, table.c.emotion, table.c.intensity],
+        set_={
+            "count": table.c.count + 1,
+            "polarity_sum": table.c.polarity_sum + stmt.excluded.polarity_sum,
+            "polarity_count": table.c.polarity_count + stmt.excluded.polarity_count,
+        },
+    )
+
+
+def add_emotion_record(db: Session, record: models.EmotionRecord) -> models.EmotionRecord:
+    """Stage an EmotionRecord together with its rollup bump. The caller commits."""
+    if record.timestamp is None:
+        record.timestamp = datetime.utcnow()
+    db.add(record)
+    if record.user_id is not None:
+        db.execute(rollup_upsert(record))
+    return record
+
+
+def rebuild(db, user_id: Optional[int] = None) -> int:
+    """Recompute rollups from emotion_records (Session or Connection; the
+    caller commits). Returns rollup rows written."""
+    rollups = models.EmotionDailyRollup.__table__
+    records = models.EmotionRecord.__table__
+    day = func.date(records.c.timestamp) if IS_SQLITE else cast(records.c.timestamp, Date)
+
+    clear = delete(rollups)
+    source = (
+        select(
+            records.c.user_id,
+            day,
+            records.c.primary_emotion,
+            records.c.primary_intensity,
+            func.count(),
+            func.coalesce(func.sum(records.c.sentiment_polarity), 0.0),
+            func.count(records.c.sentiment_polarity),
+        )
+        .where(records.c.user_id.isnot(None), records.c.timestamp.isnot(None))
+        .group_by(records.c.user_id, day, records.c.primary_emotion, records.c.primary_intensity)
+    )
+    if user_id is not None:
+        clear = clear.where(rollups.c.user_id == user_id)
+        source = source.where(records.c.user_id == user_id)
+
+    db.execute(clear)
+    result = db.execute(rollups.insert().from_select(
+        ["user_id", "day", "emotion", "intensity", "count", "polarity_sum", "polarity_count"],
+        source,
+    ))
+    return result.rowcount or 0
+
+
+def get_distribution(db: Session, user_id: int, days: int, now: Optional[datetime] = None) -> dict:
+    """Emotion counts, intensity breakdown and mean polarity over the ``days``
+    * 24 hours before ``now`` (UTC), so days=1 is the last 24 hours, not
+    since midnight. Whole days come from the rollups; the window's partial
+    first day is counted from that day's emotion_records."""
+    rollups = models.EmotionDailyRollup
+    records = models.EmotionRecord
+    since = (now or datetime.utcnow()) - timedelta(days=days)
+    first_full_day = since.date() + timedelta(days=1)
+    rows = db.execute(
+        select(
+            rollups.emotion,
+            rollups.intensity,
+            func.sum(rollups.count),
+            func.sum(rollups.polarity_sum),
+            func.sum(rollups.polarity_count),
+        )
+        .where(rollups.user_id == user_id, rollups.day >= first_full_day)
+        .group_by(rollups.emotion, rollups.intensity)
+    ).all()
+    rows += db.execute(
+        select(
+            records.primary_emotion,
+            records.primary_intensity,
+            func.count(),
+            func.sum(records.sentiment_polarity),
+            func.count(records.sentiment_polarity),
+        )
+        .where(
+            records.user_id == user_id,
+            records.timestamp >= since,
+            records.timestamp < datetime.combine(first_full_day, time.min),
+        )
+        .group_by(records.primary_emotion, records.primary_intensity)
+    ).all()
+
+    emotion_counts: Dict[str, int] = {}
+    intensity_counts: Dict[str, Dict[str, int]] = {}
+    polarity_sum = 0.0
+    polarity_count = 0
+    for emotion, intensity, count, p_sum, p_count in rows:
+        emotion_counts[emotion] = emotion_counts.get(emotion, 0) + count
+        by_intensity = intensity_counts.setdefault(emotion, {})
+        by_intensity[intensity] = by_intensity.get(intensity, 0) + count
+        polarity_sum += p_sum or 0.0
+        polarity_count += p_count or 0
+
+    return {
+        "total": sum(emotion_counts.values()),
+        "emotion_counts": emotion_counts,
+        "intensity_counts": intensity_counts,
+        "mean_polarity": round(polarity_sum / polarity_count, 3) if polarity_count else None,
+    }
+
+
+if __name__ == "__main__":
+    from .database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Maintain emotion_daily_rollups")
+    parser.add_argument("--rebuild", action="store_true", help="recompute rollups from emotion_records")
+    parser.add_argument("--user", type=int, default=None, help="limit the rebuild to one user id")
+    args = parser.parse_args()
+    if not args.rebuild:
+        parser.error("nothing to do (pass --rebuild)")
+
+    db = SessionLocal()
+    try:
+        count = rebuild(db, args.user)
+        db.commit()
+        print(f"Rebuilt {count} rollup rows")
+    finally:
+        db.close()
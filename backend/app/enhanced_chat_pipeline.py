@@ -8,11 +8,14 @@ Supports multiple AI personalities and long-term memory.
 
 import os
 import uuid
+import asyncio
 import logging
-from typing import Optional, List, Dict, Any
+from contextlib import asynccontextmanager
+from typing import Optional, List, Dict, Any, Callable, AsyncContextManager, Tuple
 import re
 import json
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta
 
 import sys
@@ -20,7 +23,11 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 from llm.ollama_model import OllamaMyMitraModel, PersonalityType
 from vector_memory import LongTermMemory
-from . import crud
+from . import crud, async_crud
+from .config import settings
+from .response_cache import response_cache
+from .semantic_cache import semantic_cache
+from .write_queue import write_queue
 from .mitra_core import mitra_core
 from .growth_engine import (
     build_growth_context_instruction,
@@ -48,16 +55,29 @@ class EnhancedChatPipeline:
         personality: Optional[str] = None,
         session_id: Optional[str] = None,
         soul_prompt: Optional[str] = None,
+        adb: Optional[AsyncSession] = None,
+        sessions: Optional[Callable[[], AsyncContextManager[Tuple[Session, AsyncSession]]]] = None,
     ) -> Dict[str, Any]:
-        """Get Mitra AI reply; store and use session-specific context when available."""
-        # Determine personality
-        personality_used = self._determine_personality(user_id, personality, db)
-        personality_type = self._string_to_personality_enum(personality_used)
-
+        """Get Mitra AI reply; store and use session-specific context when available.
+
+        Hot-path reads/writes (history, settings, growth stats, message insert)
+        go through the async session ``adb`` so the event loop is never blocked.
+        With a ``sessions`` factory (e.g. RequestHold.sessions) each database
+        step opens its own short (db, adb) scope instead of using ``db``/``adb``,
+        so no session is open while the model generates.
+        """
         # Build context (recent conversation for this session only)
         context_messages: List[Dict[str, str]] = []
-        if user_id and db:
-            context_messages = self._get_conversation_context(user_id, db, session_id=session_id)
+        settings_obj = None
+        async with self._session_scope(sessions, db, adb) as (db, adb):
+            personality_used = await self._resolve_personality(user_id, personality, adb)
+            if user_id and adb:
+                context_messages = await self._get_conversation_context(user_id, adb, session_id=session_id)
+                try:
+                    settings_obj = await async_crud.get_user_settings(adb, user_id)
+                except Exception as e:
+                    logger.error(f"Error loading user settings: {e}")
+        personality_type = self._string_to_personality_enum(personality_used)
 
         # Defaults (needed for caching path as well).
         depth_level = 1
@@ -71,11 +91,23 @@ class EnhancedChatPipeline:
         # Check cached response path for general FAQs
         normalized_q = self._normalize_question(user_input)
         cached = None
-        if db:
+        try:
+            # In-process LRU first; SQLite (query + decrypt) only on an LRU miss.
+            async with self._session_scope(sessions, db, adb) as (db, adb):
+                cached = await response_cache.aget(adb, normalized_q, personality_used)
+        except Exception:
+            cached = None
+
+        # Exact miss: try the nearest earlier question for this personality.
+        question_vector = None
+        if not cached and settings.SEMANTIC_CACHE_ENABLED and self.long_term_memory and normalized_q:
             try:
-                cached = crud.get_cached_response(db, normalized_q, personality_used)
-            except Exception:
-                cached = None
+                question_vector = await asyncio.to_thread(self._embed_question, normalized_q)
+                match = semantic_cache.get(personality_used, question_vector)
+                if match:
+                    cached = match[0]
+            except Exception as e:
+                logger.debug(f"Semantic cache lookup failed: {e}")
 
         if cached:
             ai_text = cached
@@ -94,7 +126,7 @@ class EnhancedChatPipeline:
             long_term_context: List[str] = []
             try:
                 if user_id and self.long_term_memory:
-                    long_term_context = self._get_memory_context(user_input, user_id, db)
+                    long_term_context = self._get_memory_context(user_input, user_id, settings_obj)
             except Exception:
                 long_term_context = []
 
@@ -116,11 +148,12 @@ class EnhancedChatPipeline:
             extra_system_instructions = core.get("extra_system_instructions")
 
             # Growth context: inject relationship arc into prompt so Mitra references the journey
-            if user_id and db:
+            if user_id and (adb or sessions is not None):
                 try:
-                    emotion_history = crud.get_recent_emotions(db, user_id, limit=20)
-                    chat_stats = crud.get_user_chat_stats(db, user_id)
-                    milestones = crud.get_user_milestones(db, user_id)
+                    async with self._session_scope(sessions, db, adb) as (db, adb):
+                        emotion_history = await async_crud.get_recent_emotions(adb, user_id, limit=20)
+                        chat_stats = await async_crud.get_user_chat_stats(adb, user_id)
+                        milestones = await async_crud.get_user_milestones(adb, user_id)
                     days_since = 0
                     first_chat = chat_stats.get("first_chat_at")
                     if first_chat:
@@ -142,12 +175,13 @@ class EnhancedChatPipeline:
                 except Exception:
                     pass
 
+            if user_id and (db or sessions is not None):
                 # Background milestone detection (fire-and-forget, no blocking)
                 try:
                     milestone = detect_milestone(user_input)
                     if milestone:
                         milestone["source_snippet"] = user_input[:200]
-                        crud.store_milestone(db, user_id, milestone)
+                        write_queue.submit(crud.add_milestone, user_id, milestone)
                 except Exception:
                     pass
 
@@ -158,6 +192,12 @@ class EnhancedChatPipeline:
                 else:
                     extra_system_instructions = soul_prompt
 
+            # The reads are done: end the caller's read transaction so no
+            # connection is held during the model call (expire_on_commit=False
+            # keeps settings_obj readable). Scoped sessions are already closed.
+            if sessions is None and adb:
+                await adb.commit()
+
             # Generate response via model with conversation and memory context
             ai_text = await self.model.generate_response(
                 user_input,
@@ -171,25 +211,29 @@ class EnhancedChatPipeline:
         # Persist conversation if authenticated and capture timestamp
         created_at_iso: Optional[str] = None
         try:
-            if user_id and db:
-                stored = self._store_conversation(db, user_id, user_input, ai_text, personality_used, session_id)
-                try:
-                    created_at_iso = stored.created_at.isoformat() if getattr(stored, 'created_at', None) else None
-                except Exception:
-                    created_at_iso = None
-
-                # Cache only non-personal replies (no memory context used).
-                if not memory_used and db:
+            async with self._session_scope(sessions, db, adb) as (db, adb):
+                if user_id and adb:
+                    stored = await self._store_conversation(adb, user_id, user_input, ai_text, personality_used, session_id)
                     try:
-                        crud.upsert_cached_response(db, normalized_q, personality_used, ai_text)
+                        created_at_iso = stored.created_at.isoformat() if getattr(stored, 'created_at', None) else None
                     except Exception:
-                        pass
-
-                # Update adaptive memory profiles (opt-in + rate-limited).
-                try:
-                    self._maybe_update_memory(user_id, user_input, ai_text, db, identity_profile, intent, emotion)
-                except Exception as e:
-                    logger.error(f"Memory update failed: {e}")
+                        created_at_iso = None
+
+                    # Cache only non-personal replies (no memory context used).
+                    # Write-behind: the cache writer persists it in the next batched flush.
+                    if not memory_used and not cached:
+                        try:
+                            response_cache.put(normalized_q, personality_used, ai_text)
+                            if question_vector is not None:
+                                semantic_cache.put(personality_used, normalized_q, question_vector, ai_text)
+                        except Exception:
+                            pass
+
+                    # Update adaptive memory profiles (opt-in + rate-limited).
+                    try:
+                        self._maybe_update_memory(user_id, user_input, ai_text, db, identity_profile, intent, emotion, settings_obj=settings_obj)
+                    except Exception as e:
+                        logger.error(f"Memory update failed: {e}")
         except Exception as e:
             logger.error(f"Conversation store failed: {e}")
 
@@ -229,6 +273,33 @@ class EnhancedChatPipeline:
             {"type": "mitra", "name": "Mitra", "description": "Warm, wise, friendly companion"},
         ]
 
+    @asynccontextmanager
+    async def _given_sessions(self, db, adb):
+        yield db, adb
+
+    def _session_scope(self, sessions, db, adb):
+        """A fresh (db, adb) scope from ``sessions`` when given, else the caller's pair."""
+        return sessions() if sessions is not None else self._given_sessions(db, adb)
+
+    async def _resolve_personality(
+        self,
+        user_id: Optional[int],
+        requested_personality: Optional[str],
+        adb: Optional[AsyncSession],
+    ) -> str:
+        """Async form of _determine_personality (reads the preference through ``adb``)."""
+        if requested_personality and requested_personality in ["default", "mentor", "motivator", "coach", "mitra"]:
+            return requested_personality
+        if user_id and adb:
+            try:
+                preferred = await async_crud.get_preferred_personality(adb, user_id)
+            except Exception as e:
+                logger.error(f"Error loading personality preference: {e}")
+                preferred = None
+            if preferred:
+                return preferred
+        return "default"
+
     def _determine_personality(
         self, 
         user_id: Optional[int], 
@@ -261,15 +332,15 @@ class EnhancedChatPipeline:
         }
         return mapping.get(personality_str, PersonalityType.DEFAULT)
     
-    def _get_conversation_context(self, user_id: int, db: Session, session_id: Optional[str] = None) -> List[Dict[str, str]]:
+    async def _get_conversation_context(self, user_id: int, db: AsyncSession, session_id: Optional[str] = None) -> List[Dict[str, str]]:
         """Get recent conversation history for context, scoped to session if provided."""
         try:
-            return crud.get_recent_chat_history(db, user_id, limit=8, session_id=session_id)
+            return await async_crud.get_recent_chat_history(db, user_id, limit=8, session_id=session_id)
         except Exception as e:
             logger.error(f"Error getting conversation context: {e}")
             return []
     
-    def _get_memory_context(self, user_input: str, user_id: int, db: Session) -> List[str]:
+    def _get_memory_context(self, user_input: str, user_id: int, settings_obj) -> List[str]:
         """Get relevant long-term memories for context."""
         if not self.long_term_memory:
             return []
@@ -277,7 +348,7 @@ class EnhancedChatPipeline:
         try:
             # Retrieve relevant memories based on user input and user opt-ins.
             # Mental health inference is explicitly excluded by consent model.
-            allowed_categories = self._get_allowed_memory_categories(user_id, db)
+            allowed_categories = self._allowed_categories_for(settings_obj)
             memories = self.long_term_memory.retrieve_memories(
                 user_input,
                 user_id,
@@ -289,9 +360,9 @@ class EnhancedChatPipeline:
             logger.error(f"Error getting memory context: {e}")
             return []
     
-    def _store_conversation(
+    async def _store_conversation(
         self,
-        db: Session,
+        db: AsyncSession,
         user_id: int,
         user_message: str,
         ai_response: str,
@@ -304,8 +375,9 @@ class EnhancedChatPipeline:
             if not session_id:
                 session_id = str(uuid.uuid4())
             
-            db_msg = crud.create_chat_message(
-                db=db,
+            # Group-committed by the single SQLite writer alongside other turns' writes.
+            db_msg = await write_queue.run(
+                crud.add_chat_message,
                 user_id=user_id,
                 message=user_message,
                 response=ai_response,
@@ -322,7 +394,14 @@ class EnhancedChatPipeline:
         if not db:
             # If we can't read settings, fail safe by returning none.
             return []
-        settings_obj = crud.get_user_settings(db, user_id)
+        return self._allowed_categories_for(crud.get_user_settings(db, user_id))
+
+    @staticmethod
+    def _allowed_categories_for(settings_obj) -> List[str]:
+        """Map a UserSettings row to the memory categories the user opted into."""
+        if settings_obj is None:
+            # If we can't read settings, fail safe by returning none.
+            return []
         allowed: List[str] = []
         if getattr(settings_obj, "enable_long_term_memory", True):
             if getattr(settings_obj, "allow_preference_learning", True):
@@ -343,12 +422,14 @@ class EnhancedChatPipeline:
         identity_profile: Optional[Dict[str, Any]] = None,
         intent: str = "general_support",
         emotion: Optional[Dict[str, Any]] = None,
+        settings_obj=None,
     ) -> None:
         """Store lightweight structured memories based on user opt-in and heuristics."""
         if not self.long_term_memory:
             return
 
-        settings_obj = crud.get_user_settings(db, user_id)
+        if settings_obj is None:
+            settings_obj = crud.get_user_settings(db, user_id)
         if not getattr(settings_obj, "enable_long_term_memory", True):
             return
 
@@ -381,7 +462,7 @@ class EnhancedChatPipeline:
                             memory_type="preference_memory",
                             memory_category="preference",
                         )
-                        crud.update_memory_rate_limit_timestamps(db, user_id, update_preference_at=now)
+                        write_queue.submit(crud.set_memory_rate_limit_timestamps, user_id, update_preference_at=now)
 
         # Routine memory
         if getattr(settings_obj, "allow_routine_tracking", True):
@@ -397,7 +478,7 @@ class EnhancedChatPipeline:
                             memory_type="routine_memory",
                             memory_category="routine",
                         )
-                        crud.update_memory_rate_limit_timestamps(db, user_id, update_routine_at=now)
+                        write_queue.submit(crud.set_memory_rate_limit_timestamps, user_id, update_routine_at=now)
 
         # Identity memory (derived behavioral profile)
         if getattr(settings_obj, "allow_preference_learning", True) and identity_profile:
@@ -426,7 +507,7 @@ class EnhancedChatPipeline:
                         memory_type="identity_snapshot",
                         memory_category="identity",
                     )
-                    crud.update_memory_rate_limit_timestamps(db, user_id, update_preference_at=now)
+                    write_queue.submit(crud.set_memory_rate_limit_timestamps, user_id, update_preference_at=now)
 
     def _normalize_question(self, text: str) -> str:
         """Normalize question text for cache key: lowercase, strip punctuation, collapse spaces."""
@@ -439,6 +520,10 @@ class EnhancedChatPipeline:
         cleaned = re.sub(r"\s+", " ", cleaned).strip()
         return cleaned
 
+    def _embed_question(self, normalized_q: str):
+        """Embed a normalized question with the long-term memory's sentence transformer."""
+        return self.long_term_memory.embedding_function([normalized_q])[0]
+
     def _estimate_conversation_depth(self, user_input: str, recent_messages: List[Dict[str, str]]) -> int:
         """Heuristic to estimate conversation depth level (1-5) for adaptive latency."""
         try:
@@ -7,9 +7,10 @@ from datetime import datetime
 from typing import Optional, List
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from fastapi.security import OAuth2PasswordBearer
-from .database import get_db
+from .database import get_db, get_async_db
 from . import security as _security
 from .growth_engine import (
     build_relationship_arc,
@@ -17,7 +18,7 @@ from .growth_engine import (
     detect_topics,
     detect_valence,
 )
-from . import crud
+from . import crud, async_crud
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/growth", tags=["growth"])
@@ -33,7 +34,7 @@ async def _require_user(token: str = Depends(_oauth2), db=Depends(get_db)):
 
 @router.get("/arc")
 async def get_relationship_arc(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user=Depends(_require_user),
 ):
     """Get the user's relationship arc with Mitra."""
@@ -43,7 +44,7 @@ async def get_relationship_arc(
         # Get emotion history
         emotion_records = []
         try:
-            emotion_records = crud.get_recent_emotions(db, user_id, limit=30)
+            emotion_records = await async_crud.get_recent_emotions(db, user_id, limit=30)
         except Exception:
             pass
 
@@ -51,7 +52,7 @@ async def get_relationship_arc(
         message_count = 0
         days_since_first = 0
         try:
-            stats = crud.get_user_chat_stats(db, user_id)
+            stats = await async_crud.get_user_chat_stats(db, user_id)
             message_count = stats.get("total_messages", 0)
             first_chat = stats.get("first_chat_at")
             if first_chat:
@@ -64,7 +65,7 @@ async def get_relationship_arc(
         # Get stored milestones (fall back gracefully if table doesn't exist)
         milestones = []
         try:
-            milestones = crud.get_user_milestones(db, user_id)
+            milestones = await async_crud.get_user_milestones(db, user_id)
         except Exception:
             pass
 
@@ -95,7 +96,7 @@ async def get_relationship_arc(
 
 @router.get("/topics")
 async def get_topic_history(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user=Depends(_require_user),
 ):
     """Get topics the user has discussed and their emotional journey through each."""
@@ -104,7 +105,7 @@ async def get_topic_history(
         topic_history = {}
 
         # Get recent messages and analyze topics + valence
-        messages = crud.get_recent_chat_history(db, user_id, limit=50)
+        messages = await async_crud.get_recent_chat_history(db, user_id, limit=50)
 
         for msg in messages:
             content = msg.get("content", "")
@@ -0,0 +1,92 @@
+"""
+Compact habit completion log.
+
+Each habit keeps one row per calendar year holding a 366-bit day bitmap
+(46 bytes; bit ``n`` = day-of-year ``n + 1``). Several years are stitched into
+a single Python int indexed by day ordinal, so streaks and completion rates
+are a handful of whole-bitmap shifts and masks rather than per-row loops.
+"""
+
+from datetime import date
+from typing import Dict, Iterable, List, Optional
+
+YEAR_BYTES = 46  # ceil(366 / 8)
+
+
+def day_index(day: date) -> int:
+    """Bit position of ``day`` inside its year's bitmap."""
+    return day.timetuple().tm_yday - 1
+
+
+def set_day(bitmap: Optional[bytes], day: date) -> bytes:
+    """Return ``bitmap`` with ``day`` marked as completed."""
+    bits = int.from_bytes(bitmap or b"", "little") | (1 << day_index(day))
+    return bits.to_bytes(YEAR_BYTES, "little")
+
+
+def year_days(bitmap: Optional[bytes]) -> List[int]:
+    """Completed days of a year bitmap as 1-based day-of-year numbers."""
+    bits = int.from_bytes(bitmap or b"", "little")
+    days = []
+    while bits:
+        low = bits & -bits
+        days.append(low.bit_length())
+        bits ^= low
+    return days
+
+
+def combine(years: Dict[int, bytes], origin: date) -> int:
+    """Merge ``{year: bitmap}`` into one int where bit ``n`` is ``origin + n days``.
+    Days before ``origin`` are dropped."""
+    bits = 0
+    base = origin.toordinal()
+    for year, bitmap in years.items():
+        offset = date(year, 1, 1).toordinal() - base
+        year_bits = int.from_bytes(bitmap or b"", "little")
+        bits |= year_bits << offset if offset >= 0 else year_bits >> -offset
+    return bits
+
+
+def _count(bits: int) -> int:
+    return bin(bits).count("1")
+
+
+def current_streak(bits: int, today_index: int) -> int:
+    """Consecutive completed days ending today (or yesterday, if today is still open)."""
+    start = today_index if (bits >> today_index) & 1 else today_index - 1
+    if start < 0 or not (bits >> start) & 1:
+        return 0
+    gaps = ~bits & ((1 << (start + 1)) - 1)
+    return start + 1 - gaps.bit_length()
+
+
+def longest_streak(bits: int) -> int:
+    """Longest run of consecutive completed days."""
+    run = 0
+    while bits:
+        bits &= bits >> 1
+        run += 1
+    return run
+
+
+def completion_rate(bits: int, today_index: int, window: int) -> float:
+    """Percentage of the last ``window`` days (including today) completed."""
+    start = max(0, today_index - window + 1)
+    span = today_index - start + 1
+    done = _count((bits >> start) & ((1 << span) - 1))
+    return round(done / window * 100, 1)
+
+
+def summarize(years: Dict[int, bytes], today: date, windows: Iterable[int] = (7, 30, 90)) -> dict:
+    """Streaks and rolling completion rates for one habit."""
+    origin = date(min(years), 1, 1) if years else today
+    bits = combine(years, origin)
+    today_index = today.toordinal() - origin.toordinal()
+    summary = {
+        "current_streak": current_streak(bits, today_index),
+        "longest_streak": longest_streak(bits),
+        "total_completions": _count(bits),
+    }
+    for window in windows:
+        summary[f"rate_{window}d"] = completion_rate(bits, today_index, window)
+    return summary
@@ -227,6 +227,14 @@ def detect_emotion_pattern(
             emo = record.get("emotion", "neutral")
             emotion_counts[emo] = emotion_counts.get(emo, 0) + 1
 
+    return pattern_from_counts(emotion_counts)
+
+
+def pattern_from_counts(emotion_counts: Dict[str, int]) -> Optional[Dict[str, Any]]:
+    """
+    Same pattern detection as detect_emotion_pattern, from precomputed
+    per-emotion counts for the last 7 days (e.g. emotion rollups).
+    """
     if not emotion_counts:
         return None
 
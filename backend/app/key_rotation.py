@@ -0,0 +1,293 @@
+"""
+Online re-encryption under the current key (key rotation).
+
+Every stored ciphertext records the key it was written with: binary fields
+carry a key-id byte (format v3; v2 and legacy values are key 0),
+encrypt_data text a "k<id>:" prefix, and chat_archive blobs are matched by
+trying each key. To rotate, set ENCRYPTION_KEY to the new key with a new
+ENCRYPTION_KEY_ID and list the previous one in ENCRYPTION_OLD_KEYS. New
+writes use the new key at once, old values stay readable, and this job
+re-encrypts the old values in the background:
+
+* each table is walked in id order, KEY_ROTATION_BATCH_SIZE rows per
+  transaction, paced to KEY_ROTATION_ROWS_PER_SEC rows scanned;
+* a row is only updated if its ciphertext is unchanged since it was read,
+  so concurrent writes are never overwritten;
+* progress is checkpointed per database file and table after every batch
+  (``key_rotation_checkpoints`` on the main database), so a restart resumes
+  where the last run stopped. A checkpoint for an earlier key id is ignored.
+
+Chroma documents are rotated the same way, paged by offset, keeping their
+embeddings. Values that fail to decrypt are left as they are (and
+counted). Once a pass reports nothing left under old keys, the old key can
+be dropped from ENCRYPTION_OLD_KEYS (unless it is ENCRYPTION_SEARCH_KEY_ID).
+A pass that ends with no failures records a completion checkpoint for the
+current key, and the startup worker skips rotation from then on. The search
+key stays configured, so the number of keys alone never says when rotation
+is done. Setting a new key id, or running with --restart, starts it again.
+
+Usage:
+    python -m app.key_rotation            # run (resumes from checkpoints)
+    python -m app.key_rotation --status   # show checkpoints
+    python -m app.key_rotation --restart  # forget checkpoints, then run
+"""
+
+import asyncio
+import logging
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import bindparam, delete, insert, select, update
+from sqlalchemy.engine import Engine
+
+import encryption_utils
+
+from . import chat_archive, models, shards
+from .cipher_migration import ENCRYPTED_COLUMNS
+from .config import settings
+from .database import engine
+
+logger = logging.getLogger(__name__)
+
+# How a column's values are encrypted
+FIELD = "field"  # encrypt_field (binary, self-describing key id)
+TEXT = "text"    # encrypt_data (base64 text, optional key prefix)
+BLOB = "blob"    # chat archive payload (encrypt_bytes frames, no key id)
+
+ROTATED_COLUMNS: Dict[str, Tuple[Tuple[str, str], ...]] = {
+    **{table: tuple((name, FIELD) for name in columns) for table, columns in ENCRYPTED_COLUMNS.items()},
+    "emotion_records": (("source_text", TEXT),),
+    "chat_archive": (("payload", BLOB),),
+}
+
+CHROMA_TARGET = "chroma"
+COMPLETE_TARGET = "complete"
+CHROMA_COLLECTION = "mymitra_memory"
+
+_checkpoints = models.KeyRotationCheckpoint.__table__
+
+
+def rekey(value, kind: str = FIELD):
+    """``value`` re-encrypted under the current key, or None if it already is."""
+    current = encryption_utils.KEY_ID
+    if kind == BLOB:
+        return chat_archive.rekey(value)
+    if encryption_utils.key_id_of(value) == current:
+        return None
+    if kind == TEXT:
+        return encryption_utils.encrypt_data(encryption_utils.decrypt_data(value))
+    return encryption_utils.encrypt_field(encryption_utils.decrypt_field(value))
+
+
+def _rewrite(row, columns) -> Tuple[Optional[dict], int]:
+    """Update parameters for one row (None when nothing needs rewriting)
+    and the number of values that failed to decrypt."""
+    params = {"_id": row.id}
+    changed = False
+    failed = 0
+    for name, kind in columns:
+        value = getattr(row, name)
+        params[f"_old_{name}"] = params[name] = value
+        if value is None:
+            continue
+        try:
+            new_value = rekey(value, kind)
+        except Exception:
+            failed += 1
+            continue
+        if new_value is not None:
+            params[name] = new_value
+            changed = True
+    return (params if changed else None), failed
+
+
+def load_checkpoint(checkpoints: Engine, target: str, table_name: str) -> int:
+    """Where to resume: the last id done under the current key (0 = start over)."""
+    with checkpoints.connect() as conn:
+        row = conn.execute(
+            select(_checkpoints.c.key_id, _checkpoints.c.last_id)
+            .where(_checkpoints.c.target == target, _checkpoints.c.table_name == table_name)
+        ).first()
+    return row.last_id if row is not None and row.key_id == encryption_utils.KEY_ID else 0
+
+
+def save_checkpoint(checkpoints: Engine, target: str, table_name: str,
+                    last_id: int, scanned: int, rewritten: int) -> None:
+    values = {
+        "key_id": encryption_utils.KEY_ID,
+        "last_id": last_id,
+        "rows_scanned": scanned,
+        "rows_rewritten": rewritten,
+    }
+    with checkpoints.begin() as conn:
+        updated = conn.execute(
+            update(_checkpoints)
+            .where(_checkpoints.c.target == target, _checkpoints.c.table_name == table_name)
+            .values(values)
+        ).rowcount
+        if not updated:
+            conn.execute(insert(_checkpoints).values(target=target, table_name=table_name, **values))
+
+
+class _Throttle:
+    """Paces batches so that no more than ``rows_per_sec`` rows are scanned per second (0 = unpaced)."""
+
+    def __init__(self, rows_per_sec: float):
+        self.rows_per_sec = rows_per_sec
+        self.started = time.monotonic()
+
+    def wait(self, rows: int) -> None:
+        if self.rows_per_sec > 0:
+            time.sleep(max(0.0, rows / self.rows_per_sec - (time.monotonic() - self.started)))
+        self.started = time.monotonic()
+
+
+def rotate_table(bind: Engine, table_name: str, columns, *, checkpoints: Engine, target: str = "main",
+                 batch_size: int = 200, rows_per_sec: float = 0) -> Tuple[int, int, int]:
+    """Re-encrypt one table from its checkpoint on. Returns (rows scanned, rows rewritten, values failed)."""
+    table = models.Base.metadata.tables[table_name]
+    cols = [table.c[name] for name, _ in columns]
+    stmt = (
+        update(table)
+        .where(table.c.id == bindparam("_id"), *[c.is_not_distinct_from(bindparam(f"_old_{c.name}")) for c in cols])
+        .values({c.name: bindparam(c.name) for c in cols})
+    )
+    scanned = rewritten = failed = 0
+    after_id = load_checkpoint(checkpoints, target, table_name)
+    throttle = _Throttle(rows_per_sec)
+    while True:
+        with bind.begin() as conn:
+            rows = conn.execute(
+                select(table.c.id, *cols).where(table.c.id > after_id).order_by(table.c.id).limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            batch: List[dict] = []
+            for row in rows:
+                params, row_failed = _rewrite(row, columns)
+                failed += row_failed
+                if params is not None:
+                    batch.append(params)
+            if batch:
+                rewritten += conn.execute(stmt, batch).rowcount
+        after_id = rows[-1].id
+        scanned += len(rows)
+        save_checkpoint(checkpoints, target, table_name, after_id, scanned, rewritten)
+        throttle.wait(len(rows))
+    return scanned, rewritten, failed
+
+
+def rotate_documents(*, checkpoints: Engine, batch_size: int = 200, rows_per_sec: float = 0,
+                     collection_name: str = CHROMA_COLLECTION,
+                     persist_directory: str = "./chroma_db") -> Tuple[int, int, int]:
+    """Re-encrypt the Chroma memory documents. Returns (scanned, rewritten, failed)."""
+    try:
+        import vector_memory
+    except ImportError:
+        return 0, 0, 0  # chromadb not installed, so nothing was stored
+
+    failed = 0
+
+    def rekey_document(doc):
+        nonlocal failed
+        try:
+            return rekey(doc, TEXT)
+        except Exception:
+            failed += 1
+            return None
+
+    scanned = rewritten = 0
+    offset = load_checkpoint(checkpoints, CHROMA_TARGET, collection_name)
+    throttle = _Throttle(rows_per_sec)
+    while True:
+        read, changed = vector_memory.reencrypt_documents(
+            rekey_document, offset, batch_size, collection_name, persist_directory,
+        )
+        if not read:
+            break
+        offset += read
+        scanned += read
+        rewritten += changed
+        save_checkpoint(checkpoints, CHROMA_TARGET, collection_name, offset, scanned, rewritten)
+        throttle.wait(read)
+    return scanned, rewritten, failed
+
+
+def rotate(bind: Engine = engine, include_documents: bool = True) -> dict:
+    """Re-encrypt everything still under an old key: main database, shard files, Chroma."""
+    targets = [("main", bind, tuple(ROTATED_COLUMNS))]
+    if shards.enabled():
+        sharded = tuple(name for name in ROTATED_COLUMNS if name in shards.SHARDED_TABLES)
+        targets += [(f"shard_{shard:03d}", shard_engine, sharded) for shard, shard_engine in shards.router.all_engines()]
+    pacing = {"batch_size": settings.KEY_ROTATION_BATCH_SIZE, "rows_per_sec": settings.KEY_ROTATION_ROWS_PER_SEC}
+
+    report = {"key_id": encryption_utils.KEY_ID, "rows_scanned": 0, "rows_rewritten": 0, "values_failed": 0}
+
+    def add(counts):
+        report["rows_scanned"] += counts[0]
+        report["rows_rewritten"] += counts[1]
+        report["values_failed"] += counts[2]
+
+    for target, target_engine, table_names in targets:
+        for table_name in table_names:
+            add(rotate_table(target_engine, table_name, ROTATED_COLUMNS[table_name],
+                             checkpoints=bind, target=target, **pacing))
+    if include_documents:
+        add(rotate_documents(checkpoints=bind, **pacing))
+    if not report["values_failed"]:
+        save_checkpoint(bind, COMPLETE_TARGET, COMPLETE_TARGET, 1, report["rows_scanned"], report["rows_rewritten"])
+    return report
+
+
+def completed(checkpoints: Engine = engine) -> bool:
+    """Whether a pass under the current key finished with every value rewritten."""
+    return load_checkpoint(checkpoints, COMPLETE_TARGET, COMPLETE_TARGET) > 0
+
+
+def status(checkpoints: Engine = engine) -> List[dict]:
+    with checkpoints.connect() as conn:
+        rows = conn.execute(select(_checkpoints).order_by(_checkpoints.c.target, _checkpoints.c.table_name)).all()
+    return [
+        {
+            "target": r.target,
+            "table": r.table_name,
+            "key_id": r.key_id,
+            "last_id": r.last_id,
+            "rows_scanned": r.rows_scanned,
+            "rows_rewritten": r.rows_rewritten,
+            "updated_at": r.updated_at.isoformat() if r.updated_at else None,
+        }
+        for r in rows
+    ]
+
+
+def reset(checkpoints: Engine = engine) -> None:
+    """Forget all progress, so the next run rescans every row."""
+    with checkpoints.begin() as conn:
+        conn.execute(delete(_checkpoints))
+
+
+async def key_rotation_worker():
+    """Run one rotation pass in the background (started with the app) while
+    old keys are configured and no pass under the current key has completed."""
+    if len(encryption_utils.KEYS) < 2:
+        return
+    try:
+        if await asyncio.to_thread(completed):
+            return
+        report = await asyncio.to_thread(rotate)
+        logger.info(f"Key rotation: {report}")
+    except Exception as e:
+        logger.warning(f"Key rotation failed: {e}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    if "--status" in sys.argv:
+        for entry in status():
+            print(entry)
+        sys.exit(0)
+    if "--restart" in sys.argv:
+        reset()
+    print(rotate())
@@ -10,7 +10,8 @@ import logging
 import sys
 
 from . import models
-from .database import engine
+from .database import engine, describe_engine
+from .migrations import run_migrations
 from .routes import router
 from .routers.emotions import router as emotions_router
 from .config import settings
@@ -29,54 +30,6 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
-# Ensure DB schema is up to date (add missing columns and performance indexes)
-def ensure_db_schema():
-    try:
-        from .database import engine
-        with engine.begin() as conn:
-            cols = [row[1] for row in conn.exec_driver_sql("PRAGMA table_info(users)").fetchall()]
-            if "preferred_personality" not in cols:
-                conn.exec_driver_sql("ALTER TABLE users ADD COLUMN preferred_personality TEXT DEFAULT 'default'")
-            if "role" not in cols:
-                conn.exec_driver_sql("ALTER TABLE users ADD COLUMN role TEXT DEFAULT 'user'")
-            if "is_active" not in cols:
-                conn.exec_driver_sql("ALTER TABLE users ADD COLUMN is_active INTEGER DEFAULT 1")
-            if "created_at" not in cols:
-                conn.exec_driver_sql("ALTER TABLE users ADD COLUMN created_at DATETIME DEFAULT CURRENT_TIMESTAMP")
-
-            # Create helpful indexes for chat performance (safe with IF NOT EXISTS)
-            conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS idx_chat_messages_session_id ON chat_messages(session_id)")
-            conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS idx_chat_messages_user_session_created ON chat_messages(user_id, session_id, created_at)")
-
-            # Ensure user_settings columns exist (adaptive memory opt-in flags).
-            user_settings_cols = [row[1] for row in conn.exec_driver_sql("PRAGMA table_info(user_settings)").fetchall()]
-            if "allow_routine_tracking" not in user_settings_cols:
-                conn.exec_driver_sql("ALTER TABLE user_settings ADD COLUMN allow_routine_tracking INTEGER DEFAULT 1")
-            if "allow_preference_learning" not in user_settings_cols:
-                conn.exec_driver_sql("ALTER TABLE user_settings ADD COLUMN allow_preference_learning INTEGER DEFAULT 1")
-            if "allow_mental_health_inference" not in user_settings_cols:
-                conn.exec_driver_sql("ALTER TABLE user_settings ADD COLUMN allow_mental_health_inference INTEGER DEFAULT 0")
-            if "last_preference_memory_at" not in user_settings_cols:
-                conn.exec_driver_sql("ALTER TABLE user_settings ADD COLUMN last_preference_memory_at DATETIME NULL")
-            if "last_routine_memory_at" not in user_settings_cols:
-                conn.exec_driver_sql("ALTER TABLE user_settings ADD COLUMN last_routine_memory_at DATETIME NULL")
-
-            # Growth milestones table
-            conn.exec_driver_sql("""
-                CREATE TABLE IF NOT EXISTS growth_milestones (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL REFERENCES users(id),
-                    milestone_type TEXT NOT NULL,
-                    recognition TEXT,
-                    source_snippet TEXT,
-                    weight INTEGER DEFAULT 2,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS idx_growth_milestones_user ON growth_milestones(user_id)")
-    except Exception as e:
-        logger.warning(f"Schema check failed: {e}")
-
 # Initialize FastAPI app
 app = FastAPI(title="My Mitra: Builder's Redemption", version="2.0.0")
 
@@ -87,13 +40,28 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
-# Create tables
-models.Base.metadata.create_all(bind=engine)
-
-# Ensure schema adjustments
-ensure_db_schema()
+# Create tables / apply pending schema migrations (a single SELECT when current)
+try:
+    schema_version = run_migrations(engine)
+    logger.info(f"Database schema version {schema_version}")
+except Exception as e:
+    logger.warning(f"Schema migration failed: {e}")
+
+# Fill new derived tables from existing history after boot, in small commits
+@app.on_event("startup")
+async def start_backfills():
+    from .migrations import backfill_worker
+    import asyncio
+    asyncio.create_task(backfill_worker(engine))
+
+# Report the active engine profile so WAL/pool settings can be confirmed at boot
+try:
+    logger.info(f"Database engine profile: {describe_engine()}")
+except Exception as e:
+    logger.warning(f"Could not read database engine profile: {e}")
 
 # Include API routes
 app.include_router(router, prefix="/api/v1")
@@ -133,6 +101,63 @@ app.include_router(growth_router, prefix="/api/v1")
 from .voice_routes import router as voice_router
 app.include_router(voice_router, prefix="/api/v1")
 
+# Background refresh of the admin dashboard stats snapshot
+@app.on_event("startup")
+async def start_admin_stats_worker():
+    from .admin_routes import stats_snapshot_worker
+    import asyncio
+    asyncio.create_task(stats_snapshot_worker())
+
+# Background retention enforcement (throttled purges + incremental vacuum)
+@app.on_event("startup")
+async def start_retention_worker():
+    from .retention import retention_worker
+    import asyncio
+    asyncio.create_task(retention_worker())
+
+# Response cache write-behind flusher
+@app.on_event("startup")
+async def start_response_cache_writer():
+    from .response_cache import response_cache_writer
+    import asyncio
+    asyncio.create_task(response_cache_writer())
+
+@app.on_event("shutdown")
+async def flush_response_cache_on_shutdown():
+    from .response_cache import flush_response_cache
+    try:
+        flush_response_cache()
+    except Exception as e:
+        logger.warning(f"Response cache flush on shutdown failed: {e}")
+
+# Single SQLite writer (group commit); drained after the cache flush above
+@app.on_event("startup")
+async def start_write_queue():
+    from .write_queue import write_queue
+    if settings.WRITE_QUEUE_ENABLED:
+        write_queue.start()
+
+@app.on_event("shutdown")
+async def stop_write_queue():
+    from .write_queue import write_queue
+    write_queue.stop(timeout=10)
+
+# One background pass rewriting legacy ciphertext into the binary format
+@app.on_event("startup")
+async def start_cipher_migration():
+    from .cipher_migration import cipher_migration_worker
+    import asyncio
+    if settings.CIPHER_MIGRATION_ENABLED:
+        asyncio.create_task(cipher_migration_worker())
+
+# Throttled, checkpointed re-encryption under the current key (only while old keys are configured)
+@app.on_event("startup")
+async def start_key_rotation():
+    from .key_rotation import key_rotation_worker
+    import asyncio
+    if settings.KEY_ROTATION_ENABLED:
+        asyncio.create_task(key_rotation_worker())
+
 # Root endpoint
 @app.get("/")
 def root():
@@ -0,0 +1,322 @@
+"""
+Versioned schema migrations for My Mitra.
+
+The applied version lives in a one-row ``schema_version`` table. On boot,
+run_migrations() issues a single SELECT; when the schema is current nothing
+else runs (no PRAGMA introspection, no DDL). Pending migrations are applied
+in order, each in its own transaction that also bumps the version.
+
+Adding a migration: append a function to MIGRATIONS. Never reorder an
+entry that has shipped, or change the schema it produces. Migrations must be idempotent (IF NOT EXISTS,
+checkfirst=True) because a fresh database gets every table from version 1.
+
+Migrations only change the schema. Filling a new derived table from
+existing history (decrypting every chat, say) would hold the SQLite write
+lock and block boot for as long as it takes, so a migration queues a named
+backfill in ``pending_backfills`` instead; run_backfills() performs it
+after startup, one user per commit with a pause in between.
+
+Usage:
+    python -m app.migrations            # apply pending migrations
+    python -m app.migrations --status   # print current/latest version
+    python -m app.migrations --backfill # run queued backfills now
+"""
+
+import asyncio
+import logging
+import sys
+import time
+from typing import Callable, Dict, List, Tuple
+
+from sqlalchemy import select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+from .database import IS_SQLITE, Base
+
+logger = logging.getLogger(__name__)
+
+
+def _columns(conn: Connection, table: str) -> List[str]:
+    return [row[1] for row in conn.exec_driver_sql(f"PRAGMA table_info({table})").fetchall()]
+
+
+def _add_missing_columns(conn: Connection, table: str, columns: List[Tuple[str, str]]) -> None:
+    existing = _columns(conn, table)
+    for name, ddl in columns:
+        if name not in existing:
+            conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}")
+
+
+def _m001_baseline(conn: Connection) -> None:
+    """Create all tables and bring pre-migration SQLite databases up to date."""
+    from . import models  # noqa: F401  (register every table on Base.metadata)
+
+    Base.metadata.create_all(bind=conn)
+    if not IS_SQLITE:
+        return
+    _add_missing_columns(conn, "users", [
+        ("preferred_personality", "TEXT DEFAULT 'default'"),
+        ("role", "TEXT DEFAULT 'user'"),
+        ("is_active", "INTEGER DEFAULT 1"),
+        ("created_at", "DATETIME DEFAULT CURRENT_TIMESTAMP"),
+    ])
+    _add_missing_columns(conn, "user_settings", [
+        ("allow_routine_tracking", "INTEGER DEFAULT 1"),
+        ("allow_preference_learning", "INTEGER DEFAULT 1"),
+        ("allow_mental_health_inference", "INTEGER DEFAULT 0"),
+        ("last_preference_memory_at", "DATETIME NULL"),
+        ("last_routine_memory_at", "DATETIME NULL"),
+    ])
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS idx_chat_messages_session_id ON chat_messages(session_id)")
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS idx_chat_messages_user_session_created ON chat_messages(user_id, session_id, created_at)")
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS idx_growth_milestones_user ON growth_milestones(user_id)")
+
+
+def _m002_habits_archived(conn: Connection) -> None:
+    """Habit.archived (formerly the one-off migrate_habits.py script)."""
+    if IS_SQLITE:
+        _add_missing_columns(conn, "habits", [("archived", "BOOLEAN DEFAULT 0")])
+
+
+def _m003_backfill_chat_sessions(conn: Connection) -> None:
+    """chat_sessions rows for existing conversations (filled by a backfill)."""
+    _queue_backfill(conn, "chat_sessions")
+
+
+def _m004_composite_indexes(conn: Connection) -> None:
+    """Composite indexes for the per-turn (user_id, time) lookups."""
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS idx_emotion_records_user_timestamp ON emotion_records(user_id, timestamp)")
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS idx_journals_user_created ON journals(user_id, created_at)")
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS idx_growth_milestones_user_created ON growth_milestones(user_id, created_at)")
+
+
+def _m005_user_stats(conn: Connection) -> None:
+    """user_stats counters (seeded from the existing rows by a backfill)."""
+    from . import models
+
+    models.UserStats.__table__.create(conn, checkfirst=True)
+    _queue_backfill(conn, "user_stats")
+
+
+def _m006_habit_completion_years(conn: Connection) -> None:
+    """Per-year habit completion bitmaps (seeded from current streaks by a backfill)."""
+    from . import models
+
+    models.HabitCompletionYear.__table__.create(conn, checkfirst=True)
+    _queue_backfill(conn, "habit_completions")
+
+
+def _queue_backfill(conn: Connection, name: str) -> None:
+    """Record a backfill for run_backfills() (idempotent)."""
+    conn.exec_driver_sql("CREATE TABLE IF NOT EXISTS pending_backfills (name VARCHAR PRIMARY KEY)")
+    queued = conn.execute(text("SELECT 1 FROM pending_backfills WHERE name = :n"), {"n": name}).scalar()
+    if not queued:
+        conn.execute(text("INSERT INTO pending_backfills (name) VALUES (:n)"), {"n": name})
+
+
+def _m007_emotion_daily_rollups(conn: Connection) -> None:
+    """Daily emotion rollups (rebuilt from emotion_records by a backfill)."""
+    from . import models
+
+    models.EmotionDailyRollup.__table__.create(conn, checkfirst=True)
+    _queue_backfill(conn, "emotion_rollups")
+
+
+def _m008_search_postings(conn: Connection) -> None:
+    """Blind-token search index (chats and journals indexed by a backfill)."""
+    from . import models
+
+    models.SearchPosting.__table__.create(conn, checkfirst=True)
+    _queue_backfill(conn, "search_postings")
+
+
+def _m009_chat_archive(conn: Connection) -> None:
+    """Cold archive tier for old chat messages (filled by the retention pass)."""
+    from . import models
+
+    models.ChatArchive.__table__.create(conn, checkfirst=True)
+
+
+def _m010_key_rotation_checkpoints(conn: Connection) -> None:
+    """Progress table for the resumable key rotation job."""
+    from . import models
+
+    models.KeyRotationCheckpoint.__table__.create(conn, checkfirst=True)
+
+
+def _m011_archive_search_postings(conn: Connection) -> None:
+    """Archived chats became searchable; index months archived before that."""
+    _queue_backfill(conn, "archive_postings")
+
+
+def _m012_response_cache_updated_index(conn: Connection) -> None:
+    """Index for the response cache trim (oldest updated_at first)."""
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS idx_response_cache_updated ON response_cache(updated_at, id)")
+
+
+MIGRATIONS: List[Callable[[Connection], None]] = [
+    _m001_baseline,
+    _m002_habits_archived,
+    _m003_backfill_chat_sessions,
+    _m004_composite_indexes,
+    _m005_user_stats,
+    _m006_habit_completion_years,
+    _m007_emotion_daily_rollups,
+    _m008_search_postings,
+    _m009_chat_archive,
+    _m010_key_rotation_checkpoints,
+    _m011_archive_search_postings,
+    _m012_response_cache_updated_index,
+]
+
+LATEST_VERSION = len(MIGRATIONS)
+
+
+def get_schema_version(conn: Connection) -> int:
+    """Applied schema version, or 0 for a database that predates versioning."""
+    try:
+        return int(conn.execute(text("SELECT version FROM schema_version")).scalar() or 0)
+    except (OperationalError, ProgrammingError):
+        conn.rollback()
+        return 0
+
+
+def _set_schema_version(conn: Connection, version: int) -> None:
+    updated = conn.execute(text("UPDATE schema_version SET version = :v"), {"v": version}).rowcount
+    if not updated:
+        conn.execute(text("INSERT INTO schema_version (version) VALUES (:v)"), {"v": version})
+
+
+def run_migrations(engine: Engine) -> int:
+    """Apply pending migrations. Returns the resulting schema version."""
+    with engine.connect() as conn:
+        current = get_schema_version(conn)
+    if current >= LATEST_VERSION:
+        return current
+
+    for version in range(current + 1, LATEST_VERSION + 1):
+        migration = MIGRATIONS[version - 1]
+        with engine.begin() as conn:
+            conn.exec_driver_sql("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)")
+            # Another worker may have applied it while we waited for the lock.
+            applied = conn.execute(text("SELECT version FROM schema_version")).scalar() or 0
+            if applied >= version:
+                continue
+            migration(conn)
+            _set_schema_version(conn, version)
+        logger.info(f"Applied schema migration {version}: {migration.__name__}")
+    return LATEST_VERSION
+
+
+# Backfills
+
+BACKFILL_PAUSE_SECONDS = 0.05
+
+
+def _per_user(engine: Engine, fill: Callable[[Connection, int], int]) -> int:
+    """Run ``fill`` for each user in its own short transaction, against the
+    file holding the user's rows: the user's shard when sharding is enabled
+    (users whose shard file does not exist yet have nothing to fill)."""
+    from . import models, shards
+
+    with engine.connect() as conn:
+        user_ids = conn.execute(select(models.User.id).order_by(models.User.id)).scalars().all()
+    targets = [(engine, user_ids)]
+    if shards.enabled():
+        targets = (
+            (shard_engine, [user_id for user_id in user_ids if shards.shard_of(user_id) == shard])
+            for shard, shard_engine in shards.router.all_engines()
+        )
+    total = 0
+    for bind, ids in targets:
+        for user_id in ids:
+            with bind.begin() as conn:
+                total += fill(conn, user_id)
+            time.sleep(BACKFILL_PAUSE_SECONDS)
+    return total
+
+
+def _backfill_chat_sessions(engine: Engine) -> int:
+    from .crud import backfill_chat_sessions
+    return _per_user(engine, lambda conn, user_id: backfill_chat_sessions(conn, user_id))
+
+
+def _backfill_user_stats(engine: Engine) -> int:
+    from .crud import backfill_user_stats
+    return _per_user(engine, backfill_user_stats)
+
+
+def _backfill_habit_completions(engine: Engine) -> int:
+    from .crud import backfill_habit_completions
+    return _per_user(engine, backfill_habit_completions)
+
+
+def _backfill_emotion_rollups(engine: Engine) -> int:
+    from . import emotion_rollups
+    return _per_user(engine, lambda conn, user_id: emotion_rollups.rebuild(conn, user_id))
+
+
+def _backfill_search_postings(engine: Engine) -> int:
+    from . import search_index
+    return _per_user(engine, lambda conn, user_id: search_index.index_missing(conn, user_id))
+
+
+def _backfill_archive_postings(engine: Engine) -> int:
+    from . import search_index
+    return _per_user(engine, lambda conn, user_id: search_index.index_missing_archive(conn, user_id))
+
+
+BACKFILLS: Dict[str, Callable[[Engine], int]] = {
+    "chat_sessions": _backfill_chat_sessions,
+    "user_stats": _backfill_user_stats,
+    "habit_completions": _backfill_habit_completions,
+    "emotion_rollups": _backfill_emotion_rollups,
+    "search_postings": _backfill_search_postings,
+    "archive_postings": _backfill_archive_postings,
+}
+
+
+def pending_backfills(conn: Connection) -> List[str]:
+    try:
+        return list(conn.execute(text("SELECT name FROM pending_backfills ORDER BY name")).scalars())
+    except (OperationalError, ProgrammingError):
+        conn.rollback()
+        return []
+
+
+def run_backfills(engine: Engine) -> Dict[str, int]:
+    """Perform queued backfills; each is dequeued once it completes (an
+    interrupted one reruns from the start, which is safe). Returns rows or
+    documents written per backfill."""
+    with engine.connect() as conn:
+        names = pending_backfills(conn)
+    report = {}
+    for name in names:
+        report[name] = BACKFILLS[name](engine)
+        with engine.begin() as conn:
+            conn.execute(text("DELETE FROM pending_backfills WHERE name = :n"), {"n": name})
+        logger.info(f"Backfill {name}: {report[name]}")
+    return report
+
+
+async def backfill_worker(engine: Engine):
+    """Run queued backfills in the background (started with the app)."""
+    try:
+        await asyncio.to_thread(run_backfills, engine)
+    except Exception as e:
+        logger.warning(f"Backfill failed: {e}")
+
+
+if __name__ == "__main__":
+    from .database import engine
+
+    logging.basicConfig(level=logging.INFO)
+    if "--status" in sys.argv:
+        with engine.connect() as conn:
+            print(f"schema version {get_schema_version(conn)} (latest {LATEST_VERSION})")
+            print(f"pending backfills: {pending_backfills(conn)}")
+    elif "--backfill" in sys.argv:
+        print(run_backfills(engine))
+    else:
+        print(f"schema version {run_migrations(engine)}")
@@ -1,6 +1,6 @@
 from sqlalchemy import Column, Integer, String, Text, Boolean, Float
 from .database import Base
-from sqlalchemy import ForeignKey, LargeBinary, DateTime, func, UniqueConstraint
+from sqlalchemy import ForeignKey, LargeBinary, DateTime, Date, func, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 
 class User(Base):
@@ -30,6 +30,37 @@ class ChatMessage(Base):
     session_id = Column(String, nullable=True)  # For grouping conversations
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+class ChatSession(Base):
+    """One row per conversation, maintained on every chat message insert.
+    Serves the sidebar session list without scanning chat_messages."""
+    __tablename__ = "chat_sessions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    session_id = Column(String, nullable=False)
+    first_activity = Column(DateTime(timezone=True), server_default=func.now())
+    last_activity = Column(DateTime(timezone=True), server_default=func.now())
+    message_count = Column(Integer, default=0, nullable=False)
+    last_personality = Column(String, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint('user_id', 'session_id', name='uq_chat_sessions_user_session'),
+        Index('idx_chat_sessions_user_last_activity', 'user_id', 'last_activity'),
+    )
+
+class UserStats(Base):
+    """Per-user counters, bumped in the same transaction as each write so the
+    growth arc, pipeline and admin dashboard never COUNT(*) the source tables."""
+    __tablename__ = "user_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    total_messages = Column(Integer, default=0, nullable=False)
+    first_chat_at = Column(DateTime(timezone=True), nullable=True)
+    last_chat_at = Column(DateTime(timezone=True), nullable=True)
+    journal_count = Column(Integer, default=0, nullable=False)
+    habit_count = Column(Integer, default=0, nullable=False)
+    milestone_count = Column(Integer, default=0, nullable=False)
+
 class Habit(Base):
     __tablename__ = "habits"
 
@@ -45,6 +76,21 @@ class Habit(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
+class HabitCompletionYear(Base):
+    """One year of a habit's completions as a day bitmap (see habit_log)."""
+    __tablename__ = "habit_completion_years"
+
+    id = Column(Integer, primary_key=True, index=True)
+    habit_id = Column(Integer, ForeignKey("habits.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    year = Column(Integer, nullable=False)
+    days = Column(LargeBinary, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint('habit_id', 'year', name='uq_habit_completion_years_habit_year'),
+        Index('idx_habit_completion_years_user_year', 'user_id', 'year'),
+    )
+
 class Journal(Base):
     __tablename__ = "journals"
 
@@ -55,6 +101,10 @@ class Journal(Base):
     tags = Column(String, nullable=True)  # Comma-separated tags
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        Index('idx_journals_user_created', 'user_id', 'created_at'),
+    )
+
 # Emotion models moved back here to avoid module/package conflicts
 class EmotionRecord(Base):
     __tablename__ = "emotion_records"
@@ -76,6 +126,78 @@ class EmotionRecord(Base):
 
     user = relationship("User", back_populates="emotion_records")
 
+    __table_args__ = (
+        Index('idx_emotion_records_user_timestamp', 'user_id', 'timestamp'),
+    )
+
+class EmotionDailyRollup(Base):
+    """Emotion counts per user, UTC day, emotion and intensity (see emotion_rollups)."""
+    __tablename__ = "emotion_daily_rollups"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    day = Column(Date, nullable=False)
+    emotion = Column(String, nullable=False)
+    intensity = Column(String, nullable=False)
+    count = Column(Integer, default=0, nullable=False)
+    polarity_sum = Column(Float, default=0.0, nullable=False)
+    polarity_count = Column(Integer, default=0, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint('user_id', 'day', 'emotion', 'intensity', name='uq_emotion_daily_rollups_key'),
+    )
+
+class ChatArchive(Base):
+    """Cold tier: one user's chat messages for one month, compressed and encrypted (see chat_archive)."""
+    __tablename__ = "chat_archive"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    month = Column(String, nullable=False)  # "YYYY-MM"
+    message_count = Column(Integer, default=0, nullable=False)
+    first_at = Column(DateTime(timezone=True), nullable=True)
+    last_at = Column(DateTime(timezone=True), nullable=True)
+    payload = Column(LargeBinary, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        UniqueConstraint('user_id', 'month', name='uq_chat_archive_user_month'),
+    )
+
+class KeyRotationCheckpoint(Base):
+    """Re-encryption progress per database file and table (see key_rotation)."""
+    __tablename__ = "key_rotation_checkpoints"
+
+    id = Column(Integer, primary_key=True, index=True)
+    target = Column(String, nullable=False)      # "main", "shard_003" or "chroma"
+    table_name = Column(String, nullable=False)
+    key_id = Column(Integer, nullable=False)     # key the pass re-encrypts to
+    last_id = Column(Integer, default=0, nullable=False)  # highest id done (Chroma: offset)
+    rows_scanned = Column(Integer, default=0, nullable=False)
+    rows_rewritten = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        UniqueConstraint('target', 'table_name', name='uq_key_rotation_target_table'),
+    )
+
+
+class SearchPosting(Base):
+    """Blind-token inverted index over chats and journals (see search_index)."""
+    __tablename__ = "search_postings"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    token = Column(LargeBinary, nullable=False)  # HMAC of a normalized term
+    doc_type = Column(String, nullable=False)    # "chat" | "journal"
+    doc_id = Column(Integer, nullable=False)
+    tf = Column(Integer, default=1, nullable=False)
+
+    __table_args__ = (
+        Index('idx_search_postings_user_token', 'user_id', 'token'),
+        Index('idx_search_postings_doc', 'doc_type', 'doc_id'),
+    )
+
 class EmotionInsight(Base):
     __tablename__ = "emotion_insights"
 
@@ -121,6 +243,7 @@ class ResponseCache(Base):
 
     __table_args__ = (
         UniqueConstraint('question_key', 'personality', name='uq_response_cache_question_personality'),
+        Index('idx_response_cache_updated', 'updated_at', 'id'),
     )
 
 
@@ -163,3 +286,7 @@ class GrowthMilestone(Base):
     source_snippet = Column(String, nullable=True)   # First 200 chars of user message
     weight = Column(Integer, default=2)              # Importance (1-3)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index('idx_growth_milestones_user_created', 'user_id', 'created_at'),
+    )
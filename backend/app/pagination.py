@@ -0,0 +1,90 @@
+"""
+Keyset (cursor) pagination helpers.
+
+Pages are ordered newest-first on ``(timestamp, id)`` and the cursor encodes
+the last row of the previous page, so every page is a bounded index range
+scan instead of an OFFSET walk over all earlier rows.
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+from sqlalchemy import String, and_, bindparam, or_
+
+from .database import IS_SQLITE
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Response header carrying the cursor for list endpoints whose body is a bare list.
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def clamp_limit(limit: Optional[int], default: int = DEFAULT_PAGE_SIZE) -> int:
+    if limit is None:
+        return default
+    return max(1, min(int(limit), MAX_PAGE_SIZE))
+
+
+def encode_cursor(ts: Any, row_id: int) -> str:
+    """Encode ``(timestamp, id)`` into an opaque URL-safe token."""
+    if isinstance(ts, datetime):
+        ts = ts.isoformat()
+    raw = json.dumps([ts, int(row_id)], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], int]:
+    """Decode a cursor produced by encode_cursor. Raises ValueError if malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        ts, row_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return (datetime.fromisoformat(ts) if ts else None), int(row_id)
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def _ts_params(ts: datetime) -> list:
+    """Bind values equal to a cursor timestamp, smallest first.
+
+    SQLite keeps DATETIME as text: CURRENT_TIMESTAMP defaults have no
+    fractional part while Python-side values always carry six digits, so a
+    whole-second cursor must match both spellings to keep ties exact.
+    """
+    if not IS_SQLITE:
+        return [ts]
+    ts = ts.replace(tzinfo=None)
+    forms = [ts.strftime("%Y-%m-%d %H:%M:%S.%f")]
+    if ts.microsecond == 0:
+        forms.insert(0, ts.strftime("%Y-%m-%d %H:%M:%S"))
+    return [bindparam(None, f, type_=String) for f in forms]
+
+
+def keyset_condition(ts_col, id_col, cursor: str):
+    """WHERE clause selecting rows strictly after the cursor in (ts DESC, id DESC) order."""
+    ts, row_id = decode_cursor(cursor)
+    if ts is None:
+        # NULL timestamps sort last in descending order.
+        return and_(ts_col.is_(None), id_col < row_id)
+    values = _ts_params(ts)
+    same_ts = ts_col == values[0] if len(values) == 1 else ts_col.in_(values)
+    return or_(ts_col < values[0], and_(same_ts, id_col < row_id), ts_col.is_(None))
+
+
+def apply_keyset(query, ts_col, id_col, cursor: Optional[str], limit: int):
+    """Apply newest-first keyset ordering, the cursor filter and the page limit to a Query/Select."""
+    if cursor:
+        query = query.filter(keyset_condition(ts_col, id_col, cursor))
+    return query.order_by(ts_col.desc(), id_col.desc()).limit(limit)
+
+
+def next_cursor(rows: List[Any], limit: int, ts_attr: str) -> Optional[str]:
+    """Cursor for the page after ``rows`` (ORM rows or dicts), or None on the last page."""
+    if not rows or len(rows) < limit:
+        return None
+    last = rows[-1]
+    if isinstance(last, dict):
+        return encode_cursor(last.get(ts_attr), last["id"])
+    return encode_cursor(getattr(last, ts_attr), last.id)
@@ -0,0 +1,108 @@
+"""
+Column-projected read models for the per-turn hot queries.
+
+Recent chat context, recent emotions, milestones and the last emotion are
+read on every chat turn but only ever use a handful of columns. Loading
+them as ORM entities pulls every column (``EmotionRecord.source_text`` can
+be long), builds a mapped instance per row and registers it in the
+session's identity map. These statements select just the columns the
+callers use; the result rows are SQLAlchemy ``Row`` named tuples, which
+carry no identity-map or change-tracking state.
+
+Statements and row converters are shared by crud (sync) and async_crud so
+both return exactly the shapes they always did.
+"""
+
+from typing import List, Optional
+
+from sqlalchemy import desc, select
+
+import encryption_utils
+
+from . import models
+
+_chat = models.ChatMessage
+_emotion = models.EmotionRecord
+_milestone = models.GrowthMilestone
+
+CHAT_COLUMNS = (_chat.id, _chat.created_at, _chat.session_id, _chat.message_encrypted, _chat.response_encrypted)
+
+
+def chat_history_stmt(user_id: int, session_id: Optional[str] = None):
+    """A user's chat rows (optionally one session), unordered and unlimited."""
+    stmt = select(*CHAT_COLUMNS).where(_chat.user_id == user_id)
+    if session_id:
+        stmt = stmt.where(_chat.session_id == session_id)
+    return stmt
+
+
+def recent_chats_stmt(user_id: int, limit: int, session_id: Optional[str] = None):
+    # id breaks created_at ties, as in the keyset pages (pagination.apply_keyset)
+    return chat_history_stmt(user_id, session_id).order_by(desc(_chat.created_at), desc(_chat.id)).limit(limit)
+
+
+def chat_turns(rows) -> List[dict]:
+    """user/assistant message dicts for rows given newest first, returned in
+    chronological order. Rows that fail to decrypt are skipped."""
+    result = []
+    for row in reversed(rows):
+        try:
+            user_message = encryption_utils.decrypt_field(row.message_encrypted)
+            ai_response = encryption_utils.decrypt_field(row.response_encrypted)
+        except Exception:
+            continue  # Skip corrupted messages
+        ts = row.created_at.isoformat() if row.created_at else None
+        result.extend([
+            {"role": "user", "content": user_message, "timestamp": ts, "session_id": row.session_id},
+            {"role": "assistant", "content": ai_response, "timestamp": ts, "session_id": row.session_id}
+        ])
+    return result
+
+
+def recent_emotions_stmt(user_id: int, limit: int):
+    return (
+        select(_emotion.primary_emotion, _emotion.primary_intensity, _emotion.timestamp)
+        .where(_emotion.user_id == user_id)
+        .order_by(desc(_emotion.timestamp), desc(_emotion.id))
+        .limit(limit)
+    )
+
+
+def emotion_dicts(rows) -> List[dict]:
+    return [
+        {
+            "emotion": r.primary_emotion,
+            "intensity": r.primary_intensity,
+            "timestamp": r.timestamp.isoformat() if r.timestamp else None,
+        }
+        for r in rows
+    ]
+
+
+def last_emotion_stmt(user_id: int):
+    """The user's most recent primary emotion (scalar)."""
+    return select(_emotion.primary_emotion).where(_emotion.user_id == user_id).order_by(desc(_emotion.timestamp), desc(_emotion.id)).limit(1)
+
+
+def milestones_stmt(user_id: int, limit: int = 20):
+    return (
+        select(_milestone.id, _milestone.milestone_type, _milestone.recognition,
+               _milestone.source_snippet, _milestone.weight, _milestone.created_at)
+        .where(_milestone.user_id == user_id)
+        .order_by(desc(_milestone.created_at), desc(_milestone.id))
+        .limit(limit)
+    )
+
+
+def milestone_dicts(rows) -> List[dict]:
+    return [
+        {
+            "id": m.id,
+            "type": m.milestone_type,
+            "recognition": m.recognition,
+            "source_snippet": m.source_snippet,
+            "weight": m.weight,
+            "created_at": m.created_at.isoformat() if m.created_at else None,
+        }
+        for m in rows
+    ]
@@ -0,0 +1,244 @@
+"""
+Two-tier response cache.
+
+A bounded in-process LRU (size + TTL) sits in front of the encrypted
+``response_cache`` table. Lookups are served from memory when possible and
+only fall through to SQLite (one query + one AES decrypt) on an LRU miss.
+On the async hot path ``aget`` does that fallback through an AsyncSession
+and decrypts in a worker thread, so it never blocks the event loop.
+Writes land in the LRU immediately and are queued for write-behind: the
+cache writer flushes them every RESPONSE_CACHE_FLUSH_SECONDS as a single
+batched upsert. Once a slack margin of rows (1% of RESPONSE_CACHE_MAX_ROWS)
+has been written since the last trim, the same transaction also trims the
+table back to RESPONSE_CACHE_MAX_ROWS, oldest ``updated_at`` first (an
+indexed scan), so the COUNT(*) is paid once per margin rather than on every
+flush.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+import encryption_utils
+
+from . import async_crud, crud, models
+from .config import settings
+from .database import IS_SQLITE, SessionLocal
+
+logger = logging.getLogger(__name__)
+
+CacheKey = Tuple[str, str]  # (question_key, personality)
+
+
+class LRUCache:
+    """Thread-safe LRU with a per-entry TTL and hit/miss/eviction counters."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[CacheKey, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: CacheKey) -> Optional[str]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            stored_at, value = entry
+            if now - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: CacheKey, value: str) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class ResponseCache:
+    """LRU tier plus write-behind to the response_cache table."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float, max_rows: int, trim_slack: Optional[int] = None):
+        self.lru = LRUCache(max_entries, ttl_seconds)
+        self.max_rows = max_rows
+        self.trim_slack = trim_slack if trim_slack is not None else max(1, max_rows // 100)
+        # Rows upserted since the last trim; starts full so the first flush trims.
+        self._untrimmed = self.trim_slack
+        self._pending: Dict[CacheKey, str] = {}
+        self._pending_lock = threading.Lock()
+        self.db_hits = 0
+        self.db_misses = 0
+        self.rows_written = 0
+        self.rows_evicted = 0
+
+    def _memory_get(self, key: CacheKey) -> Optional[str]:
+        value = self.lru.get(key)
+        if value is None:
+            with self._pending_lock:
+                value = self._pending.get(key)
+        return value
+
+    def _promote(self, key: CacheKey, value: Optional[str], from_db: bool) -> Optional[str]:
+        if from_db:
+            if value is None:
+                self.db_misses += 1
+            else:
+                self.db_hits += 1
+        if value is not None:
+            self.lru.put(key, value)
+        return value
+
+    def get(self, db: Optional[Session], question_key: str, personality: str) -> Optional[str]:
+        """Cached reply from memory, else from the table (promoting it into the LRU)."""
+        key = (question_key, personality)
+        value = self._memory_get(key)
+        if value is not None or db is None:
+            return self._promote(key, value, False)
+        return self._promote(key, crud.get_cached_response(db, question_key, personality), True)
+
+    async def aget(self, adb: Optional[AsyncSession], question_key: str, personality: str) -> Optional[str]:
+        """get() for the event loop: the table fallback goes through ``adb``."""
+        key = (question_key, personality)
+        value = self._memory_get(key)
+        if value is not None or adb is None:
+            return self._promote(key, value, False)
+        return self._promote(key, await async_crud.get_cached_response(adb, question_key, personality), True)
+
+    def put(self, question_key: str, personality: str, response: str) -> None:
+        """Cache a reply now; it is persisted on the next flush."""
+        key = (question_key, personality)
+        self.lru.put(key, response)
+        with self._pending_lock:
+            self._pending[key] = response
+
+    def flush(self, db: Session) -> int:
+        """Write pending replies in one batched upsert, trimming to max_rows in
+        the same transaction once trim_slack rows have accumulated. Returns
+        rows written."""
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        rows = [
+            {
+                "question_key": question_key,
+                "personality": personality,
+                "response_encrypted": encryption_utils.encrypt_field(response),
+            }
+            for (question_key, personality), response in pending.items()
+        ]
+        evicted = 0
+        try:
+            db.execute(_upsert_statement(), rows)
+            trim = self._untrimmed + len(rows) >= self.trim_slack
+            if trim:
+                evicted = evict_overflow(db, self.max_rows)
+            db.commit()
+        except Exception:
+            db.rollback()
+            with self._pending_lock:
+                for key, response in pending.items():
+                    self._pending.setdefault(key, response)
+            raise
+        self._untrimmed = 0 if trim else self._untrimmed + len(rows)
+        self.rows_written += len(rows)
+        self.rows_evicted += evicted
+        return len(rows)
+
+    def stats(self) -> dict:
+        return {
+            "lru_entries": len(self.lru),
+            "lru_max_entries": self.lru.max_entries,
+            "hits": self.lru.hits,
+            "misses": self.lru.misses,
+            "evictions": self.lru.evictions,
+            "expirations": self.lru.expirations,
+            "db_hits": self.db_hits,
+            "db_misses": self.db_misses,
+            "pending_writes": len(self._pending),
+            "rows_written": self.rows_written,
+            "rows_evicted": self.rows_evicted,
+            "max_rows": self.max_rows,
+        }
+
+
+def _upsert_statement():
+    """INSERT .. ON CONFLICT (question_key, personality) refreshing the reply and its timestamps."""
+    insert = sqlite_insert if IS_SQLITE else pg_insert
+    table = models.ResponseCache.__table__
+    stmt = insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.question_key, table.c.personality],
+        set_={
+            "response_encrypted": stmt.excluded.response_encrypted,
+            "created_at": func.now(),
+            "updated_at": func.now(),
+        },
+    )
+
+
+def evict_overflow(db: Session, max_rows: int) -> int:
+    """Stage deletion of the least recently updated rows beyond ``max_rows``.
+    The caller commits. Returns rows deleted."""
+    cache = models.ResponseCache
+    excess = db.execute(select(func.count()).select_from(cache)).scalar() - max_rows
+    if excess <= 0:
+        return 0
+    oldest = select(cache.id).order_by(cache.updated_at, cache.id).limit(excess).scalar_subquery()
+    result = db.execute(delete(cache).where(cache.id.in_(oldest)).execution_options(synchronize_session=False))
+    return result.rowcount or 0
+
+
+response_cache = ResponseCache(
+    max_entries=settings.RESPONSE_CACHE_LRU_SIZE,
+    ttl_seconds=settings.RESPONSE_CACHE_LRU_TTL_SECONDS,
+    max_rows=settings.RESPONSE_CACHE_MAX_ROWS,
+)
+
+
+def flush_response_cache() -> int:
+    db = SessionLocal()
+    try:
+        return response_cache.flush(db)
+    finally:
+        db.close()
+
+
+async def response_cache_writer():
+    """Flush write-behind entries every RESPONSE_CACHE_FLUSH_SECONDS (started with the app)."""
+    while True:
+        await asyncio.sleep(settings.RESPONSE_CACHE_FLUSH_SECONDS)
+        try:
+            await asyncio.to_thread(flush_response_cache)
+        except Exception as e:
+            logger.warning(f"Response cache flush failed: {e}")
@@ -0,0 +1,204 @@
+"""
+Retention enforcement for My Mitra.
+
+Moves old chats into the archive (see chat_archive), then purges expired
+chat messages (per-user ``chat_history_retention_days``, falling back to
+CHAT_RETENTION_DAYS; hot rows and the chat_archive tier). Also purges
+stale response_cache entries, old emotion_insights and long-expired
+system_action_approvals. Every purge runs in RETENTION_BATCH_SIZE chunks
+that commit and pause for RETENTION_BATCH_PAUSE_MS, so the SQLite write lock
+is only ever held for one small DELETE and live chat inserts interleave
+freely. Freed pages are then
+returned to the filesystem with ``PRAGMA incremental_vacuum``.
+
+Usage:
+    python -m app.retention                              # one purge pass
+    python -m app.retention --enable-incremental-vacuum  # one-time VACUUM to switch modes
+"""
+
+import asyncio
+import logging
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from . import chat_archive, crud, models, search_index, shards
+from .config import settings
+from .database import IS_SQLITE, SessionLocal, engine
+
+logger = logging.getLogger(__name__)
+
+INCREMENTAL = 2  # PRAGMA auto_vacuum value
+
+
+def _pause() -> float:
+    return settings.RETENTION_BATCH_PAUSE_MS / 1000.0
+
+
+def _retention_days(db: Session) -> list:
+    """(user_id, days) for every user; users without settings get the global default."""
+    days = func.coalesce(models.UserSettings.chat_history_retention_days, settings.CHAT_RETENTION_DAYS)
+    return db.query(models.User.id, days).outerjoin(
+        models.UserSettings, models.UserSettings.user_id == models.User.id
+    ).all()
+
+
+def _release_messages(db: Session, user_id: int, session_ids: list) -> None:
+    """Stage chat_sessions and user_stats decrements for deleted messages."""
+    for session_id, count in Counter(sid for sid in session_ids if sid).items():
+        session_filter = (models.ChatSession.user_id == user_id, models.ChatSession.session_id == session_id)
+        db.execute(update(models.ChatSession).where(*session_filter).values(
+            message_count=models.ChatSession.message_count - count
+        ))
+        db.execute(delete(models.ChatSession).where(*session_filter, models.ChatSession.message_count <= 0))
+    db.execute(crud.user_stats_upsert(user_id, messages=-len(session_ids)))
+
+
+def purge_user_chats(db: Session, user_id: int, cutoff: datetime) -> int:
+    """Delete a user's messages older than cutoff in small batches (then from
+    the archive), keeping chat_sessions and user_stats in step. Returns
+    messages deleted."""
+    total = 0
+    while True:
+        rows = db.execute(
+            select(models.ChatMessage.id, models.ChatMessage.session_id)
+            .where(models.ChatMessage.user_id == user_id, models.ChatMessage.created_at < cutoff)
+            .limit(settings.RETENTION_BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        ids = [row.id for row in rows]
+        search_index.remove_documents(db, user_id, search_index.CHAT, ids)
+        db.execute(
+            delete(models.ChatMessage)
+            .where(models.ChatMessage.id.in_(ids))
+            .execution_options(synchronize_session=False)
+        )
+        _release_messages(db, user_id, [row.session_id for row in rows])
+        db.commit()
+        total += len(rows)
+        if len(rows) < settings.RETENTION_BATCH_SIZE:
+            break
+        time.sleep(_pause())
+
+    archived = chat_archive.purge_before(db, user_id, cutoff)
+    if archived:
+        _release_messages(db, user_id, archived)
+        db.commit()
+        total += len(archived)
+
+    if total:
+        first_hot = db.execute(select(func.min(models.ChatMessage.created_at)).where(
+            models.ChatMessage.user_id == user_id
+        )).scalar()
+        first_archived = db.execute(select(func.min(models.ChatArchive.first_at)).where(
+            models.ChatArchive.user_id == user_id
+        )).scalar()
+        first = min((ts for ts in (first_archived, first_hot) if ts is not None), default=None)
+        db.execute(update(models.UserStats).where(models.UserStats.user_id == user_id).values(first_chat_at=first))
+        db.commit()
+    return total
+
+
+def purge_expired(db: Session, now: Optional[datetime] = None) -> dict:
+    """One purge pass over every retention-managed table. Returns rows deleted per table."""
+    now = now or datetime.utcnow()
+    chunk = {"chunk_size": settings.RETENTION_BATCH_SIZE, "pause": _pause()}
+
+    chats = 0
+    for user_id, days in _retention_days(db):
+        if days and days > 0:
+            shards.scope(db, user_id)
+            chats += purge_user_chats(db, user_id, now - timedelta(days=days))
+
+    return {
+        "chat_messages": chats,
+        "response_cache": crud._chunked_delete(
+            db, models.ResponseCache,
+            models.ResponseCache.updated_at < now - timedelta(days=settings.RESPONSE_CACHE_TTL_DAYS),
+            **chunk,
+        ),
+        "emotion_insights": crud._chunked_delete(
+            db, models.EmotionInsight,
+            models.EmotionInsight.generated_at < now - timedelta(days=settings.EMOTION_INSIGHT_RETENTION_DAYS),
+            **chunk,
+        ),
+        "system_action_approvals": crud._chunked_delete(
+            db, models.SystemActionApproval,
+            models.SystemActionApproval.expires_at < now - timedelta(days=settings.APPROVAL_RETENTION_DAYS),
+            **chunk,
+        ),
+    }
+
+
+def incremental_vacuum(bind: Engine, step_pages: int = 256) -> int:
+    """Release free pages to the filesystem a few at a time. Returns bytes reclaimed
+    (0 when not SQLite or the file is not in auto_vacuum=INCREMENTAL mode)."""
+    if not IS_SQLITE:
+        return 0
+    with bind.connect() as conn:
+        if conn.exec_driver_sql("PRAGMA auto_vacuum").scalar() != INCREMENTAL:
+            logger.info("auto_vacuum is not INCREMENTAL; run `python -m app.retention --enable-incremental-vacuum` once")
+            return 0
+        page_size = conn.exec_driver_sql("PRAGMA page_size").scalar()
+        before = conn.exec_driver_sql("PRAGMA page_count").scalar()
+        # sqlite3's execute() steps this pragma once (one page); executescript()
+        # runs it to completion as its own short write transaction.
+        raw = conn.connection.dbapi_connection
+        while conn.exec_driver_sql("PRAGMA freelist_count").scalar():
+            raw.executescript(f"PRAGMA incremental_vacuum({int(step_pages)});")
+            time.sleep(_pause())
+        after = conn.exec_driver_sql("PRAGMA page_count").scalar()
+    return (before - after) * page_size
+
+
+def enable_incremental_vacuum(bind: Engine) -> None:
+    """Switch an existing SQLite file to auto_vacuum=INCREMENTAL (full VACUUM; run offline)."""
+    with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.exec_driver_sql("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.exec_driver_sql("VACUUM")
+
+
+def run_retention(bind: Engine = engine) -> dict:
+    """Archive old chats, purge expired rows, then vacuum. Returns the per-table
+    counts plus chat_archived and bytes_reclaimed."""
+    db = SessionLocal(bind=bind)
+    try:
+        # Archive first: the archive threshold sits inside the retention
+        # window, so these rows are not yet due for purging.
+        archived = chat_archive.archive_expired(db, retention_days=dict(_retention_days(db)))
+        report = purge_expired(db)
+        report["chat_archived"] = archived
+    finally:
+        db.close()
+    report["bytes_reclaimed"] = incremental_vacuum(bind)
+    if shards.enabled():
+        report["bytes_reclaimed"] += sum(incremental_vacuum(shard_engine) for _, shard_engine in shards.router.all_engines())
+    return report
+
+
+async def retention_worker():
+    """Run a retention pass every RETENTION_INTERVAL_MINUTES (started with the app)."""
+    chat_archive.check_settings()
+    while True:
+        try:
+            report = await asyncio.to_thread(run_retention)
+            logger.info(f"Retention pass: {report}")
+        except Exception as e:
+            logger.warning(f"Retention pass failed: {e}")
+        await asyncio.sleep(settings.RETENTION_INTERVAL_MINUTES * 60)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    if "--enable-incremental-vacuum" in sys.argv:
+        enable_incremental_vacuum(engine)
+        print("auto_vacuum set to INCREMENTAL")
+    else:
+        print(run_retention())
@@ -2,13 +2,14 @@
 FastAPI router for emotion analysis endpoints
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
 from typing import List, Dict, Optional
 from datetime import datetime, timedelta
 import json
 
 from ..database import get_db
+from .. import emotion_rollups, pagination
 from ..models import EmotionRecord, EmotionInsight
 from ..schemas import EmotionResponse, EmotionAnalysisRequest, EmotionInsightResponse
 from core.emotion_engine import emotion_engine, EmotionCategory, EmotionIntensity
@@ -46,7 +47,7 @@ async def analyze_emotion(
         )
         
         # Save to database
-        db.add(emotion_record)
+        emotion_rollups.add_emotion_record(db, emotion_record)
         db.commit()
         db.refresh(emotion_record)
     
@@ -68,19 +69,31 @@ async def analyze_emotion(
 @router.get("/history/{user_id}", response_model=List[EmotionResponse])
 async def get_emotion_history(
     user_id: int,
+    response: Response,
     limit: int = 10,
     skip: int = 0,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
     """
-    Get emotion history for a user
+    Get emotion history for a user, newest first.
+    Pass the X-Next-Cursor response header back as ``cursor`` for the next page;
+    ``skip`` is kept for older clients but costs an OFFSET scan.
     """
-    # Query emotion records
-    emotion_records = db.query(EmotionRecord).filter(
-        EmotionRecord.user_id == user_id
-    ).order_by(
-        EmotionRecord.timestamp.desc()
-    ).offset(skip).limit(limit).all()
+    limit = pagination.clamp_limit(limit)
+    query = db.query(EmotionRecord).filter(EmotionRecord.user_id == user_id)
+    if skip and not cursor:
+        query = query.order_by(EmotionRecord.timestamp.desc(), EmotionRecord.id.desc()).offset(skip).limit(limit)
+    else:
+        try:
+            query = pagination.apply_keyset(query, EmotionRecord.timestamp, EmotionRecord.id, cursor, limit)
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    emotion_records = query.all()
+
+    next_cursor = pagination.next_cursor(emotion_records, limit, "timestamp")
+    if next_cursor:
+        response.headers[pagination.NEXT_CURSOR_HEADER] = next_cursor
     
     # Format response
     result = []
@@ -110,25 +123,17 @@ async def get_emotion_insights(
     """
     # Determine date range
     now = datetime.utcnow()
-    if time_period == "day":
-        start_date = now - timedelta(days=1)
-    elif time_period == "week":
-        start_date = now - timedelta(days=7)
-    elif time_period == "month":
-        start_date = now - timedelta(days=30)
-    else:
+    if time_period not in emotion_rollups.PERIOD_DAYS:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid time period. Must be 'day', 'week', or 'month'."
         )
     
-    # Query emotion records in the date range
-    emotion_records = db.query(EmotionRecord).filter(
-        EmotionRecord.user_id == user_id,
-        EmotionRecord.timestamp >= start_date
-    ).all()
+    # Aggregate the daily rollups in the date range
+    distribution = emotion_rollups.get_distribution(db, user_id, emotion_rollups.PERIOD_DAYS[time_period], now)
+    emotion_counts = distribution["emotion_counts"]
     
-    if not emotion_records:
+    if not emotion_counts:
         return {
             "time_period": time_period,
             "dominant_emotion": None,
@@ -136,17 +141,8 @@ async def get_emotion_insights(
             "insight_text": "Not enough data to generate insights yet."
         }
     
-    # Calculate emotion distribution
-    emotion_counts = {}
-    for record in emotion_records:
-        emotion = record.primary_emotion
-        if emotion in emotion_counts:
-            emotion_counts[emotion] += 1
-        else:
-            emotion_counts[emotion] = 1
-    
     # Calculate percentages
-    total_records = len(emotion_records)
+    total_records = distribution["total"]
     emotion_distribution = {
         emotion: count / total_records
         for emotion, count in emotion_counts.items()
@@ -1,13 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from typing import Optional, Any, List
 from pydantic import BaseModel
 import os
+import asyncio
+import tempfile
 import uuid
 import logging
+from datetime import datetime
 
-from . import crud, models, schemas, security
-from .database import SessionLocal
+from . import crud, async_crud, models, schemas, security, pagination, emotion_rollups, account_export, account_import, search_index
+from .config import settings
+from .database import SessionLocal, get_async_db
+from .write_queue import write_queue
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
@@ -49,6 +55,12 @@ async def get_current_user_required(token: str = Depends(oauth2_scheme), db=Depe
         user = SimpleNamespace(**user)
     return user
 
+def _set_next_cursor(response: Response, items: list, limit: int, ts_key: str) -> None:
+    """Expose the keyset cursor for bare-list endpoints via a response header."""
+    next_cursor = pagination.next_cursor(items, limit, ts_key)
+    if next_cursor:
+        response.headers[pagination.NEXT_CURSOR_HEADER] = next_cursor
+
 @router.post("/register", response_model=schemas.User)
 def create_user(user: "schemas.UserCreate", db: "Session" = Depends(get_db)):
     db_user = crud.get_user(db, username=user.username)
@@ -88,7 +100,8 @@ async def login_for_access_token(
 async def chat_with_mymitra(
     message: schemas.ChatMessageCreate, 
     current_user = Depends(get_current_user_optional),
-    db: Any = Depends(get_db)
+    db: Any = Depends(get_db),
+    adb: Any = Depends(get_async_db),
 ):
     """
     Chat with My Mitra AI with personality support.
@@ -113,7 +126,8 @@ async def chat_with_mymitra(
             user_id=current_user.id if current_user else None,
             db=db if current_user else None,
             personality=message.personality,
-            session_id=session_id
+            session_id=session_id,
+            adb=adb if current_user else None,
         )
         
         # Send message via WebSocket for real-time delivery
@@ -150,8 +164,7 @@ async def chat_with_mymitra(
                     detection_method="mitra_core_rule_based",
                     source_type="chat",
                 )
-                db.add(emotion_record)
-                db.commit()
+                write_queue.submit(emotion_rollups.add_emotion_record, emotion_record)
             except Exception as e:
                 logger.error(f"Emotion analysis failed: {e}")
                 # Don't fail the entire request if emotion analysis fails
@@ -228,21 +241,31 @@ async def get_available_personalities():
 async def get_chat_history(
     limit: int = 20,
     session_id: Optional[str] = None,
+    cursor: Optional[str] = None,
     current_user = Depends(get_current_user_optional),
-    db: Any = Depends(get_db)
+    adb: Any = Depends(get_async_db)
 ):
-    """Get user's chat history, optionally scoped to a session."""
+    """Get user's chat history, optionally scoped to a session.
+    Pass ``next_cursor`` back as ``cursor`` to load older messages."""
     try:
         if not current_user:
             return {
                 "messages": [],
-                "total": 0
+                "total": 0,
+                "next_cursor": None
             }
-        messages = crud.get_recent_chat_history(db, current_user.id, limit, session_id=session_id)
+        page = await async_crud.get_chat_history_page(
+            adb, current_user.id, pagination.clamp_limit(limit), session_id=session_id, cursor=cursor,
+            include_archive=True,
+        )
+        messages = page["messages"]
         return {
             "messages": messages,
-            "total": len(messages)
+            "total": len(messages),
+            "next_cursor": page["next_cursor"]
         }
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
     except Exception as e:
         logger.error(f"Error retrieving chat history: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error occurred")
@@ -297,6 +320,68 @@ async def delete_all_chats(
         logger.error(f"Error deleting all chats: {e}")
         raise HTTPException(status_code=500, detail="Failed to delete all chats")
 
+@router.delete("/account/data")
+async def erase_account_data(
+    current_user = Depends(get_current_user_required),
+    db: Any = Depends(get_db)
+):
+    """Erase all chats, journals, habits and emotion data for the authenticated user."""
+    try:
+        deleted = crud.delete_all_user_data(db, current_user.id)
+        return {"deleted": deleted, "total": sum(deleted.values())}
+    except Exception as e:
+        logger.error(f"Error erasing account data: {e}")
+        raise HTTPException(status_code=500, detail="Failed to erase account data")
+
+@router.get("/account/export")
+def export_account(current_user=Depends(get_current_user_required)):
+    """Stream the user's chats, journals, habits, emotion records and milestones as NDJSON."""
+    filename = f"mymitra-export-{datetime.utcnow():%Y%m%d}.ndjson"
+    return StreamingResponse(
+        account_export.iter_ndjson(SessionLocal, current_user.id),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+@router.post("/account/import")
+async def import_account(request: Request, current_user=Depends(get_current_user_required)):
+    """Import NDJSON (an /account/export file or compatible records) from the
+    request body. Progress is streamed back as NDJSON, one line per batch.
+
+    The body is spooled (to disk past 8 MB) from a worker thread, so a slow
+    disk never stalls the event loop, and bodies over ACCOUNT_IMPORT_MAX_BYTES
+    are refused with 413 before anything is imported."""
+    too_large = HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Import is larger than {settings.ACCOUNT_IMPORT_MAX_BYTES} bytes",
+    )
+    declared = request.headers.get("content-length", "")
+    if declared.isdigit() and int(declared) > settings.ACCOUNT_IMPORT_MAX_BYTES:
+        raise too_large
+
+    spool = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+    received = 0
+    try:
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > settings.ACCOUNT_IMPORT_MAX_BYTES:
+                raise too_large
+            await asyncio.to_thread(spool.write, chunk)
+        await asyncio.to_thread(spool.seek, 0)
+    except BaseException:
+        spool.close()
+        raise
+
+    def progress():
+        try:
+            yield from account_import.iter_import_ndjson(
+                SessionLocal, current_user.id, spool, memory=enhanced_chat_pipeline.long_term_memory
+            )
+        finally:
+            spool.close()
+
+    return StreamingResponse(progress(), media_type="application/x-ndjson")
+
 @router.post("/journal/")
 async def create_journal_entry(journal: schemas.JournalCreate, db: "Session" = Depends(get_db), current_user=Depends(get_current_user_required)):
     return crud.create_journal(db, user_id=current_user.id, journal=journal)
@@ -356,8 +441,21 @@ async def create_habit(habit: "schemas.HabitCreate", db: "Session" = Depends(get
     return obj
 
 @router.get("/habits", response_model=list[schemas.Habit])
-def list_habits(db: "Session" = Depends(get_db), current_user=Depends(get_current_user_required)):
-    return crud.list_habits(db, user_id=current_user.id)
+def list_habits(
+    response: Response,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    db: "Session" = Depends(get_db),
+    current_user=Depends(get_current_user_required),
+):
+    """List habits. With limit/cursor, returns one page and sets X-Next-Cursor."""
+    try:
+        habits = crud.list_habits(db, user_id=current_user.id, limit=limit, cursor=cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if limit is not None or cursor:
+        _set_next_cursor(response, habits, pagination.clamp_limit(limit), "created_at")
+    return habits
 
 @router.post("/habits/{habit_id}/complete")
 async def complete_habit(habit_id: int, db: "Session" = Depends(get_db), current_user=Depends(get_current_user_required)):
@@ -370,7 +468,7 @@ async def complete_habit(habit_id: int, db: "Session" = Depends(get_db), current
         from .websocket_manager import manager
         # Decrypt title for WebSocket notification
         try:
-            decrypted_title = encryption_utils.decrypt_data(result.title_encrypted.decode('utf-8'))
+            decrypted_title = encryption_utils.decrypt_field(result.title_encrypted)
         except Exception:
             decrypted_title = "[decryption_failed]"
             
@@ -492,13 +590,57 @@ def create_journal(journal: "schemas.JournalCreate", db: "Session" = Depends(get
     return schemas.Journal(id=obj.id, user_id=obj.user_id, content=journal.content)
 
 @router.get("/journals", response_model=list[schemas.Journal])
-def list_journals(db: "Session" = Depends(get_db), current_user=Depends(get_current_user_required)):
-    return crud.list_journals(db, user_id=current_user.id)
+def list_journals(
+    response: Response,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    db: "Session" = Depends(get_db),
+    current_user=Depends(get_current_user_required),
+):
+    """List journals. With limit/cursor, returns one page and sets X-Next-Cursor."""
+    try:
+        journals = crud.list_journals(db, user_id=current_user.id, limit=limit, cursor=cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if limit is not None or cursor:
+        _set_next_cursor(response, journals, pagination.clamp_limit(limit), "created_at")
+    return journals
+
+@router.get("/search")
+def search_history(
+    q: str,
+    limit: Optional[int] = None,
+    type: Optional[str] = None,
+    db: "Session" = Depends(get_db),
+    current_user=Depends(get_current_user_required),
+):
+    """Ranked search over the user's chats (including archived history, type "archive")
+    and journals (blind-token index; only hits are decrypted)."""
+    if type is not None and type not in search_index.DOC_TYPES:
+        raise HTTPException(status_code=400, detail=f"type must be one of {', '.join(search_index.DOC_TYPES)}")
+    results = search_index.search(db, current_user.id, q, limit=pagination.clamp_limit(limit), doc_type=type)
+    return {"query": q, "results": results}
 
 @router.get("/habits/insights")
 def habit_insights(db: "Session" = Depends(get_db), current_user=Depends(get_current_user_required)):
     return crud.get_habit_insights(db, user_id=current_user.id)
 
+@router.get("/habits/heatmap")
+def habit_heatmap(
+    year: Optional[int] = None,
+    years: int = 1,
+    db: "Session" = Depends(get_db),
+    current_user=Depends(get_current_user_required),
+):
+    """Completed days per habit for ``years`` calendar years ending at ``year`` (default: this year)."""
+    to_year = year or datetime.now().year
+    from_year = to_year - max(1, min(years, 10)) + 1
+    return {
+        "from_year": from_year,
+        "to_year": to_year,
+        "habits": crud.get_habit_heatmap(db, current_user.id, from_year, to_year),
+    }
+
 @router.get("/health")
 async def health_check():
     return {"status": "ok", "message": "MyMitra backend is running"}
@@ -533,7 +675,7 @@ def log_mood(
             source_type="manual_checkin",
             timestamp=datetime.utcnow(),
         )
-        db.add(record)
+        emotion_rollups.add_emotion_record(db, record)
         db.commit()
         db.refresh(record)
         return {"id": record.id, "mood": body.mood, "intensity": body.intensity, "ok": True}
@@ -0,0 +1,322 @@
+"""
+Encrypted search over chat history and journals.
+
+Chats and journals are stored AES-encrypted, so they cannot be searched in
+SQL. Instead every document is tokenized at write time and each distinct
+term is stored in ``search_postings`` as a blind token: a keyed HMAC of the
+term (``encryption_utils.blind_token``). The table holds no plaintext and
+no ciphertext, only (user, token, document, term frequency).
+
+A query is blinded the same way and answered from the postings of its own
+terms, scored BM25-style (document count from user_stats), and only the
+top hits are decrypted to build snippets. Cost follows the postings of the
+query terms, not the size of the user's history; stopwords are never
+indexed so no posting list covers every document. Terms matching more than
+MAX_POSTINGS_PER_TERM documents are not read in full: they are scored only on
+documents the rarer terms matched, or, if every term is that common, on
+their newest postings.
+
+Writers call ``add_document`` / ``remove_documents`` in the same
+transaction as the row they index. ``index_missing`` (re)builds postings
+for rows that have none (migration backfill, bulk import), and
+``index_missing_archive`` does the same for archived chats.
+
+Archived chats stay searchable: when a message moves to chat_archive its
+postings are re-tagged as doc_type "archive", keeping the message id as
+doc_id. A hit on one decrypts the user's archived months, newest first,
+until the record is found, so such hits cost more than hot ones.
+"""
+
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import and_, delete, exists, func, select, update
+from sqlalchemy.orm import Session
+
+import encryption_utils
+
+from . import models
+
+CHAT = "chat"
+JOURNAL = "journal"
+ARCHIVE = "archive"  # archived chat message (doc_id is the original message id)
+DOC_TYPES = (CHAT, JOURNAL, ARCHIVE)
+
+MAX_QUERY_TERMS = 8
+MAX_TERM_LENGTH = 40
+SNIPPET_RADIUS = 80
+INDEX_BATCH_SIZE = 500
+# Posting lists longer than this are not read in full (see search)
+MAX_POSTINGS_PER_TERM = 2000
+
+# BM25 term-frequency saturation
+_K1 = 1.2
+
+_WORD = re.compile(r"[a-z0-9']+")
+
+STOPWORDS = frozenset("""
+a an and are as at be been but by can could did do does for from had has have he her
+him his how i if in into is it its just me my no not of on or our she so than that
+the their them then there these they this to too up us was we were what when where
+which who why will with would you your im ive id dont its youre thats
+""".split())
+
+
+def normalize_term(word: str) -> Optional[str]:
+    """Canonical index term for a word, or None if it is not indexed."""
+    term = word.replace("'", "")
+    if len(term) < 2 or term in STOPWORDS:
+        return None
+    # Plural folding so "exams" finds "exam" (and vice versa).
+    if len(term) > 3 and term.endswith("s") and not term.endswith("ss"):
+        term = term[:-1]
+    return term[:MAX_TERM_LENGTH]
+
+
+def terms(text: str) -> Counter:
+    """Term frequencies of a text."""
+    counts: Counter = Counter()
+    for word in _WORD.findall((text or "").lower()):
+        term = normalize_term(word)
+        if term:
+            counts[term] += 1
+    return counts
+
+
+def chat_text(message: str, response: str) -> str:
+    return f"{message or ''}\n{response or ''}"
+
+
+def posting_rows(user_id: int, doc_type: str, doc_id: int, text: str) -> List[dict]:
+    """search_postings rows for one document (execute with an INSERT)."""
+    return [
+        {"user_id": user_id, "token": encryption_utils.blind_token(term), "doc_type": doc_type, "doc_id": doc_id, "tf": tf}
+        for term, tf in terms(text).items()
+    ]
+
+
+def add_document(db: Session, user_id: int, doc_type: str, doc_id: int, text: str) -> int:
+    """Stage postings for a document. The caller commits. Returns postings written."""
+    rows = posting_rows(user_id, doc_type, doc_id, text)
+    if rows:
+        db.execute(models.SearchPosting.__table__.insert(), rows)
+    return len(rows)
+
+
+def remove_documents(db: Session, user_id: int, doc_type: Optional[str] = None, doc_ids=None) -> None:
+    """Stage removal of postings for a user's documents: all of them, one type,
+    or the given ids (a list or a SELECT of ids). The caller commits."""
+    postings = models.SearchPosting
+    criteria = [postings.user_id == user_id]
+    if doc_type:
+        criteria.append(postings.doc_type == doc_type)
+    if doc_ids is not None:
+        criteria.append(postings.doc_id.in_(doc_ids))
+    db.execute(delete(postings).where(*criteria).execution_options(synchronize_session=False))
+
+
+def retag_documents(db: Session, user_id: int, from_type: str, to_type: str, doc_ids) -> None:
+    """Stage a change of doc_type for documents that moved (chat -> archive). The caller commits."""
+    postings = models.SearchPosting
+    db.execute(
+        update(postings)
+        .where(postings.user_id == user_id, postings.doc_type == from_type, postings.doc_id.in_(doc_ids))
+        .values(doc_type=to_type)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _unindexed_batch(table, doc_type: str, user_id: Optional[int], after_id: int):
+    postings = models.SearchPosting
+    stmt = select(table).where(table.c.id > after_id, ~exists().where(and_(
+        postings.doc_type == doc_type, postings.doc_id == table.c.id,
+    )))
+    if user_id is not None:
+        stmt = stmt.where(table.c.user_id == user_id)
+    return stmt.order_by(table.c.id).limit(INDEX_BATCH_SIZE)
+
+
+def index_missing(db, user_id: Optional[int] = None) -> int:
+    """Index chats and journals that have no postings yet, in batches (Session
+    or Connection; the caller commits). Returns documents indexed."""
+    def _decrypt(blob) -> str:
+        try:
+            return encryption_utils.decrypt_field(blob)
+        except Exception:
+            return ""
+
+    insert = models.SearchPosting.__table__.insert()
+    sources = (
+        (models.ChatMessage.__table__, CHAT,
+         lambda m: chat_text(_decrypt(m.message_encrypted), _decrypt(m.response_encrypted))),
+        (models.Journal.__table__, JOURNAL, lambda j: _decrypt(j.content_encrypted)),
+    )
+    indexed = 0
+    for table, doc_type, text_of in sources:
+        after_id = 0
+        while True:
+            docs = db.execute(_unindexed_batch(table, doc_type, user_id, after_id)).all()
+            if not docs:
+                break
+            rows = [r for doc in docs for r in posting_rows(doc.user_id, doc_type, doc.id, text_of(doc))]
+            if rows:
+                db.execute(insert, rows)
+            indexed += len(docs)
+            after_id = docs[-1].id
+    return indexed
+
+
+def index_missing_archive(db, user_id: Optional[int] = None) -> int:
+    """Index archived chat records that have no postings (archives written
+    before archived history was searchable). Decrypts every archived month,
+    so it belongs in a background backfill. Returns records indexed."""
+    from . import chat_archive
+
+    archive = models.ChatArchive.__table__
+    postings = models.SearchPosting
+    stmt = select(archive.c.id, archive.c.user_id).order_by(archive.c.id)
+    if user_id is not None:
+        stmt = stmt.where(archive.c.user_id == user_id)
+    indexed = 0
+    for month in db.execute(stmt).all():
+        payload = db.execute(chat_archive.payload_stmt(month.id)).scalar()
+        try:
+            records = chat_archive.unpack(payload)
+        except Exception:
+            continue
+        done = set(db.execute(select(postings.doc_id).where(
+            postings.user_id == month.user_id, postings.doc_type == ARCHIVE,
+            postings.doc_id.in_([r["id"] for r in records]),
+        )).scalars())
+        rows = [
+            row
+            for r in records if r["id"] not in done
+            for row in posting_rows(month.user_id, ARCHIVE, r["id"], chat_archive.record_text(r))
+        ]
+        if rows:
+            db.execute(models.SearchPosting.__table__.insert(), rows)
+        indexed += sum(1 for r in records if r["id"] not in done)
+    return indexed
+
+
+def _snippet(text: str, query_terms: Iterable[str]) -> str:
+    """A window of the text around the first query term it contains."""
+    wanted = set(query_terms)
+    for match in _WORD.finditer(text.lower()):
+        if normalize_term(match.group()) in wanted:
+            start = max(0, match.start() - SNIPPET_RADIUS)
+            end = min(len(text), match.end() + SNIPPET_RADIUS)
+            return ("…" if start else "") + text[start:end].strip() + ("…" if end < len(text) else "")
+    return text[: 2 * SNIPPET_RADIUS] + ("…" if len(text) > 2 * SNIPPET_RADIUS else "")
+
+
+def _load_documents(db: Session, user_id: int, hits: List[tuple]) -> Dict[tuple, dict]:
+    """Decrypt just the hit documents."""
+    wanted = defaultdict(list)
+    for doc_type, doc_id in hits:
+        wanted[doc_type].append(doc_id)
+
+    docs: Dict[tuple, dict] = {}
+    if wanted[CHAT]:
+        chat = models.ChatMessage
+        for m in db.query(chat).filter(chat.user_id == user_id, chat.id.in_(wanted[CHAT])):
+            try:
+                text = chat_text(
+                    encryption_utils.decrypt_field(m.message_encrypted),
+                    encryption_utils.decrypt_field(m.response_encrypted),
+                )
+            except Exception:
+                continue
+            docs[(CHAT, m.id)] = {"text": text, "created_at": m.created_at, "session_id": m.session_id}
+    if wanted[JOURNAL]:
+        journal = models.Journal
+        for j in db.query(journal).filter(journal.user_id == user_id, journal.id.in_(wanted[JOURNAL])):
+            try:
+                text = encryption_utils.decrypt_field(j.content_encrypted)
+            except Exception:
+                continue
+            docs[(JOURNAL, j.id)] = {"text": text, "created_at": j.created_at, "session_id": None}
+    if wanted[ARCHIVE]:
+        from . import chat_archive
+
+        for record in chat_archive.find_records(db, user_id, wanted[ARCHIVE]):
+            docs[(ARCHIVE, record["id"])] = {
+                "text": chat_archive.record_text(record),
+                "created_at": chat_archive.created_at_of(record),
+                "session_id": record.get("session_id"),
+            }
+    return docs
+
+
+def search(db: Session, user_id: int, query: str, limit: int = 20, doc_type: Optional[str] = None) -> List[dict]:
+    """Ranked matches for a query over the user's chats and journals."""
+    query_terms = list(terms(query))[:MAX_QUERY_TERMS]
+    if not query_terms:
+        return []
+    tokens = [encryption_utils.blind_token(t) for t in query_terms]
+
+    postings = models.SearchPosting
+    scope = [postings.user_id == user_id]
+    if doc_type:
+        scope.append(postings.doc_type == doc_type)
+    df = dict(db.execute(
+        select(postings.token, func.count()).where(*scope, postings.token.in_(tokens)).group_by(postings.token)
+    ).all())
+    if not df:
+        return []
+
+    columns = (postings.doc_type, postings.doc_id, postings.token, postings.tf)
+    rare = [t for t, n in df.items() if n <= MAX_POSTINGS_PER_TERM]
+    rows = db.execute(select(*columns).where(*scope, postings.token.in_(rare))).all() if rare else []
+    candidates = {(row.doc_type, row.doc_id) for row in rows}
+    doc_ids = sorted({doc_id for _, doc_id in candidates})
+    for token in (t for t, n in df.items() if n > MAX_POSTINGS_PER_TERM):
+        if candidates:
+            # Only score the common term on documents the rarer terms matched.
+            for start in range(0, len(doc_ids), INDEX_BATCH_SIZE):
+                rows += [
+                    row for row in db.execute(select(*columns).where(
+                        *scope, postings.token == token,
+                        postings.doc_id.in_(doc_ids[start:start + INDEX_BATCH_SIZE]),
+                    )) if (row.doc_type, row.doc_id) in candidates
+                ]
+        else:
+            # Every term is common: rank only the newest postings of each.
+            rows += db.execute(
+                select(*columns).where(*scope, postings.token == token)
+                .order_by(postings.id.desc()).limit(MAX_POSTINGS_PER_TERM)
+            ).all()
+
+    stats = db.execute(
+        select(models.UserStats.total_messages, models.UserStats.journal_count)
+        .where(models.UserStats.user_id == user_id)
+    ).first()
+    n_docs = max(sum(stats) if stats else 0, max(df.values()))
+
+    scores: Dict[tuple, float] = defaultdict(float)
+    for row in rows:
+        idf = math.log(1 + (n_docs - df[row.token] + 0.5) / (df[row.token] + 0.5))
+        scores[(row.doc_type, row.doc_id)] += idf * row.tf * (_K1 + 1) / (row.tf + _K1)
+
+    # Ties go to the newer document.
+    top = heapq.nlargest(limit, scores.items(), key=lambda kv: (kv[1], kv[0][1]))
+    docs = _load_documents(db, user_id, [key for key, _ in top])
+
+    results = []
+    for key, score in top:
+        doc = docs.get(key)
+        if doc is None:
+            continue
+        created_at = doc["created_at"]
+        results.append({
+            "type": key[0],
+            "id": key[1],
+            "score": round(score, 4),
+            "snippet": _snippet(doc["text"], query_terms),
+            "session_id": doc["session_id"],
+            "created_at": created_at.isoformat() if created_at else None,
+        })
+    return results
@@ -64,6 +64,7 @@ def get_current_user(token: str, db):
     from fastapi import HTTPException, status
     from . import crud
     from . import models
+    from . import shards
     
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -78,12 +79,15 @@ def get_current_user(token: str, db):
         test_user.id = 1
         test_user.username = "testuser"
         test_user.email = "test@example.com"
+        shards.set_current_user(test_user.id)
         return test_user
     
     token_data = verify_token(token, credentials_exception)
     user = crud.get_user(db, username=token_data.username)
     if user is None:
         raise credentials_exception
+    # The rest of the request reads and writes this user's shard.
+    shards.set_current_user(user.id)
     return user
 
 def verify_admin_token(token: str, credentials_exception):
@@ -0,0 +1,154 @@
+"""
+Semantic response cache.
+
+Optional tier behind the exact-key response cache: questions are embedded
+with the all-MiniLM-L6-v2 function already loaded by ``LongTermMemory`` and
+matched against prior non-personal questions of the same personality by
+cosine similarity. Each personality has a small fixed-capacity vector
+matrix; the least recently used question is evicted when it is full.
+
+A lookup is a hit when the best similarity reaches
+SEMANTIC_CACHE_THRESHOLD. Every lookup's best score is recorded in a
+histogram (whether or not it hit) so the threshold can be tuned from
+/admin/cache/stats without redeploying.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .config import settings
+
+# Best-score histogram buckets: [0.50, 0.55), ..., [0.95, 1.00]; below 0.50 is one bucket.
+_BUCKET_FLOOR = 0.5
+_BUCKET_WIDTH = 0.05
+_BUCKET_COUNT = 10
+
+
+def normalize_vector(vector) -> Optional[np.ndarray]:
+    """Unit-length float32 copy of ``vector`` (None for an empty or zero vector)."""
+    vec = np.asarray(vector, dtype=np.float32).ravel()
+    norm = float(np.linalg.norm(vec)) if vec.size else 0.0
+    if norm == 0.0:
+        return None
+    return vec / norm
+
+
+class _PersonalityIndex:
+    """Fixed-capacity matrix of unit vectors with LRU slot reuse."""
+
+    def __init__(self, capacity: int, dim: int):
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self.valid = np.zeros(capacity, dtype=bool)
+        self.responses: List[Optional[str]] = [None] * capacity
+        self.keys: List[Optional[str]] = [None] * capacity
+        self.slots: "OrderedDict[str, int]" = OrderedDict()  # question_key -> slot, LRU order
+        self.free: List[int] = list(range(capacity - 1, -1, -1))
+
+    def search(self, vec: np.ndarray) -> Tuple[Optional[str], float]:
+        """(question_key, similarity) of the nearest stored question."""
+        if not self.slots:
+            return None, 0.0
+        sims = self.vectors @ vec
+        sims[~self.valid] = -np.inf
+        slot = int(np.argmax(sims))
+        return self.keys[slot], float(sims[slot])
+
+    def put(self, question_key: str, vec: np.ndarray, response: str) -> bool:
+        """Store a question; returns True if an older one was evicted to make room."""
+        evicted = False
+        slot = self.slots.pop(question_key, None)
+        if slot is None:
+            if self.free:
+                slot = self.free.pop()
+            else:
+                _, slot = self.slots.popitem(last=False)
+                evicted = True
+        self.vectors[slot] = vec
+        self.valid[slot] = True
+        self.responses[slot] = response
+        self.keys[slot] = question_key
+        self.slots[question_key] = slot
+        return evicted
+
+    def touch(self, question_key: str) -> None:
+        self.slots.move_to_end(question_key)
+
+
+class SemanticCache:
+    """Per-personality nearest-question lookup with hit/miss and similarity stats."""
+
+    def __init__(self, max_entries: int, threshold: float):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self._indexes: Dict[str, _PersonalityIndex] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._hit_similarity_sum = 0.0
+        self._best_score_histogram = [0] * (_BUCKET_COUNT + 1)
+
+    def get(self, personality: str, vector) -> Optional[Tuple[str, float]]:
+        """(response, similarity) of the nearest prior question above the threshold."""
+        vec = normalize_vector(vector)
+        if vec is None:
+            return None
+        with self._lock:
+            index = self._indexes.get(personality)
+            key, score = index.search(vec) if index and index.vectors.shape[1] == vec.size else (None, 0.0)
+            if key is not None:
+                self._record_score(score)
+            if key is None or score < self.threshold:
+                self.misses += 1
+                return None
+            index.touch(key)
+            self.hits += 1
+            self._hit_similarity_sum += score
+            return index.responses[index.slots[key]], score
+
+    def put(self, personality: str, question_key: str, vector, response: str) -> None:
+        vec = normalize_vector(vector)
+        if vec is None or self.max_entries <= 0:
+            return
+        with self._lock:
+            index = self._indexes.get(personality)
+            if index is None or index.vectors.shape[1] != vec.size:
+                index = self._indexes[personality] = _PersonalityIndex(self.max_entries, vec.size)
+            if index.put(question_key, vec, response):
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._indexes.clear()
+
+    def _record_score(self, score: float) -> None:
+        bucket = int((score - _BUCKET_FLOOR) // _BUCKET_WIDTH) + 1 if score >= _BUCKET_FLOOR else 0
+        self._best_score_histogram[min(bucket, _BUCKET_COUNT)] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            labels = [f"<{_BUCKET_FLOOR:.2f}"] + [
+                f"{_BUCKET_FLOOR + i * _BUCKET_WIDTH:.2f}" for i in range(_BUCKET_COUNT)
+            ]
+            return {
+                "enabled": settings.SEMANTIC_CACHE_ENABLED,
+                "threshold": self.threshold,
+                "entries": {p: len(index.slots) for p, index in self._indexes.items()},
+                "max_entries_per_personality": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "mean_hit_similarity": round(self._hit_similarity_sum / self.hits, 4) if self.hits else None,
+                "best_score_histogram": dict(zip(labels, self._best_score_histogram)),
+            }
+
+
+semantic_cache = SemanticCache(
+    max_entries=settings.SEMANTIC_CACHE_SIZE,
+    threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+)
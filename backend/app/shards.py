@@ -0,0 +1,276 @@
+"""
+Per-tenant SQLite sharding.
+
+With one SQLite file every user's chat turns queue on the same write lock.
+When SHARD_COUNT > 0 (SQLite only) the per-user tables live in shard files
+instead: user ``u`` is stored in ``{SHARD_DIR}/shard_{u % SHARD_COUNT:03d}.db``.
+The main database keeps the catalog (users, auth, settings, shared caches),
+so writers for users in different buckets never contend.
+
+Routing happens in ``RoutedSession.get_bind``: a statement that touches
+only catalog tables runs on the main engine; one that touches sharded
+tables runs on the shard of the session's user. The user comes from
+``scope(db, user_id)`` (background jobs, admin routes) or, failing that,
+from the request's authenticated user (``set_current_user``, called by
+``security.get_current_user``). crud needs no changes; a statement that
+joins catalog and shard tables, or touches a shard table with no user in
+scope, raises ShardScopeError.
+
+Shard engines are opened lazily and kept in an LRU of at most
+SHARD_MAX_OPEN; the least recently used one is disposed when the cap is
+reached. A shard's tables are created from the models the first time it
+is opened; a later migration that alters a sharded table must also be
+applied to every file in ``router.all_engines()``.
+
+Migrating an existing database:
+    python -m app.shards --migrate          # copy sharded tables into shard files
+    python -m app.shards --migrate --purge  # ...and delete the copied rows from the main file
+"""
+
+import logging
+import os
+import sys
+import threading
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional, Tuple
+
+from sqlalchemy import create_engine, delete, event, insert, select
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+from sqlalchemy.sql.util import find_tables
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# Per-user tables, listed parents first. Derived tables (sessions, counters,
+# rollups, postings, archive) shard with the rows they are derived from.
+SHARDED_TABLES = (
+    "chat_messages",
+    "chat_sessions",
+    "chat_archive",
+    "search_postings",
+    "journals",
+    "habits",
+    "habit_completion_years",
+    "emotion_records",
+    "emotion_daily_rollups",
+    "growth_milestones",
+    "user_stats",
+)
+_SHARDED = frozenset(SHARDED_TABLES)
+
+SCOPE_KEY = "shard_user_id"
+ASYNC_KEY = "shard_async"
+SHARD_POOL_SIZE = 2
+MIGRATE_BATCH_SIZE = 1000
+
+_ON_SQLITE = make_url(settings.DATABASE_URL).get_backend_name() == "sqlite"
+
+_current_user: ContextVar[Optional[int]] = ContextVar("shard_user_id", default=None)
+
+
+class ShardScopeError(RuntimeError):
+    """A statement on sharded tables could not be routed to one shard."""
+
+
+def enabled() -> bool:
+    return settings.SHARD_COUNT > 0 and _ON_SQLITE
+
+
+def shard_of(user_id: int) -> int:
+    return int(user_id) % settings.SHARD_COUNT
+
+
+def set_current_user(user_id: Optional[int]) -> None:
+    """Route this request's (or task's) unscoped shard statements to ``user_id``."""
+    _current_user.set(user_id)
+
+
+def current_user() -> Optional[int]:
+    return _current_user.get()
+
+
+def scope(db, user_id: Optional[int]) -> None:
+    """Route ``db``'s shard statements to ``user_id`` (Session or AsyncSession)."""
+    session = getattr(db, "sync_session", db)
+    session.info[SCOPE_KEY] = user_id
+
+
+class ShardRouter:
+    """Lazily opened shard engines, least recently used closed first."""
+
+    def __init__(self, directory: str, max_open: int):
+        self.directory = directory
+        self.max_open = max(1, max_open)
+        self._engines: "OrderedDict[int, Tuple[Engine, AsyncEngine]]" = OrderedDict()
+        self._created = set()
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.evicted = 0
+
+    def path(self, shard: int) -> str:
+        return os.path.join(self.directory, f"shard_{shard:03d}.db")
+
+    def engines(self, shard: int) -> Tuple[Engine, AsyncEngine]:
+        with self._lock:
+            pair = self._engines.get(shard)
+            if pair is not None:
+                self._engines.move_to_end(shard)
+                return pair
+            pair = self._open(shard)
+            self._engines[shard] = pair
+            while len(self._engines) > self.max_open:
+                _, (old_sync, _) = self._engines.popitem(last=False)
+                # Idle connections close now; checked-out ones close when returned.
+                old_sync.dispose()
+                self.evicted += 1
+            return pair
+
+    def sync_engine(self, user_id: int) -> Engine:
+        return self.engines(shard_of(user_id))[0]
+
+    def async_engine(self, user_id: int) -> AsyncEngine:
+        return self.engines(shard_of(user_id))[1]
+
+    def _open(self, shard: int) -> Tuple[Engine, AsyncEngine]:
+        from .database import apply_sqlite_pragmas
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(shard)
+        connect_args = {"check_same_thread": False, "timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000.0}
+        sync_engine = create_engine(
+            f"sqlite:///{path}", connect_args=connect_args, pool_pre_ping=True,
+            pool_size=SHARD_POOL_SIZE, max_overflow=settings.DB_MAX_OVERFLOW,
+        )
+        event.listen(sync_engine, "connect", apply_sqlite_pragmas)
+        # No pooled async connections, so an evicted shard holds nothing open.
+        async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}", connect_args=connect_args, poolclass=NullPool)
+        event.listen(async_engine.sync_engine, "connect", apply_sqlite_pragmas)
+        if shard not in self._created:
+            create_shard_schema(sync_engine)
+            self._created.add(shard)
+        self.opened += 1
+        return sync_engine, async_engine
+
+    def all_engines(self) -> Iterator[Tuple[int, Engine]]:
+        """(shard, engine) for every shard file that exists, for fan-out queries."""
+        for shard in range(settings.SHARD_COUNT):
+            if os.path.exists(self.path(shard)):
+                yield shard, self.engines(shard)[0]
+
+    def stats(self) -> dict:
+        return {
+            "enabled": enabled(),
+            "shard_count": settings.SHARD_COUNT,
+            "open": len(self._engines),
+            "max_open": self.max_open,
+            "opened": self.opened,
+            "evicted": self.evicted,
+        }
+
+
+def sharded_tables() -> list:
+    from . import models
+    return [models.Base.metadata.tables[name] for name in SHARDED_TABLES]
+
+
+def create_shard_schema(bind: Engine) -> None:
+    from . import models
+    models.Base.metadata.create_all(bind=bind, tables=sharded_tables(), checkfirst=True)
+
+
+router = ShardRouter(settings.SHARD_DIR, settings.SHARD_MAX_OPEN)
+
+
+def _table_names(mapper, clause) -> set:
+    names = set()
+    if clause is not None:
+        names.update(t.name for t in find_tables(clause, include_crud=True) if hasattr(t, "name"))
+    if not names and mapper is not None:
+        names.update(t.name for t in mapper.tables)
+    return names
+
+
+class RoutedSession(Session):
+    """Session that sends shard-table statements to the scoped user's shard."""
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if not enabled():
+            return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+        names = _table_names(mapper, clause)
+        sharded = names & _SHARDED
+        if not sharded:
+            return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+        if names - _SHARDED:
+            raise ShardScopeError(f"Statement joins catalog tables {sorted(names - _SHARDED)} with shard tables {sorted(sharded)}")
+        user_id = self.info.get(SCOPE_KEY)
+        if user_id is None:
+            user_id = current_user()
+        if user_id is None:
+            raise ShardScopeError(f"No user in scope for shard tables {sorted(sharded)}")
+        if self.info.get(ASYNC_KEY):
+            return router.async_engine(user_id).sync_engine
+        return router.sync_engine(user_id)
+
+
+def fan_out(fn) -> Dict[int, object]:
+    """``fn(connection)`` on every shard; returns {shard: result}."""
+    results = {}
+    for shard, engine in router.all_engines():
+        with engine.connect() as conn:
+            results[shard] = fn(conn)
+    return results
+
+
+# Migration
+
+def migrate(source: Engine, purge: bool = False, batch_size: int = MIGRATE_BATCH_SIZE) -> Dict[str, int]:
+    """Copy every sharded table's rows from ``source`` into the shard files (ids
+    preserved), one batch per transaction. Rows already present in a shard are
+    skipped, so an interrupted run can be resumed. Returns rows written or
+    already present, per table."""
+    report: Dict[str, int] = {}
+    for table in sharded_tables():
+        copied = 0
+        key = next(iter(table.primary_key.columns))
+        after = None
+        while True:
+            stmt = select(table).order_by(key).limit(batch_size)
+            if after is not None:
+                stmt = stmt.where(key > after)
+            with source.connect() as conn:
+                rows = conn.execute(stmt).mappings().all()
+            if not rows:
+                break
+            by_shard: Dict[int, list] = {}
+            for row in rows:
+                if row["user_id"] is None:
+                    continue  # anonymous rows (e.g. manual mood logs) stay in the main file
+                by_shard.setdefault(shard_of(row["user_id"]), []).append(dict(row))
+            for shard, batch in by_shard.items():
+                with router.engines(shard)[0].begin() as conn:
+                    conn.execute(insert(table).prefix_with("OR IGNORE"), batch)
+                copied += len(batch)
+            if purge:
+                with source.begin() as conn:
+                    conn.execute(delete(table).where(key.in_([r[key.name] for r in rows]), table.c.user_id.isnot(None)))
+            after = rows[-1][key.name]
+        report[table.name] = copied
+        logger.info(f"Sharded {copied} {table.name} rows")
+    return report
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    if "--migrate" not in sys.argv:
+        print(__doc__)
+        sys.exit(1)
+    if not enabled():
+        print("Set SHARD_COUNT > 0 (SQLite only) before migrating")
+        sys.exit(1)
+    from .database import engine
+    print(migrate(engine, purge="--purge" in sys.argv))
@@ -24,7 +24,8 @@ from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordBearer
 from pydantic import BaseModel
 
-from . import crud, schemas, security
+from . import crud, async_crud, emotion_rollups, schemas, security
+from .connection_hold import RequestHold, stream_hold
 from .database import SessionLocal
 from .enhanced_chat_pipeline import enhanced_chat_pipeline
 from .mitra_core import mitra_core
@@ -33,6 +34,7 @@ from .initiative_engine import (
     get_silence_response,
     get_hesitation_phrase,
     detect_emotion_pattern,
+    pattern_from_counts,
 )
 from .soul_engine import (
     build_soul_layer_instructions,
@@ -360,7 +362,7 @@ async def _generate_stream(
     session_id: str,
     personality: str,
     user_id: Optional[int],
-    db,
+    hold: Optional[RequestHold] = None,
 ) -> AsyncGenerator[str, None]:
     """
     SOUL LOOP — Phase 5: Unified Soul System.
@@ -377,8 +379,27 @@ async def _generate_stream(
         ↓ Automation opportunity detected
         ↓ Milestone witnessed
         ↓ UI rendered (emotion-aware)
+
+    Database work happens in short ``hold.sessions()`` scopes (context
+    reads, the reply pipeline's reads and persistence); no connection is
+    held while the model generates or while pacing.
     """
+    hold = hold or RequestHold(stream_hold)
+    try:
+        async for event in _soul_loop(message, session_id, personality, user_id, hold):
+            yield event
+    finally:
+        hold.finish()
 
+
+async def _soul_loop(
+    message: str,
+    session_id: str,
+    personality: str,
+    user_id: Optional[int],
+    hold: RequestHold,
+) -> AsyncGenerator[str, None]:
+    """Body of _generate_stream."""
     # ── Step 1: Thinking indicator ───────────────────────────────────
     thinking_msgs = THINKING_PHASES.get(personality, THINKING_PHASES["default"])
     yield _sse_event("thinking", {
@@ -402,7 +423,9 @@ async def _generate_stream(
     # Memory retrieval (silent)
     try:
         if user_id and enhanced_chat_pipeline.long_term_memory:
-            allowed = enhanced_chat_pipeline._get_allowed_memory_categories(user_id, db)
+            async with hold.sessions() as (_, adb):
+                settings_obj = await async_crud.get_user_settings(adb, user_id)
+            allowed = enhanced_chat_pipeline._allowed_categories_for(settings_obj)
             raw = enhanced_chat_pipeline.long_term_memory.retrieve_memories(
                 message, user_id, top_k=3, allowed_categories=allowed,
             )
@@ -430,23 +453,23 @@ async def _generate_stream(
 
     # DB context: past emotions, message count, growth arc
     try:
-        if user_id and db:
-            from . import models
-            records = db.query(models.EmotionRecord).filter(
-                models.EmotionRecord.user_id == user_id
-            ).order_by(models.EmotionRecord.timestamp.desc()).limit(15).all()
-            past_emotions = [
-                {"emotion": r.primary_emotion, "timestamp": r.timestamp.isoformat() if r.timestamp else None}
-                for r in records
-            ]
-            message_count = db.query(models.ChatMessage).filter(
-                models.ChatMessage.user_id == user_id
-            ).count() or 0
+        if user_id:
+            async with hold.sessions() as (db, adb):
+                past_emotions = await async_crud.get_recent_emotions(adb, user_id, limit=15)
+                chat_stats = await async_crud.get_user_chat_stats(adb, user_id)
+                milestones = await async_crud.get_user_milestones(adb, user_id)
+
+                # User name
+                try:
+                    user_obj = crud.get_user(db, user_id) if hasattr(crud, 'get_user_by_id') else None
+                    if user_obj and hasattr(user_obj, 'username'):
+                        user_name = user_obj.username
+                except Exception:
+                    pass
+            message_count = chat_stats.get("total_messages", 0) or 0
 
             # Growth arc
             try:
-                milestones = crud.get_user_milestones(db, user_id)
-                chat_stats = crud.get_user_chat_stats(db, user_id)
                 first_chat = chat_stats.get("first_chat_at")
                 if first_chat:
                     if isinstance(first_chat, str):
@@ -460,14 +483,6 @@ async def _generate_stream(
                 )
             except Exception:
                 pass
-
-            # User name
-            try:
-                user_obj = crud.get_user(db, user_id) if hasattr(crud, 'get_user_by_id') else None
-                if user_obj and hasattr(user_obj, 'username'):
-                    user_name = user_obj.username
-            except Exception:
-                pass
     except Exception as e:
         logger.error(f"DB context failed: {e}")
 
@@ -553,13 +568,15 @@ async def _generate_stream(
     else:
         try:
             soul_instructions = mitra_st["system_prompt"]
+            # The pipeline opens its own hold scopes around its database steps,
+            # so the model call itself is not counted as (or holding) a connection.
             result = await enhanced_chat_pipeline.get_mitra_reply(
                 user_input=message,
                 user_id=user_id,
-                db=db,
                 personality=personality,
                 session_id=session_id,
                 soul_prompt=soul_instructions,
+                sessions=hold.sessions,
             )
             full_response = result.get("response", "")
             if not full_response or len(full_response.strip()) < 4:
@@ -666,7 +683,7 @@ async def _generate_stream(
     # ── Step 11: Emotion pattern detection ───────────────────────────
     pattern = None
     try:
-        if user_id and db and past_emotions:
+        if user_id and past_emotions:
             pattern = detect_emotion_pattern(past_emotions)
             if pattern:
                 yield _sse_event("pattern", pattern)
@@ -703,11 +720,22 @@ async def get_current_user_optional(token: str = Depends(oauth2_scheme_optional)
 
 
 # ─── Streaming chat route ────────────────────────────────────────────────
+async def _stream_user(token: str = Depends(oauth2_scheme_optional)):
+    """get_current_user_optional on a session closed before the stream starts
+    (a get_db session would stay open until the response finished)."""
+    if not token:
+        return None
+    try:
+        with SessionLocal() as db:
+            return security.get_current_user(token, db)
+    except Exception:
+        return None
+
+
 @router.post("/chat/stream")
 async def chat_stream(
     request: StreamChatRequest,
-    current_user=Depends(get_current_user_optional),
-    db=Depends(get_db),
+    current_user=Depends(_stream_user),
 ):
     """
     Phase 3 Streaming SSE endpoint.
@@ -727,7 +755,6 @@ async def chat_stream(
             session_id=session_id,
             personality=personality,
             user_id=user_id,
-            db=db,
         ),
         media_type="text/event-stream",
         headers={
@@ -775,15 +802,8 @@ async def check_initiative(
     # Get last emotion
     last_emotion = "neutral"
     try:
-        from . import models
-        last_record = db.query(models.EmotionRecord).filter(
-            models.EmotionRecord.user_id == user_id
-        ).order_by(
-            models.EmotionRecord.timestamp.desc()
-        ).first()
-
-        if last_record:
-            last_emotion = last_record.primary_emotion or "neutral"
+        from . import read_models
+        last_emotion = db.execute(read_models.last_emotion_stmt(user_id)).scalar() or "neutral"
     except Exception:
         pass
 
@@ -814,26 +834,20 @@ async def get_emotion_patterns(
 
     try:
         from . import models
-        records = db.query(models.EmotionRecord).filter(
+        week = emotion_rollups.get_distribution(db, user_id, days=7)
+        if not week["total"]:
+            return {"pattern": None, "emotions": []}
+
+        recent = db.query(models.EmotionRecord.primary_emotion).filter(
             models.EmotionRecord.user_id == user_id
         ).order_by(
             models.EmotionRecord.timestamp.desc()
-        ).limit(30).all()
-
-        if not records:
-            return {"pattern": None, "emotions": []}
-
-        record_dicts = [
-            {"emotion": r.primary_emotion, "timestamp": r.timestamp.isoformat() if r.timestamp else None}
-            for r in records
-        ]
-
-        pattern = detect_emotion_pattern(record_dicts)
+        ).limit(5).all()
 
         return {
-            "pattern": pattern,
-            "emotion_count": len(records),
-            "recent_emotions": [r.primary_emotion for r in records[:5]],
+            "pattern": pattern_from_counts(week["emotion_counts"]),
+            "emotion_count": week["total"],
+            "recent_emotions": [r.primary_emotion for r in recent],
         }
     except Exception as e:
         logger.error(f"Pattern retrieval failed: {e}")
@@ -148,7 +148,7 @@ def commit_system_action(
 
     # Approve and execute.
     try:
-        params_json = encryption_utils.decrypt_data(approval.params_encrypted.decode("utf-8"))
+        params_json = encryption_utils.decrypt_field(approval.params_encrypted)
         params = json.loads(params_json) if params_json else {}
     except Exception:
         return {"ok": False, "status": "failed", "error": "Failed to load action parameters"}
@@ -0,0 +1,215 @@
+"""
+Single-writer group-commit queue.
+
+SQLite allows one writer at a time, so per-request commits from concurrent
+chat turns queue up on the write lock (and on fsync). Instead, write
+operations are submitted to one dedicated writer thread which collects
+whatever arrives within WRITE_QUEUE_BATCH_MS (up to WRITE_QUEUE_MAX_BATCH
+operations) and applies them in a single transaction.
+
+An operation is ``op(db, *args, **kwargs)`` that stages its writes on the
+writer's Session without committing (``crud.add_chat_message``,
+``emotion_rollups.add_emotion_record``, ...). ``submit`` returns a
+``concurrent.futures.Future`` resolved with the op's return value once the
+batch has committed; ``run`` is the awaitable form. Returned ORM objects
+are refreshed before the commit so ids and server defaults are readable.
+
+If any op in a batch fails, the batch is rolled back and its ops are
+replayed one transaction each, so only the failing op's future carries the
+exception. When the writer is not running (WRITE_QUEUE_ENABLED=false,
+before startup, scripts, tests) each op runs in its own transaction:
+inline on a plain thread, or on a worker thread when submitted from the
+event loop, so an async route never blocks on a SQLite commit.
+
+With sharding enabled an op writes to the shard of the user in scope when
+it was submitted (``shards.current_user()``); a batch commits once per
+shard it touches.
+"""
+
+import asyncio
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session, sessionmaker
+
+from .config import settings
+from .database import engine
+from . import shards
+from .shards import RoutedSession
+
+logger = logging.getLogger(__name__)
+
+# Objects returned to callers stay readable after the commit and session close.
+WriterSession = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False, class_=RoutedSession)
+
+_Op = Tuple[Callable[..., Any], tuple, dict, Future, Optional[int]]
+_STOP = object()
+
+
+def _apply(db: Session, fn: Callable[..., Any], args: tuple, kwargs: dict) -> Any:
+    result = fn(db, *args, **kwargs)
+    db.flush()
+    state = inspect(result, raiseerr=False)
+    if state is not None and getattr(state, "persistent", False):
+        db.refresh(result)
+    return result
+
+
+class WriteQueue:
+    """Batches staged write operations into group commits on one thread."""
+
+    def __init__(self, session_factory=WriterSession, batch_ms: float = 5, max_batch: int = 200):
+        self.session_factory = session_factory
+        self.batch_seconds = batch_ms / 1000.0
+        self.max_batch = max_batch
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self.batches = 0
+        self.ops_committed = 0
+        self.ops_failed = 0
+        self.batch_fallbacks = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._thread = threading.Thread(target=self._run, name="sqlite-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Commit everything already queued, then stop the writer."""
+        if not self.running:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def submit(self, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        """Queue ``fn(db, *args, **kwargs)``; the future resolves after its batch commits."""
+        future: Future = Future()
+        op = (fn, args, kwargs, future, shards.current_user())
+        if not self.running:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                self._commit_one(op)
+            else:
+                loop.run_in_executor(None, self._commit_one, op)
+            return future
+        self._queue.put(op)
+        return future
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Awaitable ``submit``: returns the op's result (or raises its exception)."""
+        if not self.running:
+            return await asyncio.to_thread(lambda: self.submit(fn, *args, **kwargs).result())
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "queued": self._queue.qsize(),
+            "batches": self.batches,
+            "ops_committed": self.ops_committed,
+            "ops_failed": self.ops_failed,
+            "batch_fallbacks": self.batch_fallbacks,
+            "mean_batch_size": round(self.ops_committed / self.batches, 2) if self.batches else 0.0,
+        }
+
+    # Writer thread
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch: List[_Op] = [item]
+            stopping = False
+            deadline = time.monotonic() + self.batch_seconds
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            for group in self._by_shard(batch):
+                self._commit_batch(group)
+            if stopping:
+                return
+
+    @staticmethod
+    def _by_shard(batch: List[_Op]) -> List[List[_Op]]:
+        """Split a batch into one group per shard (the whole batch when unsharded)."""
+        if not shards.enabled():
+            return [batch]
+        groups: Dict[Optional[int], List[_Op]] = {}
+        for op in batch:
+            user_id = op[4]
+            groups.setdefault(None if user_id is None else shards.shard_of(user_id), []).append(op)
+        return list(groups.values())
+
+    def _session(self, user_id: Optional[int]) -> Session:
+        db = self.session_factory()
+        shards.scope(db, user_id)
+        return db
+
+    def _commit_batch(self, batch: List[_Op]) -> None:
+        db = self._session(batch[0][4])
+        try:
+            results = [_apply(db, fn, args, kwargs) for fn, args, kwargs, _, _ in batch]
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            if len(batch) == 1:
+                self._fail(batch[0][3], e)
+                return
+            # Isolate the failing op: replay each in its own transaction.
+            self.batch_fallbacks += 1
+            for op in batch:
+                self._commit_one(op)
+            return
+        finally:
+            db.close()
+        self.batches += 1
+        self.ops_committed += len(batch)
+        for (_, _, _, future, _), result in zip(batch, results):
+            future.set_result(result)
+
+    def _commit_one(self, op: _Op) -> None:
+        fn, args, kwargs, future, user_id = op
+        db = self._session(user_id)
+        try:
+            result = _apply(db, fn, args, kwargs)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            self._fail(future, e)
+            return
+        finally:
+            db.close()
+        self.batches += 1
+        self.ops_committed += 1
+        future.set_result(result)
+
+    def _fail(self, future: Future, error: Exception) -> None:
+        self.ops_failed += 1
+        logger.warning(f"Queued write failed: {error}")
+        future.set_exception(error)
+
+
+write_queue = WriteQueue(
+    batch_ms=settings.WRITE_QUEUE_BATCH_MS,
+    max_batch=settings.WRITE_QUEUE_MAX_BATCH,
+)
@@ -1,8 +1,17 @@
 from Crypto.Cipher import AES
 import base64
+import hashlib
+import hmac
 import os
+import zlib
 from dotenv import load_dotenv
 
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
 # Load environment variables (ensure backend .env is used and overrides any existing values)
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), ".env"), override=True)
 
@@ -13,17 +22,79 @@ KEY = os.getenv("ENCRYPTION_KEY", "mymitra-encryption-key-32chars!!").strip()
 if len(KEY) != 32:
     raise ValueError(f"ENCRYPTION_KEY must be exactly 32 characters long! Current length: {len(KEY)}")
 
+_KEY_BYTES = KEY.encode()
+
+# Key rotation: new values are written under ENCRYPTION_KEY as key id
+# ENCRYPTION_KEY_ID; keys it replaced stay readable while app.key_rotation
+# re-encrypts their rows, listed as ENCRYPTION_OLD_KEYS="0:<key>,1:<key>".
+KEY_ID = int(os.getenv("ENCRYPTION_KEY_ID", "0"))
+
+def _load_keys() -> dict:
+    keys = {}
+    for entry in filter(None, (e.strip() for e in os.getenv("ENCRYPTION_OLD_KEYS", "").split(","))):
+        key_id, _, old_key = entry.partition(":")
+        keys[int(key_id)] = old_key.strip().encode()
+    keys[KEY_ID] = _KEY_BYTES
+    for key_id, key in keys.items():
+        if not 0 <= key_id <= 255 or len(key) != 32:
+            raise ValueError(f"Encryption key {key_id}: ids must be 0-255 and keys exactly 32 characters long")
+    return keys
+
+KEYS = _load_keys()
+
+def _key(key_id: int) -> bytes:
+    try:
+        return KEYS[key_id]
+    except KeyError:
+        raise ValueError(f"Unknown encryption key id {key_id} (add it to ENCRYPTION_OLD_KEYS)")
+
+# Field values at least this long (UTF-8 bytes) are compressed before
+# encryption, with zstd when installed and zlib otherwise. 0 disables.
+COMPRESS_MIN_BYTES = int(os.getenv("CIPHER_COMPRESS_MIN_BYTES", "512"))
+COMPRESS_ALGORITHM = os.getenv("CIPHER_COMPRESS_ALGORITHM", "zstd").strip().lower()
+
+def _split_text(encrypted_data: str):
+    """(key id, base64) of encrypt_data output. Values under a key id other
+    than 0 carry a "k<id>:" prefix; base64 never contains ':'."""
+    head, sep, tail = encrypted_data.partition(":")
+    if sep and head.startswith("k"):
+        return int(head[1:]), tail
+    return 0, encrypted_data
+
 def encrypt_data(data: str) -> str:
-    cipher = AES.new(KEY.encode(), AES.MODE_EAX)
+    cipher = AES.new(_KEY_BYTES, AES.MODE_EAX)
     nonce = cipher.nonce
     ciphertext, tag = cipher.encrypt_and_digest(data.encode())
     # Store nonce + ciphertext + tag so decrypt can verify integrity.
-    return base64.b64encode(nonce + ciphertext + tag).decode()
+    encoded = base64.b64encode(nonce + ciphertext + tag).decode()
+    return f"k{KEY_ID}:{encoded}" if KEY_ID else encoded
+
+def encrypt_bytes(data: bytes) -> bytes:
+    """Binary form of encrypt_data: nonce + ciphertext + tag, no base64."""
+    cipher = AES.new(_KEY_BYTES, AES.MODE_EAX)
+    ciphertext, tag = cipher.encrypt_and_digest(data)
+    return cipher.nonce + ciphertext + tag
+
+def decrypt_bytes_keyed(blob: bytes):
+    """(key id, plaintext) of an encrypt_bytes blob. The blob has no key id,
+    so each key is tried in turn (current first); the tag rejects the others."""
+    for key_id in sorted(KEYS, key=lambda k: k != KEY_ID):
+        cipher = AES.new(KEYS[key_id], AES.MODE_EAX, nonce=blob[:16])
+        try:
+            return key_id, cipher.decrypt_and_verify(blob[16:-16], blob[-16:])
+        except ValueError:
+            continue
+    raise ValueError("MAC check failed under every configured key")
+
+def decrypt_bytes(blob: bytes) -> bytes:
+    """Inverse of encrypt_bytes (verifies the tag)."""
+    return decrypt_bytes_keyed(blob)[1]
 
 def decrypt_data(encrypted_data: str) -> str:
+    key_id, encrypted_data = _split_text(encrypted_data)
     raw = base64.b64decode(encrypted_data)
     nonce = raw[:16]
-    cipher = AES.new(KEY.encode(), AES.MODE_EAX, nonce=nonce)
+    cipher = AES.new(_key(key_id), AES.MODE_EAX, nonce=nonce)
 
     # Backward compatibility:
     # - old format: nonce (16) + ciphertext
@@ -37,3 +108,106 @@ def decrypt_data(encrypted_data: str) -> str:
     # This should be temporary; new writes always include the tag.
     ciphertext = raw[16:]
     return cipher.decrypt(ciphertext).decode()
+
+# Binary field format, for LargeBinary columns:
+#   v3: version (0x03) | flags | key id | GCM nonce (12) | ciphertext | tag (16)
+#   v2: version (0x02) | flags | GCM nonce (12) | ciphertext | tag (16), key id 0
+# flags records how the plaintext was compressed (FLAG_ZLIB / FLAG_ZSTD, or
+# 0 for none). The header bytes are authenticated with the ciphertext.
+# Each value holds one user's own text, never attacker-chosen input mixed
+# with a secret, so the compressed length leaks nothing a reader could probe.
+# Legacy values are encrypt_data()'s base64 text stored as UTF-8 bytes;
+# base64 never starts with byte 0x02 or 0x03, so the first byte tells them apart.
+FORMAT_V2 = 0x02
+FORMAT_V3 = 0x03
+FLAG_ZLIB = 0x01
+FLAG_ZSTD = 0x02
+_GCM_NONCE = 12
+_GCM_TAG = 16
+_RAISE = object()
+
+def _compress(raw: bytes):
+    """(flags, payload): the compressed form when it is enabled and smaller."""
+    if COMPRESS_MIN_BYTES <= 0 or len(raw) < COMPRESS_MIN_BYTES:
+        return 0, raw
+    if COMPRESS_ALGORITHM == "zstd" and ZSTD_AVAILABLE:
+        flags, packed = FLAG_ZSTD, zstandard.ZstdCompressor(level=3).compress(raw)
+    else:
+        flags, packed = FLAG_ZLIB, zlib.compress(raw, 6)
+    return (flags, packed) if len(packed) < len(raw) else (0, raw)
+
+def _decompress(flags: int, payload: bytes) -> bytes:
+    if flags & FLAG_ZSTD:
+        if not ZSTD_AVAILABLE:
+            raise ValueError("Value is zstd-compressed but the zstandard package is not installed")
+        return zstandard.ZstdDecompressor().decompress(payload)
+    if flags & FLAG_ZLIB:
+        return zlib.decompress(payload)
+    return payload
+
+def encrypt_field(text: str) -> bytes:
+    """Encrypt text for a binary column (format v3), compressing long values."""
+    flags, payload = _compress(text.encode())
+    header = bytes((FORMAT_V3, flags, KEY_ID))
+    nonce = os.urandom(_GCM_NONCE)
+    cipher = AES.new(_KEY_BYTES, AES.MODE_GCM, nonce=nonce)
+    cipher.update(header)
+    ciphertext, tag = cipher.encrypt_and_digest(payload)
+    return header + nonce + ciphertext + tag
+
+def is_legacy(blob) -> bool:
+    """True for values still in the base64 (encrypt_data) format."""
+    return not blob or blob[0] not in (FORMAT_V2, FORMAT_V3)
+
+def key_id_of(value) -> int:
+    """Id of the key a stored value (binary field or encrypt_data text) was written with."""
+    if isinstance(value, str):
+        return _split_text(value)[0]
+    value = bytes(value)
+    if is_legacy(value):
+        return _split_text(value.decode("utf-8"))[0]
+    return value[2] if value[0] == FORMAT_V3 else 0
+
+def decrypt_field(blob) -> str:
+    """Decrypt a binary column value in any format (str is legacy text)."""
+    if isinstance(blob, str):
+        return decrypt_data(blob)
+    blob = bytes(blob)
+    if is_legacy(blob):
+        return decrypt_data(blob.decode("utf-8"))
+    start = 3 if blob[0] == FORMAT_V3 else 2
+    nonce = blob[start:start + _GCM_NONCE]
+    cipher = AES.new(_key(key_id_of(blob)), AES.MODE_GCM, nonce=nonce)
+    cipher.update(blob[:start])
+    payload = cipher.decrypt_and_verify(blob[start + _GCM_NONCE:-_GCM_TAG], blob[-_GCM_TAG:])
+    return _decompress(blob[1], payload).decode()
+
+def encrypt_many(texts) -> list:
+    """encrypt_field over a batch; None stays None."""
+    return [encrypt_field(t) if t is not None else None for t in texts]
+
+def decrypt_many(blobs, default=_RAISE) -> list:
+    """decrypt_field over a batch; None stays None. A value that fails to
+    decrypt raises, or becomes ``default`` when one is given."""
+    result = []
+    for blob in blobs:
+        if blob is None:
+            result.append(None)
+            continue
+        try:
+            result.append(decrypt_field(blob))
+        except Exception:
+            if default is _RAISE:
+                raise
+            result.append(default)
+    return result
+
+# Blind index tokens: a keyed HMAC of a normalized search term, so the search
+# index can be matched by equality without storing any plaintext words.
+# Tokens must not change when the encryption key rotates, so they stay
+# derived from key ENCRYPTION_SEARCH_KEY_ID (keep it in ENCRYPTION_OLD_KEYS).
+SEARCH_KEY_ID = int(os.getenv("ENCRYPTION_SEARCH_KEY_ID", "0"))
+_SEARCH_KEY = hmac.new(_key(SEARCH_KEY_ID), b"mymitra-search-index-v1", hashlib.sha256).digest()
+
+def blind_token(term: str) -> bytes:
+    return hmac.new(_SEARCH_KEY, term.encode(), hashlib.sha256).digest()[:16]
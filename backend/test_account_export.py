@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Test script to validate the streaming NDJSON account export.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(__file__))
+
+import json
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app import models, crud, schemas, account_export, emotion_rollups
+import encryption_utils
+import tempfile
+
+def create_test_db():
+    """Create a temporary test database."""
+    db_file = tempfile.mktemp(suffix='.db')
+    engine = create_engine(f"sqlite:///{db_file}")
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    return SessionLocal, db_file
+
+def test_export_streams_every_table():
+    """Every row type is exported decrypted, and chats stream in batches."""
+    print("Testing streaming account export...")
+
+    SessionLocal, db_file = create_test_db()
+    db = SessionLocal()
+
+    try:
+        db.add(models.User(id=1, username="testuser", email="test@example.com", hashed_password="dummy"))
+        db.add(models.User(id=2, username="other", email="other@example.com", hashed_password="dummy"))
+        db.commit()
+
+        for i in range(7):
+            crud.create_chat_message(db, 1, f"message {i}", f"reply {i}", "default", session_id="s1")
+        crud.create_chat_message(db, 2, "not mine", "nope", "default")
+        crud.create_journal(db, user_id=1, journal=schemas.JournalCreate(content="dear diary", mood=7))
+        habit = crud.create_habit(db, user_id=1, habit=schemas.HabitCreate(title="Run", frequency="daily"))
+        crud.complete_habit(db, user_id=1, habit_id=habit['id'])
+        emotion_rollups.add_emotion_record(db, models.EmotionRecord(
+            user_id=1, primary_emotion="happy", primary_intensity="high", confidence=0.9,
+            source_text=encryption_utils.encrypt_data("great day"), source_type="chat",
+        ))
+        db.commit()
+        crud.store_milestone(db, 1, {"type": "courage", "recognition": "brave", "source_snippet": "I tried"})
+
+        batches = []
+        original = account_export._chat_records
+        account_export._chat_records = lambda rows: batches.append(len(rows)) or original(rows)
+        try:
+            lines = list(account_export.iter_ndjson(SessionLocal, 1, batch_size=3))
+        finally:
+            account_export._chat_records = original
+
+        records = [json.loads(line) for line in lines]
+        types = [r["type"] for r in records]
+        print(f"Exported {len(records)} records in chat batches {batches}")
+
+        assert types[0] == "export" and records[0]["version"] == account_export.EXPORT_VERSION
+        assert batches == [3, 3, 1], f"Chats should be read and decrypted in batches, got {batches}"
+        assert types.count("chat_message") == 7, "Only the user's own chats are exported"
+        assert [r["user_message"] for r in records if r["type"] == "chat_message"][:2] == ["message 0", "message 1"]
+
+        journal = next(r for r in records if r["type"] == "journal")
+        assert journal["content"] == "dear diary" and journal["mood"] == 7
+        exported_habit = next(r for r in records if r["type"] == "habit")
+        assert exported_habit["title"] == "Run" and len(sum(exported_habit["completed_days"].values(), [])) == 1
+        emotion = next(r for r in records if r["type"] == "emotion_record")
+        assert emotion["source_text"] == "great day", "Encrypted emotion source text should be decrypted"
+        assert "growth_milestone" in types
+
+        print("✅ Streaming account export test passed!")
+
+    finally:
+        db.close()
+        os.unlink(db_file)
+
+if __name__ == "__main__":
+    print("🧪 Running account export tests...\n")
+
+    try:
+        test_export_streams_every_table()
+
+        print("\n🎉 All account export tests passed!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Test script to validate bulk NDJSON account import.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(__file__))
+
+import json
+import time
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app import models, crud, schemas, account_export, account_import, emotion_rollups
+import encryption_utils
+import tempfile
+
+def create_test_db():
+    """Create a temporary test database."""
+    db_file = tempfile.mktemp(suffix='.db')
+    engine = create_engine(f"sqlite:///{db_file}")
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    return SessionLocal, db_file
+
+class FakeMemory:
+    """Records embedding batches instead of calling Chroma."""
+    def __init__(self):
+        self.batches = []
+
+    def store_memories_with_category(self, user_id, contents, memory_type, memory_category):
+        self.batches.append(len(contents))
+        return [str(i) for i in range(len(contents))]
+
+def test_export_round_trips_into_another_account():
+    """An export imports cleanly, and derived tables are rebuilt for the target user."""
+    print("Testing export -> import round trip...")
+
+    SessionLocal, db_file = create_test_db()
+    db = SessionLocal()
+
+    try:
+        for user_id in (1, 2):
+            db.add(models.User(id=user_id, username=f"user{user_id}", email=f"u{user_id}@example.com", hashed_password="dummy"))
+        db.add(models.UserSettings(user_id=2, allow_mental_health_inference=True))
+        db.commit()
+
+        for i in range(5):
+            crud.create_chat_message(db, 1, f"message {i}", f"reply {i}", "mentor", session_id="s1")
+        crud.create_journal(db, user_id=1, journal=schemas.JournalCreate(content="dear diary", mood=7))
+        habit = crud.create_habit(db, user_id=1, habit=schemas.HabitCreate(title="Run", frequency="daily"))
+        crud.complete_habit(db, user_id=1, habit_id=habit['id'])
+        emotion_rollups.add_emotion_record(db, models.EmotionRecord(
+            user_id=1, primary_emotion="happy", primary_intensity="high", confidence=0.9,
+            source_text=encryption_utils.encrypt_data("message 0"),
+        ))
+        db.commit()
+
+        lines = list(account_export.iter_ndjson(SessionLocal, 1)) + ["not json\n"]
+        memory = FakeMemory()
+        progress = list(account_import.iter_import(db, 2, lines, memory=memory, batch_size=2))
+        final = progress[-1]
+        print(f"Final progress: {final}")
+
+        assert final["done"] and len(progress) > 1, "Progress should be reported per batch"
+        assert final["imported"]["chat_message"] == 5
+        assert final["imported"]["journal"] == 1 and final["imported"]["habit"] == 1
+        assert final["skipped"] == 1 and final["errors"][0]["line"] == len(lines)
+        assert memory.batches == [1], "Journal embeddings should be queued for the consenting user"
+
+        history = crud.get_recent_chat_history(db, 2, limit=10)
+        assert sorted(m["content"] for m in history if m["role"] == "user") == [f"message {i}" for i in range(5)]
+        assert crud.list_chat_sessions(db, 2)[0]["message_count"] == 5
+        stats = crud.get_user_stats(db, 2)
+        assert (stats["total_messages"], stats["journal_count"], stats["habit_count"]) == (5, 1, 1), stats
+        assert emotion_rollups.get_distribution(db, 2, days=1)["emotion_counts"] == {"happy": 1}
+        source = db.query(models.EmotionRecord.source_text).filter(models.EmotionRecord.user_id == 2).scalar()
+        assert source != "message 0" and encryption_utils.decrypt_data(source) == "message 0", "source_text must be stored encrypted"
+
+        imported_habit = crud.list_habits(db, 2)[0]
+        assert crud.get_habit_heatmap(db, 2, 1, 9999)[0]["habit_id"] == imported_habit["id"]
+
+        print("✅ Round trip import test passed!")
+
+    finally:
+        db.close()
+        os.unlink(db_file)
+
+def test_ten_thousand_journals_import_quickly():
+    """Batched encryption and executemany keep a 10k-entry import to seconds."""
+    print("\nTesting 10k journal import...")
+
+    SessionLocal, db_file = create_test_db()
+    db = SessionLocal()
+
+    try:
+        db.add(models.User(id=1, username="testuser", email="test@example.com", hashed_password="dummy"))
+        db.commit()
+
+        lines = (json.dumps({"type": "journal", "content": f"entry {i}", "mood": i % 10}) for i in range(10000))
+        start = time.time()
+        final = list(account_import.iter_import(db, 1, lines))[-1]
+        elapsed = time.time() - start
+        print(f"Imported {final['imported']['journal']} journals in {elapsed:.2f}s")
+
+        assert final["imported"]["journal"] == 10000
+        assert db.query(models.Journal).count() == 10000
+        assert elapsed < 30, f"Import took {elapsed:.1f}s"
+
+        print("✅ 10k import test passed!")
+
+    finally:
+        db.close()
+        os.unlink(db_file)
+
+if __name__ == "__main__":
+    print("🧪 Running account import tests...\n")
+
+    try:
+        test_export_round_trips_into_another_account()
+        test_ten_thousand_journals_import_quickly()
+
+        print("\n🎉 All account import tests passed!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Test script to validate the async engine against a file-backed SQLite database.
+"""
+
+import sys
+import os
+import tempfile
+sys.path.append(os.path.dirname(__file__))
+
+# Must be set before app.database is imported (file URL, not :memory:)
+DB_FILE = tempfile.mktemp(suffix='.db')
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_FILE}"
+
+import asyncio
+from sqlalchemy import text
+
+def test_import_with_file_url():
+    """app.database imports and both engines get a sized queue pool."""
+    print("Testing engine setup with a file URL...")
+
+    from app import database
+
+    print(f"Sync pool: {type(database.engine.pool).__name__}, async pool: {type(database.async_engine.pool).__name__}")
+    assert type(database.async_engine.pool).__name__ == "AsyncAdaptedQueuePool"
+    assert database.async_engine.pool.size() == database.settings.DB_POOL_SIZE
+
+    print("✅ Engine setup test passed!")
+
+def test_async_session_queries():
+    """An async session runs queries with the SQLite pragmas applied."""
+    print("\nTesting async session...")
+
+    from app import database
+
+    async def query():
+        async with database.AsyncSessionLocal() as db:
+            one = (await db.execute(text("SELECT 1"))).scalar()
+            mode = (await db.execute(text("PRAGMA journal_mode"))).scalar()
+        await database.async_engine.dispose()
+        return one, mode
+
+    one, mode = asyncio.run(query())
+    print(f"SELECT 1 -> {one}, journal_mode={mode}")
+    assert one == 1 and mode.lower() == database.settings.SQLITE_JOURNAL_MODE.lower()
+
+    print("✅ Async session test passed!")
+
+if __name__ == "__main__":
+    print("🧪 Running async engine tests...\n")
+
+    try:
+        test_import_with_file_url()
+        test_async_session_queries()
+
+        print("\n🎉 All async engine tests passed!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
+
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(DB_FILE + suffix):
+                os.unlink(DB_FILE + suffix)
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Test script to validate compression of long encrypted fields, with a small benchmark.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(__file__))
+
+import time
+import encryption_utils
+
+JOURNAL = (
+    "Today started slow. I woke up late, skipped breakfast and felt anxious about the "
+    "presentation at work. After lunch I went for a walk by the lake, which helped a lot. "
+    "I noticed I keep worrying about what my manager thinks, even when the feedback is good. "
+    "Tomorrow I want to try the breathing exercise before the meeting and write down three "
+    "things that went well. "
+) * 6
+
+RESPONSE = (
+    "It sounds like the walk really helped you reset. That's worth remembering: when the "
+    "worry builds up, moving your body and getting some fresh air gives your mind room to "
+    "breathe. It's also completely natural to wonder what your manager thinks. Would it help "
+    "to write down the specific feedback you received, so you can look back at it later? "
+) * 4
+
+def test_round_trip():
+    """Short values stay uncompressed, long ones are flagged, both decrypt."""
+    print("Testing compressed round-trip...")
+
+    short = encryption_utils.encrypt_field("Feeling okay today.")
+    assert short[1] == 0
+    assert encryption_utils.decrypt_field(short) == "Feeling okay today."
+
+    for text in (JOURNAL, RESPONSE):
+        blob = encryption_utils.encrypt_field(text)
+        print(f"{len(text.encode())} bytes -> {len(blob)} bytes (flags {blob[1]})")
+        assert blob[1] in (encryption_utils.FLAG_ZLIB, encryption_utils.FLAG_ZSTD)
+        assert len(blob) < len(text.encode())
+        assert encryption_utils.decrypt_field(blob) == text
+
+    noise = os.urandom(2048).hex()[:2048]
+    blob = encryption_utils.encrypt_field(noise)
+    assert encryption_utils.decrypt_field(blob) == noise
+
+    print("✅ Round-trip test passed!")
+
+def test_flags_authenticated():
+    """Clearing the compression flag is detected rather than returning compressed bytes."""
+    print("\nTesting flag tampering...")
+
+    blob = encryption_utils.encrypt_field(JOURNAL)
+    tampered = blob[:1] + b"\x00" + blob[2:]
+    try:
+        encryption_utils.decrypt_field(tampered)
+        raise AssertionError("tampered flags accepted")
+    except ValueError:
+        pass
+
+    print("✅ Flag tampering test passed!")
+
+def _bench(texts, algorithm, min_bytes, rounds=200):
+    encryption_utils.COMPRESS_ALGORITHM = algorithm
+    encryption_utils.COMPRESS_MIN_BYTES = min_bytes
+    start = time.perf_counter()
+    for _ in range(rounds):
+        blobs = encryption_utils.encrypt_many(texts)
+    enc = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(rounds):
+        assert encryption_utils.decrypt_many(blobs) == texts
+    dec = time.perf_counter() - start
+    kb = sum(len(t.encode()) for t in texts) * rounds / 1024
+    return sum(map(len, blobs)), enc / kb * 1e6, dec / kb * 1e6
+
+def test_benchmark():
+    """Stored bytes and cost per KB: none vs zlib vs zstd."""
+    print("\nBenchmarking compression...")
+
+    texts = [JOURNAL, RESPONSE]
+    raw = sum(len(t.encode()) for t in texts)
+    saved = dict(algorithm=encryption_utils.COMPRESS_ALGORITHM, min_bytes=encryption_utils.COMPRESS_MIN_BYTES)
+    candidates = [("none", "zlib", 0), ("zlib", "zlib", 512)]
+    if encryption_utils.ZSTD_AVAILABLE:
+        candidates.append(("zstd", "zstd", 512))
+    try:
+        sizes = {}
+        for label, algorithm, min_bytes in candidates:
+            size, enc_us, dec_us = _bench(texts, algorithm, min_bytes)
+            sizes[label] = size
+            print(f"{label:>5}: {raw} -> {size} bytes, encrypt {enc_us:.1f} µs/KB, decrypt {dec_us:.1f} µs/KB")
+        assert sizes["zlib"] < sizes["none"] // 2
+    finally:
+        encryption_utils.COMPRESS_ALGORITHM = saved["algorithm"]
+        encryption_utils.COMPRESS_MIN_BYTES = saved["min_bytes"]
+
+    print("✅ Benchmark passed!")
+
+if __name__ == "__main__":
+    print("🧪 Running ciphertext compression tests...\n")
+
+    try:
+        test_round_trip()
+        test_flags_authenticated()
+        test_benchmark()
+
+        print("\n🎉 All ciphertext compression tests passed!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Test script to validate the binary ciphertext format and the legacy-row migrator.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(__file__))
+
+import time
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app import models, crud
+from app.cipher_migration import migrate_table
+import encryption_utils
+import tempfile
+
+def create_test_db():
+    """Create a temporary test database."""
+    db_file = tempfile.mktemp(suffix='.db')
+    engine = create_engine(f"sqlite:///{db_file}")
+    Base.metadata.create_all(bind=engine)
+    return engine, db_file
+
+def test_format():
+    """The binary format round-trips, is smaller than legacy, authenticates its header and reads legacy values."""
+    print("Testing field format...")
+
+    text = "I finally finished the essay I was dreading. 🎉"
+    blob = encryption_utils.encrypt_field(text)
+    legacy = encryption_utils.encrypt_data(text).encode("utf-8")
+    print(f"v2: {len(blob)} bytes, legacy: {len(legacy)} bytes")
+    assert blob[0] == encryption_utils.FORMAT_V3 and len(blob) < len(legacy)
+    assert encryption_utils.decrypt_field(blob) == text
+    assert encryption_utils.decrypt_field(legacy) == text
+    assert encryption_utils.decrypt_field(legacy.decode()) == text
+    assert encryption_utils.is_legacy(legacy) and not encryption_utils.is_legacy(blob)
+
+    tampered = blob[:1] + b"\x01" + blob[2:]
+    try:
+        encryption_utils.decrypt_field(tampered)
+        raise AssertionError("tampered header accepted")
+    except ValueError:
+        pass
+
+    blobs = encryption_utils.encrypt_many(["a", None, "c"])
+    assert blobs[1] is None
+    assert encryption_utils.decrypt_many(blobs + [tampered], default="?") == ["a", None, "c", "?"]
+
+    print("✅ Field format test passed!")
+
+def test_batch_decrypt_speed():
+    """Listing 500 journals: decrypt time and storage, legacy vs v2."""
+    print("\nTesting batch decrypt speed...")
+
+    entries = [f"Journal entry {i}: today I walked, read and called my sister. " * 8 for i in range(500)]
+    legacy = [encryption_utils.encrypt_data(e).encode("utf-8") for e in entries]
+    v2 = encryption_utils.encrypt_many(entries)
+
+    start = time.perf_counter()
+    assert encryption_utils.decrypt_many(legacy) == entries
+    legacy_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    assert encryption_utils.decrypt_many(v2) == entries
+    v2_seconds = time.perf_counter() - start
+
+    print(f"500 journals: legacy {legacy_seconds * 1000:.1f} ms, v2 {v2_seconds * 1000:.1f} ms")
+    print(f"Storage: legacy {sum(map(len, legacy))} bytes, v2 {sum(map(len, v2))} bytes")
+    assert sum(map(len, v2)) < sum(map(len, legacy))
+
+    print("✅ Batch decrypt test passed!")
+
+def test_migrator():
+    """Legacy rows are rewritten in batches; v2 rows and undecryptable values are left alone."""
+    print("\nTesting legacy row migrator...")
+
+    engine, db_file = create_test_db()
+    db = sessionmaker(bind=engine)()
+    try:
+        for i in range(7):
+            db.add(models.Journal(user_id=1, content_encrypted=encryption_utils.encrypt_data(f"entry {i}").encode("utf-8")))
+        db.add(models.Journal(user_id=1, content_encrypted=b"not-base64-ciphertext"))
+        db.add(models.Journal(user_id=1, content_encrypted=encryption_utils.encrypt_field("already v2")))
+        db.commit()
+
+        rewritten, failed = migrate_table(engine, "journals", ("content_encrypted",), batch_size=3, pause=0)
+        print(f"Rewritten: {rewritten}, failed: {failed}")
+        assert rewritten == 7 and failed == 1
+
+        blobs = db.execute(select(models.Journal.content_encrypted).order_by(models.Journal.id)).scalars().all()
+        assert sum(not encryption_utils.is_legacy(b) for b in blobs) == 8
+        assert [j["content"] for j in crud.list_journals(db, 1)][:7] == [f"entry {i}" for i in range(7)]
+
+        assert migrate_table(engine, "journals", ("content_encrypted",), batch_size=3, pause=0) == (0, 1)
+
+        print("✅ Migrator test passed!")
+
+    finally:
+        db.close()
+        engine.dispose()
+        os.unlink(db_file)
+
+if __name__ == "__main__":
+    print("🧪 Running ciphertext format tests...\n")
+
+    try:
+        test_format()
+        test_batch_decrypt_speed()
+        test_migrator()
+
+        print("\n🎉 All ciphertext format tests passed!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
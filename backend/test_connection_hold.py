@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Test script to validate per-request database hold-time tracking.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(__file__))
+
+import asyncio
+from app.connection_hold import HoldStats, RequestHold
+
+def test_hold_stats():
+    """Percentiles come from the recent window; the mean covers every request."""
+    print("Testing hold stats...")
+
+    stats = HoldStats(window=10)
+    for ms in range(1, 101):
+        stats.record(ms / 1000.0)
+    result = stats.stats()
+    print(f"Stats: {result}")
+    assert result["requests"] == 100
+    assert result["mean_ms"] == 50.5
+    assert result["max_ms"] == 100.0 and result["p50_ms"] == 96.0
+    assert HoldStats().stats()["p95_ms"] == 0.0
+
+    print("✅ Hold stats test passed!")
+
+def test_request_hold():
+    """Only time inside session scopes counts, not the pacing between them."""
+    print("\nTesting request hold...")
+
+    stats = HoldStats()
+
+    async def stream():
+        hold = RequestHold(stats)
+        async with hold.sessions():
+            await asyncio.sleep(0.02)
+        await asyncio.sleep(0.2)  # token pacing, no session open
+        async with hold.sessions():
+            await asyncio.sleep(0.02)
+        hold.finish()
+        return hold.seconds
+
+    held = asyncio.run(stream())
+    print(f"Held {held * 1000:.1f} ms")
+    assert 0.04 <= held < 0.15
+    assert stats.requests == 1
+
+    print("✅ Request hold test passed!")
+
+if __name__ == "__main__":
+    print("🧪 Running connection hold tests...\n")
+
+    try:
+        test_hold_stats()
+        test_request_hold()
+
+        print("\n🎉 All connection hold tests passed!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Test script to validate daily emotion rollups and their rebuild.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(__file__))
+
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app import models, emotion_rollups
+import tempfile
+
+def create_test_db():
+    """Create a temporary test database."""
+    db_file = tempfile.mktemp(suffix='.db')
+    engine = create_engine(f"sqlite:///{db_file}")
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    return SessionLocal(), db_file
+
+def _record(emotion, intensity, polarity, timestamp):
+    return models.EmotionRecord(
+        user_id=1,
+        primary_emotion=emotion,
+        primary_intensity=intensity,
+        confidence=0.9,
+        sentiment_polarity=polarity,
+        timestamp=timestamp,
+    )
+
+def test_rollups_match_records():
+    """Inserts maintain rollups; period windows and rebuild agree with the raw records."""
+    print("Testing emotion rollups...")
+
+    db, db_file = create_test_db()
+
+    try:
+        db.add(models.User(id=1, username="testuser", email="test@example.com", hashed_password="dummy"))
+        db.commit()
+
+        now = datetime.utcnow()
+        samples = [
+            ("happy", "high", 0.8, now),
+            ("happy", "high", 0.6, now),
+            ("sad", "low", -0.4, now - timedelta(days=2)),
+            ("stressed", "medium", None, now - timedelta(days=20)),
+        ]
+        for sample in samples:
+            emotion_rollups.add_emotion_record(db, _record(*sample))
+        db.commit()
+
+        assert db.query(models.EmotionDailyRollup).count() == 3, "Same day/emotion/intensity should share a row"
+
+        day = emotion_rollups.get_distribution(db, 1, days=1, now=now)
+        assert day["emotion_counts"] == {"happy": 2}, day
+        assert day["mean_polarity"] == 0.7
+
+        week = emotion_rollups.get_distribution(db, 1, days=7, now=now)
+        assert week["emotion_counts"] == {"happy": 2, "sad": 1}, week
+
+        month = emotion_rollups.get_distribution(db, 1, days=30, now=now)
+        print(f"Month distribution: {month}")
+        assert month["total"] == 4
+        assert month["intensity_counts"]["stressed"] == {"medium": 1}
+        assert month["mean_polarity"] == round((0.8 + 0.6 - 0.4) / 3, 3), "NULL polarity must not count"
+
+        # Raw inserts that bypassed the rollups are picked up by a rebuild
+        db.add(_record("anxious", "high", 0.0, now))
+        db.commit()
+        emotion_rollups.rebuild(db, user_id=1)
+        db.commit()
+        rebuilt = emotion_rollups.get_distribution(db, 1, days=30, now=now)
+        assert rebuilt["emotion_counts"] == {"happy": 2, "sad": 1, "stressed": 1, "anxious": 1}, rebuilt
+
+        print("✅ Emotion rollup test passed!")
+
+    finally:
+        db.close()
+        os.unlink(db_file)
+
+def test_windows_are_rolling():
+    """days=N covers the last N * 24 hours, including the tail of the first calendar day."""
+    print("\nTesting rolling windows...")
+
+    db, db_file = create_test_db()
+
+    try:
+        now = datetime(2025, 3, 10, 9, 0)
+        for sample in (
+            ("happy", "high", 0.5, now - timedelta(hours=1)),
+            ("calm", "low", None, now - timedelta(hours=20)),      # yesterday, inside the last 24 h
+            ("sad", "low", -0.5, now - timedelta(hours=25)),       # yesterday, outside it
+            ("calm", "low", None, now - timedelta(days=6, hours=23)),
+            ("tired", "low", None, now - timedelta(days=7, hours=1)),
+        ):
+            emotion_rollups.add_emotion_record(db, _record(*sample))
+        db.commit()
+
+        day = emotion_rollups.get_distribution(db, 1, days=1, now=now)
+        assert day["emotion_counts"] == {"happy": 1, "calm": 1}, day
+        week = emotion_rollups.get_distribution(db, 1, days=7, now=now)
+        assert week["emotion_counts"] == {"happy": 1, "calm": 2, "sad": 1}, week
+        assert week["intensity_counts"]["calm"] == {"low": 2}
+
+        print("✅ Rolling window test passed!")
+
+    finally:
+        db.close()
+        os.unlink(db_file)
+
+if __name__ == "__main__":
+    print("🧪 Running emotion rollup tests...\n")
+
+    try:
+        test_rollups_match_records()
+        test_windows_are_rolling()
+
+        print("\n🎉 All emotion rollup tests passed!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Test script to validate habit completion bitmaps, streaks and the heatmap data.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(__file__))
+
+from datetime import date, datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app import models, crud, schemas, habit_log
+import tempfile
+
+def create_test_db():
+    """Create a temporary test database."""
+    db_file = tempfile.mktemp(suffix='.db')
+    engine = create_engine(f"sqlite:///{db_file}")
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    return SessionLocal(), db_file
+
+def test_bitmap_streaks_across_years():
+    """Streaks and rates span the year boundary."""
+    print("Testing bitmap streak math...")
+
+    years = {}
+    run = [date(2024, 12, 28) + timedelta(days=i) for i in range(6)]  # Dec 28 .. Jan 2
+    for day in run + [date(2024, 6, 1)]:
+        years[day.year] = habit_log.set_day(years.get(day.year), day)
+
+    assert len(years[2024]) == habit_log.YEAR_BYTES
+    assert habit_log.year_days(years[2025]) == [1, 2]
+
+    summary = habit_log.summarize(years, date(2025, 1, 3))
+    print(f"Summary: {summary}")
+    assert summary["current_streak"] == 6, "Open day should not break the streak"
+    assert summary["longest_streak"] == 6
+    assert summary["total_completions"] == 7
+    assert summary["rate_7d"] == 85.7
+
+    assert habit_log.summarize(years, date(2025, 1, 4))["current_streak"] == 0
+
+    print("✅ Bitmap streak math test passed!")
+
+def test_completion_updates_bitmap_and_heatmap():
+    """complete_habit sets today's bit; insights and the heatmap read the bitmap."""
+    print("\nTesting completion bitmap storage...")
+
+    db, db_file = create_test_db()
+
+    try:
+        db.add(models.User(id=1, username="testuser", email="test@example.com", hashed_password="dummy"))
+        db.commit()
+
+        habit = crud.create_habit(db, user_id=1, habit=schemas.HabitCreate(title="Read", frequency="daily"))
+        crud.complete_habit(db, user_id=1, habit_id=habit['id'])
+        crud.complete_habit(db, user_id=1, habit_id=habit['id'])  # same day, no-op
+
+        today = datetime.now().date()
+        heatmap = crud.get_habit_heatmap(db, 1, today.year, today.year)
+        assert heatmap == [{"habit_id": habit['id'], "years": {str(today.year): [habit_log.day_index(today) + 1]}}], heatmap
+
+        insights = crud.get_habit_insights(db, user_id=1)
+        entry = insights["completion_data"][0]
+        assert entry["completion_rate"] == round(1 / 7 * 100, 1), entry
+        assert entry["longest_streak"] == 1
+
+        assert crud.delete_habit(db, user_id=1, habit_id=habit['id'])
+        assert db.query(models.HabitCompletionYear).count() == 0, "Deleting a habit should drop its bitmaps"
+
+        print("✅ Completion bitmap storage test passed!")
+
+    finally:
+        db.close()
+        os.unlink(db_file)
+
+if __name__ == "__main__":
+    print("🧪 Running habit log tests...\n")
+
+    try:
+        test_bitmap_streaks_across_years()
+        test_completion_updates_bitmap_and_heatmap()
+
+        print("\n🎉 All habit log tests passed!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
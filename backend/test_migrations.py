@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Test script to validate the versioned schema migration runner.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(__file__))
+
+from datetime import datetime
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.orm import sessionmaker
+from app import models, search_index
+from app.migrations import run_migrations, run_backfills, pending_backfills, get_schema_version, LATEST_VERSION
+import encryption_utils
+import tempfile
+
+def test_fresh_database_reaches_latest():
+    """A new database is created and stamped with the latest version."""
+    print("Testing migrations on a fresh database...")
+
+    db_file = tempfile.mktemp(suffix='.db')
+    engine = create_engine(f"sqlite:///{db_file}")
+
+    try:
+        assert run_migrations(engine) == LATEST_VERSION
+        with engine.connect() as conn:
+            assert get_schema_version(conn) == LATEST_VERSION
+
+        indexes = {ix["name"] for ix in inspect(engine).get_indexes("emotion_records")}
+        assert "idx_emotion_records_user_timestamp" in indexes, f"Missing composite index: {indexes}"
+
+        print("✅ Fresh database migration test passed!")
+
+    finally:
+        engine.dispose()
+        os.unlink(db_file)
+
+def test_current_schema_costs_one_select():
+    """Once current, startup issues a single SELECT and no DDL/introspection."""
+    print("\nTesting migration fast path...")
+
+    db_file = tempfile.mktemp(suffix='.db')
+    engine = create_engine(f"sqlite:///{db_file}")
+
+    try:
+        run_migrations(engine)
+
+        statements = []
+        event.listen(engine, "before_cursor_execute", lambda conn, cursor, stmt, *args: statements.append(stmt))
+        run_migrations(engine)
+
+        print(f"Statements on warm start: {statements}")
+        assert statements == ["SELECT version FROM schema_version"], statements
+
+        print("✅ Migration fast path test passed!")
+
+    finally:
+        engine.dispose()
+        os.unlink(db_file)
+
+def test_backfills_run_after_migrations():
+    """Migrations only queue history backfills; run_backfills fills the tables and dequeues them."""
+    print("\nTesting queued backfills...")
+
+    db_file = tempfile.mktemp(suffix='.db')
+    engine = create_engine(f"sqlite:///{db_file}")
+
+    try:
+        run_migrations(engine)
+        with engine.connect() as conn:
+            assert pending_backfills(conn) == ["archive_postings", "chat_sessions", "emotion_rollups",
+                                               "habit_completions", "search_postings", "user_stats"]
+
+        # History written without maintaining the derived tables.
+        db = sessionmaker(bind=engine)()
+        db.add(models.User(id=1, username="user1", email="u1@example.com", hashed_password="dummy"))
+        db.add(models.Journal(user_id=1, content_encrypted=encryption_utils.encrypt_field("exam stress")))
+        db.add(models.EmotionRecord(user_id=1, primary_emotion="anxious", primary_intensity="high",
+                                    confidence=0.9, timestamp=datetime.utcnow()))
+        db.commit()
+
+        report = run_backfills(engine)
+        print(f"Backfill report: {report}")
+        assert report == {"archive_postings": 0, "chat_sessions": 0, "emotion_rollups": 1,
+                          "habit_completions": 0, "search_postings": 1, "user_stats": 1}
+        assert db.query(models.EmotionDailyRollup).count() == 1
+        assert db.get(models.UserStats, 1).journal_count == 1
+        assert [r["type"] for r in search_index.search(db, 1, "exam")] == ["journal"]
+        with engine.connect() as conn:
+            assert pending_backfills(conn) == []
+        assert run_backfills(engine) == {}
+        db.close()
+
+        print("✅ Backfill test passed!")
+
+    finally:
+        engine.dispose()
+        os.unlink(db_file)
+
+if __name__ == "__main__":
+    print("🧪 Running migration tests...\n")
+
+    try:
+        test_fresh_database_reaches_latest()
+        test_current_schema_costs_one_select()
+        test_backfills_run_after_migrations()
+
+        print("\n🎉 All migration tests passed!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
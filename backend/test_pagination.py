@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Test script to validate keyset (cursor) pagination for journals and habits.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(__file__))
+
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app import models, crud, schemas, pagination
+import tempfile
+
+def create_test_db():
+    """Create a temporary test database."""
+    db_file = tempfile.mktemp(suffix='.db')
+    engine = create_engine(f"sqlite:///{db_file}")
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    return SessionLocal(), db_file
+
+def _walk_pages(fetch, limit):
+    """Follow cursors until the last page, returning all ids in page order."""
+    seen = []
+    cursor = None
+    while True:
+        items = fetch(limit, cursor)
+        seen.extend(item["id"] for item in items)
+        cursor = pagination.next_cursor(items, limit, "created_at")
+        if not cursor:
+            return seen
+
+def test_journal_keyset_pages():
+    """Pages cover every journal exactly once, newest first, including timestamp ties."""
+    print("Testing journal keyset pagination...")
+
+    db, db_file = create_test_db()
+
+    try:
+        db.add(models.User(id=1, username="testuser", email="test@example.com", hashed_password="dummy"))
+        db.commit()
+
+        base = datetime(2024, 1, 1, 12, 0, 0)
+        for i in range(23):
+            journal = crud.create_journal(db, user_id=1, journal=schemas.JournalCreate(content=f"entry {i}", mood=5))
+            # Several entries share a timestamp (one without microseconds, like CURRENT_TIMESTAMP)
+            journal.created_at = base + timedelta(minutes=i // 3)
+        db.commit()
+
+        ids = _walk_pages(lambda limit, cursor: crud.list_journals(db, 1, limit=limit, cursor=cursor), 5)
+        print(f"Walked {len(ids)} journals")
+        assert len(ids) == 23, f"Expected 23 journals, got {len(ids)}"
+        assert len(set(ids)) == 23, "Pages must not repeat rows"
+
+        expected = [
+            j.id for j in db.query(models.Journal).order_by(
+                models.Journal.created_at.desc(), models.Journal.id.desc()
+            )
+        ]
+        assert ids == expected, "Pages must follow (created_at, id) descending order"
+
+        print("✅ Journal keyset pagination test passed!")
+
+    finally:
+        db.close()
+        os.unlink(db_file)
+
+def test_habit_pages_and_bad_cursor():
+    """Habits page the same way, and malformed cursors are rejected."""
+    print("\nTesting habit keyset pagination...")
+
+    db, db_file = create_test_db()
+
+    try:
+        db.add(models.User(id=1, username="testuser", email="test@example.com", hashed_password="dummy"))
+        db.commit()
+
+        for i in range(7):
+            crud.create_habit(db, user_id=1, habit=schemas.HabitCreate(title=f"Habit {i}", frequency="daily"))
+
+        ids = _walk_pages(lambda limit, cursor: crud.list_habits(db, 1, limit=limit, cursor=cursor), 3)
+        assert sorted(ids) == sorted(h["id"] for h in crud.list_habits(db, 1)), "Pages must cover every habit"
+
+        try:
+            crud.list_habits(db, 1, limit=3, cursor="not-a-cursor")
+            assert False, "Expected ValueError for malformed cursor"
+        except ValueError:
+            pass
+
+        print("✅ Habit keyset pagination test passed!")
+
+    finally:
+        db.close()
+        os.unlink(db_file)
+
+if __name__ == "__main__":
+    print("🧪 Running pagination tests...\n")
+
+    try:
+        test_journal_keyset_pages()
+        test_habit_pages_and_bad_cursor()
+
+        print("\n🎉 All pagination tests passed!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
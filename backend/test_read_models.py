@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Test script to validate the column-projected read models on the chat hot path.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(__file__))
+
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app import models, crud, read_models
+import tempfile
+
+def create_test_db():
+    """Create a temporary test database."""
+    db_file = tempfile.mktemp(suffix='.db')
+    engine = create_engine(f"sqlite:///{db_file}")
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    return SessionLocal, db_file
+
+def test_shapes_without_hydration():
+    """Hot reads return the usual dicts and leave nothing in the identity map."""
+    print("Testing read models...")
+
+    SessionLocal, db_file = create_test_db()
+    db = SessionLocal()
+
+    try:
+        for i in range(3):
+            crud.create_chat_message(db, 1, f"question {i}", f"answer {i}", "mentor", "s1")
+        crud.create_chat_message(db, 1, "other session", "ok", "mentor", "s2")
+        start = datetime(2026, 1, 1)
+        for i, emotion in enumerate(["joy", "sadness", "stress"]):
+            db.add(models.EmotionRecord(
+                user_id=1, primary_emotion=emotion, primary_intensity="medium", confidence=0.8,
+                source_text="x" * 5000, timestamp=start + timedelta(hours=i),
+            ))
+        crud.store_milestone(db, 1, {"type": "insight", "recognition": "You named it.", "source_snippet": "I get it now"})
+        db.commit()
+        db.expunge_all()
+
+        history = crud.get_recent_chat_history(db, 1, limit=2, session_id="s1")
+        assert [m["content"] for m in history] == ["question 1", "answer 1", "question 2", "answer 2"]
+        assert set(history[0]) == {"role", "content", "timestamp", "session_id"}
+
+        emotions = crud.get_recent_emotions(db, 1, limit=2)
+        assert [e["emotion"] for e in emotions] == ["stress", "sadness"]
+        assert set(emotions[0]) == {"emotion", "intensity", "timestamp"}
+
+        milestones = crud.get_user_milestones(db, 1)
+        assert milestones[0]["type"] == "insight" and milestones[0]["recognition"] == "You named it."
+
+        assert db.execute(read_models.last_emotion_stmt(1)).scalar() == "stress"
+        assert len(db.identity_map) == 0, "read models must not hydrate ORM objects"
+
+        print("✅ Read model test passed!")
+
+    finally:
+        db.close()
+        os.unlink(db_file)
+
+if __name__ == "__main__":
+    print("🧪 Running read model tests...\n")
+
+    try:
+        test_shapes_without_hydration()
+
+        print("\n🎉 All read model tests passed!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
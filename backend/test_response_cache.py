@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Test script to validate the two-tier (LRU + table) response cache.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(__file__))
+
+import asyncio
+import time
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app import models, crud
+from app.response_cache import LRUCache, ResponseCache
+import tempfile
+
+def create_test_db():
+    """Create a temporary test database."""
+    db_file = tempfile.mktemp(suffix='.db')
+    engine = create_engine(f"sqlite:///{db_file}")
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    return SessionLocal, db_file
+
+def test_lru_bounds_and_counters():
+    """The LRU evicts least-recently-used entries and expires stale ones."""
+    print("Testing LRU size and TTL bounds...")
+
+    lru = LRUCache(max_entries=2, ttl_seconds=0.05)
+    lru.put(("a", "mentor"), "A")
+    lru.put(("b", "mentor"), "B")
+    assert lru.get(("a", "mentor")) == "A"  # "a" is now most recent
+    lru.put(("c", "mentor"), "C")           # evicts "b"
+    assert lru.get(("b", "mentor")) is None
+    assert lru.evictions == 1 and lru.hits == 1 and lru.misses == 1
+
+    time.sleep(0.06)
+    assert lru.get(("a", "mentor")) is None and lru.expirations == 1
+    print("✅ LRU bounds test passed!")
+
+def test_write_behind_and_table_eviction():
+    """Writes reach the table only on flush; the table is trimmed to max_rows."""
+    print("\nTesting write-behind flush and table eviction...")
+
+    SessionLocal, db_file = create_test_db()
+    db = SessionLocal()
+
+    try:
+        cache = ResponseCache(max_entries=100, ttl_seconds=60, max_rows=3)
+        for i in range(5):
+            cache.put(f"question {i}", "mentor", f"answer {i}")
+        assert db.query(models.ResponseCache).count() == 0, "put() must not touch the table"
+        assert cache.get(db, "question 4", "mentor") == "answer 4"
+
+        assert cache.flush(db) == 5
+        assert db.query(models.ResponseCache).count() == 3
+        stats = cache.stats()
+        print(f"Stats after flush: {stats}")
+        assert stats["rows_written"] == 5 and stats["rows_evicted"] == 2 and stats["pending_writes"] == 0
+
+        # Re-flushing an existing key updates in place rather than duplicating.
+        cache.put("question 4", "mentor", "answer 4b")
+        cache.flush(db)
+        assert crud.get_cached_response(db, "question 4", "mentor") == "answer 4b"
+        assert db.query(models.ResponseCache).count() == 3
+
+        # With a slack margin the table is only trimmed once enough rows accumulate.
+        slack = ResponseCache(max_entries=100, ttl_seconds=60, max_rows=3, trim_slack=3)
+        slack.put("question 5", "mentor", "answer 5")
+        slack.flush(db)  # first flush always trims
+        assert db.query(models.ResponseCache).count() == 3
+        for i in (6, 7):
+            slack.put(f"question {i}", "mentor", f"answer {i}")
+            slack.flush(db)
+        assert db.query(models.ResponseCache).count() == 5 and slack.rows_evicted == 1
+        slack.put("question 8", "mentor", "answer 8")
+        slack.flush(db)
+        assert db.query(models.ResponseCache).count() == 3 and slack.rows_evicted == 4
+
+        # A cold LRU falls back to the table once, then serves from memory.
+        cold = ResponseCache(max_entries=100, ttl_seconds=60, max_rows=3)
+        assert cold.get(db, "question 8", "mentor") == "answer 8"
+        assert cold.get(db, "question 8", "mentor") == "answer 8"
+        assert cold.get(db, "missing", "mentor") is None
+        assert (cold.db_hits, cold.db_misses, cold.lru.hits) == (1, 1, 1)
+
+        # aget() falls back to the table through an AsyncSession.
+        async def async_lookups():
+            async_engine = create_async_engine(f"sqlite+aiosqlite:///{db_file}")
+            try:
+                async with AsyncSession(async_engine) as adb:
+                    warm = ResponseCache(max_entries=100, ttl_seconds=60, max_rows=3)
+                    return [await warm.aget(adb, "question 8", "mentor"),
+                            await warm.aget(adb, "missing", "mentor"),
+                            await warm.aget(None, "question 8", "mentor"), warm.db_hits]
+            finally:
+                await async_engine.dispose()
+
+        assert asyncio.run(async_lookups()) == ["answer 8", None, "answer 8", 1]
+
+        print("✅ Write-behind test passed!")
+
+    finally:
+        db.close()
+        os.unlink(db_file)
+
+if __name__ == "__main__":
+    print("🧪 Running response cache tests...\n")
+
+    try:
+        test_lru_bounds_and_counters()
+        test_write_behind_and_table_eviction()
+
+        print("\n🎉 All response cache tests passed!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Test script to validate retention purges and incremental vacuum.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(__file__))
+
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from app.database import Base, apply_sqlite_pragmas
+from app import models, crud, retention
+import tempfile
+
+def create_test_engine():
+    """Create a temporary test database with the app's SQLite profile."""
+    db_file = tempfile.mktemp(suffix='.db')
+    engine = create_engine(f"sqlite:///{db_file}")
+    event.listen(engine, "connect", apply_sqlite_pragmas)
+    Base.metadata.create_all(bind=engine)
+    return engine, db_file
+
+def test_purge_respects_per_user_retention():
+    """Old messages go per the user's window; sessions, stats and other tables follow."""
+    print("Testing retention purge...")
+
+    engine, db_file = create_test_engine()
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+
+    try:
+        db.add(models.User(id=1, username="short", email="a@example.com", hashed_password="dummy"))
+        db.add(models.User(id=2, username="forever", email="b@example.com", hashed_password="dummy"))
+        db.add(models.UserSettings(user_id=1, chat_history_retention_days=7))
+        db.add(models.UserSettings(user_id=2, chat_history_retention_days=0))
+        db.commit()
+
+        now = datetime.utcnow()
+        for user_id in (1, 2):
+            for age in (30, 20, 1):
+                msg = crud.create_chat_message(db, user_id, "hello", "hi", "default", session_id=f"s{age}")
+                msg.created_at = now - timedelta(days=age)
+            db.commit()
+
+        db.add(models.EmotionInsight(user_id=1, insight_text="old", generated_at=now - timedelta(days=365)))
+        db.add(models.EmotionInsight(user_id=1, insight_text="new", generated_at=now))
+        db.commit()
+
+        report = retention.purge_expired(db, now=now)
+        print(f"Purge report: {report}")
+        assert report["chat_messages"] == 2, "Only user 1's two old messages should go"
+        assert report["emotion_insights"] == 1
+
+        assert [s["id"] for s in crud.list_chat_sessions(db, 1)] == ["s1"], "Emptied sessions should be removed"
+        assert len(crud.list_chat_sessions(db, 2)) == 3, "retention_days=0 keeps history"
+        assert crud.get_user_stats(db, 1)["total_messages"] == 1
+        assert crud.get_user_stats(db, 2)["total_messages"] == 3
+
+        print("✅ Retention purge test passed!")
+
+    finally:
+        db.close()
+        engine.dispose()
+        os.unlink(db_file)
+
+def test_incremental_vacuum_reclaims_pages():
+    """Freed pages are handed back to the filesystem."""
+    print("\nTesting incremental vacuum...")
+
+    engine, db_file = create_test_engine()
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+
+    try:
+        db.add(models.User(id=1, username="testuser", email="test@example.com", hashed_password="dummy"))
+        db.commit()
+        for i in range(400):
+            db.add(models.ResponseCache(question_key=f"q{i}", personality="default", response_encrypted=os.urandom(2048)))
+        db.commit()
+        crud._chunked_delete(db, models.ResponseCache, models.ResponseCache.id > 0)
+
+        reclaimed = retention.incremental_vacuum(engine)
+        print(f"Reclaimed {reclaimed} bytes")
+        assert reclaimed > 400 * 2048 // 2, f"Expected most of the deleted payload back, got {reclaimed}"
+
+        print("✅ Incremental vacuum test passed!")
+
+    finally:
+        db.close()
+        engine.dispose()
+        os.unlink(db_file)
+
+if __name__ == "__main__":
+    print("🧪 Running retention tests...\n")
+
+    try:
+        test_purge_respects_per_user_retention()
+        test_incremental_vacuum_reclaims_pages()
+
+        print("\n🎉 All retention tests passed!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Test script to validate the blind-token search index over chats and journals.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(__file__))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app import models, crud, schemas, search_index
+import encryption_utils
+import tempfile
+
+def create_test_db():
+    """Create a temporary test database."""
+    db_file = tempfile.mktemp(suffix='.db')
+    engine = create_engine(f"sqlite:///{db_file}")
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    return SessionLocal, db_file
+
+def test_search_ranks_and_snippets():
+    """Writes maintain postings; search ranks by the query's own terms and stays per-user."""
+    print("Testing search ranking...")
+
+    SessionLocal, db_file = create_test_db()
+    db = SessionLocal()
+
+    try:
+        crud.create_chat_message(db, 1, "I'm so stressed about my exams", "Let's plan your revision.", "mentor", "s1")
+        crud.create_chat_message(db, 1, "The exam is tomorrow and I'm stressed, really stressed", "Sleep first.", "mentor", "s1")
+        crud.create_chat_message(db, 1, "Went for a run today", "Nice!", "mentor", "s2")
+        crud.create_journal(db, 1, schemas.JournalCreate(content="Exam week. Grateful for friends.", mood=6))
+        crud.create_chat_message(db, 2, "stressed about exams", "Breathe.", "mentor", "x")
+
+        # No plaintext terms are stored, only keyed tokens.
+        tokens = {p.token for p in db.query(models.SearchPosting).all()}
+        assert encryption_utils.blind_token("exam") in tokens and b"exam" not in tokens
+
+        results = search_index.search(db, 1, "stressed exam")
+        print(f"Results: {[(r['type'], r['id'], r['score']) for r in results]}")
+        assert [r["type"] for r in results] == ["chat", "chat", "journal"]
+        assert "stressed" in results[0]["snippet"] and results[0]["session_id"] == "s1"
+        assert all(r["id"] != 5 for r in results), "other users' documents never match"
+
+        assert [r["type"] for r in search_index.search(db, 1, "exams", doc_type="journal")] == ["journal"]
+        assert search_index.search(db, 1, "the and of") == []
+
+        # Over-common terms are scored only on what rarer terms matched, else newest first.
+        cap = search_index.MAX_POSTINGS_PER_TERM
+        search_index.MAX_POSTINGS_PER_TERM = 1
+        try:
+            assert [r["id"] for r in search_index.search(db, 1, "stressed tomorrow")] == [2]
+            assert [r["id"] for r in search_index.search(db, 1, "stressed")] == [2]
+        finally:
+            search_index.MAX_POSTINGS_PER_TERM = cap
+        print("✅ Ranking test passed!")
+
+    finally:
+        db.close()
+        os.unlink(db_file)
+
+def test_deletes_and_backfill():
+    """Deleting chats drops their postings; index_missing rebuilds what is absent."""
+    print("\nTesting posting cleanup and backfill...")
+
+    SessionLocal, db_file = create_test_db()
+    db = SessionLocal()
+
+    try:
+        crud.create_chat_message(db, 1, "lonely evening", "I'm here.", "mentor", "s1")
+        crud.create_chat_message(db, 1, "lonely morning", "Want to talk?", "mentor", "s2")
+
+        crud.delete_chat_session(db, 1, "s1")
+        assert [r["snippet"] for r in search_index.search(db, 1, "lonely")] == ["lonely morning\nWant to talk?"]
+
+        db.query(models.SearchPosting).delete()
+        db.commit()
+        assert search_index.search(db, 1, "lonely") == []
+        assert search_index.index_missing(db) == 1
+        db.commit()
+        assert search_index.index_missing(db) == 0
+        assert len(search_index.search(db, 1, "lonely")) == 1
+
+        crud.delete_all_user_data(db, 1)
+        assert db.query(models.SearchPosting).count() == 0
+        print("✅ Cleanup test passed!")
+
+    finally:
+        db.close()
+        os.unlink(db_file)
+
+if __name__ == "__main__":
+    print("🧪 Running search index tests...\n")
+
+    try:
+        test_search_ranks_and_snippets()
+        test_deletes_and_backfill()
+
+        print("\n🎉 All search index tests passed!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
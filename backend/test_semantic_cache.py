@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Test script to validate the semantic (embedding similarity) response cache.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(__file__))
+
+from app.semantic_cache import SemanticCache
+
+def test_threshold_and_personality_scope():
+    """Near-duplicate questions hit; dissimilar ones and other personalities miss."""
+    print("Testing semantic lookup threshold...")
+
+    cache = SemanticCache(max_entries=4, threshold=0.9)
+    cache.put("mentor", "im so stressed about exams", [1.0, 0.0, 0.0], "Breathe first.")
+
+    response, score = cache.get("mentor", [0.95, 0.1, 0.0])
+    assert response == "Breathe first." and score > 0.9
+    assert cache.get("mentor", [0.0, 1.0, 0.0]) is None
+    assert cache.get("friend", [1.0, 0.0, 0.0]) is None
+    assert cache.get("mentor", [0.0, 0.0, 0.0]) is None, "zero vectors never match"
+
+    stats = cache.stats()
+    print(f"Stats: {stats}")
+    assert (stats["hits"], stats["misses"]) == (1, 2)
+    assert stats["best_score_histogram"]["0.95"] == 1
+    assert stats["best_score_histogram"]["<0.50"] == 1
+    print("✅ Threshold test passed!")
+
+def test_lru_eviction():
+    """A full index evicts the least recently used question."""
+    print("\nTesting semantic LRU eviction...")
+
+    cache = SemanticCache(max_entries=2, threshold=0.99)
+    cache.put("mentor", "a", [1.0, 0.0, 0.0], "A")
+    cache.put("mentor", "b", [0.0, 1.0, 0.0], "B")
+    assert cache.get("mentor", [1.0, 0.0, 0.0])[0] == "A"  # "a" is now most recent
+    cache.put("mentor", "c", [0.0, 0.0, 1.0], "C")         # evicts "b"
+
+    assert cache.get("mentor", [0.0, 1.0, 0.0]) is None
+    assert cache.get("mentor", [0.0, 0.0, 1.0])[0] == "C"
+    assert cache.evictions == 1 and cache.stats()["entries"] == {"mentor": 2}
+
+    # Re-putting an existing question replaces it in place.
+    cache.put("mentor", "c", [0.0, 0.0, 1.0], "C2")
+    assert cache.get("mentor", [0.0, 0.0, 1.0])[0] == "C2" and cache.evictions == 1
+    print("✅ Eviction test passed!")
+
+if __name__ == "__main__":
+    print("🧪 Running semantic cache tests...\n")
+
+    try:
+        test_threshold_and_personality_scope()
+        test_lru_eviction()
+
+        print("\n🎉 All semantic cache tests passed!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
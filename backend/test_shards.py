@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Test script to validate per-tenant SQLite sharding.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(__file__))
+
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.orm import sessionmaker
+from app.config import settings
+from app.database import Base, apply_sqlite_pragmas
+from app import models, crud, shards
+import tempfile
+
+def create_test_engine():
+    """Create a temporary catalog database with the app's SQLite profile."""
+    db_file = tempfile.mktemp(suffix='.db')
+    engine = create_engine(f"sqlite:///{db_file}", connect_args={"check_same_thread": False})
+    event.listen(engine, "connect", apply_sqlite_pragmas)
+    Base.metadata.create_all(bind=engine)
+    return engine, db_file
+
+def enable_sharding(count=4, max_open=8):
+    settings.SHARD_COUNT = count
+    shards.router = shards.ShardRouter(tempfile.mkdtemp(), max_open)
+    return shards.router
+
+def add_users(engine, n):
+    db = sessionmaker(bind=engine)()
+    try:
+        for i in range(1, n + 1):
+            db.add(models.User(id=i, username=f"user{i}", email=f"user{i}@example.com", hashed_password="x"))
+        db.commit()
+    finally:
+        db.close()
+
+def test_routing():
+    """Scoped writes land in the user's shard; catalog rows stay in the main file."""
+    print("Testing shard routing...")
+
+    engine, db_file = create_test_engine()
+    router = enable_sharding()
+    add_users(engine, 3)
+    factory = sessionmaker(bind=engine, autoflush=False, class_=shards.RoutedSession)
+    try:
+        db = factory()
+        try:
+            for user_id in (1, 2, 5):  # 1 and 5 share shard 1
+                shards.scope(db, user_id)
+                crud.add_chat_message(db, user_id, f"hello from {user_id}", "hi", "mentor", "s1")
+                db.commit()
+            assert db.query(models.User).count() == 3  # catalog, no scope needed
+
+            shards.scope(db, 1)
+            assert db.query(models.ChatMessage).count() == 2  # users 1 and 5
+            assert crud.get_user_stats(db, 1)["total_messages"] == 1
+            shards.scope(db, 2)
+            assert db.query(models.ChatMessage).count() == 1
+        finally:
+            db.close()
+
+        with engine.connect() as conn:
+            assert conn.execute(select(models.ChatMessage.id)).first() is None
+        # WAL mode leaves -wal/-shm sidecars next to each shard file
+        assert sorted(f for f in os.listdir(router.directory) if f.endswith(".db")) == ["shard_001.db", "shard_002.db"]
+
+        totals = crud.get_admin_totals(factory())
+        print(f"Totals: {totals}")
+        assert totals["total_users"] == 3 and totals["total_messages"] == 3
+
+        print("✅ Routing test passed!")
+
+    finally:
+        settings.SHARD_COUNT = 0
+        engine.dispose()
+        os.unlink(db_file)
+
+def test_scope_errors():
+    """Unscoped or cross-database statements are refused rather than misrouted."""
+    print("\nTesting scope errors...")
+
+    engine, db_file = create_test_engine()
+    enable_sharding()
+    factory = sessionmaker(bind=engine, class_=shards.RoutedSession)
+    try:
+        db = factory()
+        try:
+            for attempt in (
+                lambda: db.query(models.ChatMessage).count(),
+                lambda: (shards.scope(db, 1), db.query(models.ChatMessage).join(models.User).count()),
+            ):
+                try:
+                    attempt()
+                    raise AssertionError("expected ShardScopeError")
+                except shards.ShardScopeError as e:
+                    print(f"Refused: {e}")
+
+            # The request-wide user applies when the session has no scope of its own.
+            shards.scope(db, None)
+            shards.set_current_user(2)
+            assert db.query(models.ChatMessage).count() == 0
+        finally:
+            shards.set_current_user(None)
+            db.close()
+
+        print("✅ Scope error test passed!")
+
+    finally:
+        settings.SHARD_COUNT = 0
+        engine.dispose()
+        os.unlink(db_file)
+
+def test_lru_cap():
+    """At most SHARD_MAX_OPEN shard engines stay open."""
+    print("\nTesting open-shard LRU...")
+
+    router = enable_sharding(count=8, max_open=2)
+    try:
+        for user_id in (1, 2, 1, 3):
+            router.sync_engine(user_id)
+        stats = router.stats()
+        print(f"Stats: {stats}")
+        assert stats["open"] == 2 and stats["evicted"] == 1
+        assert list(router._engines) == [1, 3]  # 2 was least recently used
+
+        print("✅ LRU test passed!")
+
+    finally:
+        settings.SHARD_COUNT = 0
+
+def test_migrate():
+    """Existing rows move into shard files by bucket; reruns copy nothing twice."""
+    print("\nTesting migration...")
+
+    engine, db_file = create_test_engine()
+    router = enable_sharding(count=2)
+    add_users(engine, 4)
+    try:
+        db = sessionmaker(bind=engine)()
+        try:
+            for user_id in range(1, 5):
+                for i in range(3):
+                    crud.add_chat_message(db, user_id, f"m{i}", f"r{i}", "mentor", "s1")
+            db.commit()
+        finally:
+            db.close()
+
+        report = shards.migrate(engine, batch_size=5)
+        print(f"Report: {report}")
+        assert report["chat_messages"] == 12 and report["user_stats"] == 4
+        shards.migrate(engine, batch_size=5)  # idempotent
+
+        for shard in (0, 1):
+            with router.engines(shard)[0].connect() as conn:
+                user_ids = conn.execute(select(models.ChatMessage.user_id)).scalars().all()
+            assert len(user_ids) == 6 and {u % 2 for u in user_ids} == {shard}
+
+        shards.migrate(engine, purge=True)
+        with engine.connect() as conn:
+            assert conn.execute(select(models.ChatMessage.id)).first() is None
+
+        print("✅ Migration test passed!")
+
+    finally:
+        settings.SHARD_COUNT = 0
+        engine.dispose()
+        os.unlink(db_file)
+
+if __name__ == "__main__":
+    print("🧪 Running shard tests...\n")
+
+    try:
+        test_routing()
+        test_scope_errors()
+        test_lru_cap()
+        test_migrate()
+
+        print("\n🎉 All shard tests passed!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
@@ -213,6 +213,51 @@ def test_duplicate_completion_prevention():
         db.close()
         os.unlink(db_file)
 
+def test_lapsed_streak_read_without_writes():
+    """Listing reports a lapsed streak as 0 without writing; the next completion resets it."""
+    print("\nTesting read-only streak evaluation...")
+    
+    db, db_file = create_test_db()
+    
+    try:
+        db.add(models.User(id=1, username="testuser", email="test@example.com", hashed_password="dummy"))
+        db.commit()
+        
+        lapsed = crud.create_habit(db, user_id=1, habit=schemas.HabitCreate(title="Stretch", frequency="daily"))
+        other = crud.create_habit(db, user_id=1, habit=schemas.HabitCreate(title="Water", frequency="daily"))
+        habit_obj = db.query(models.Habit).filter(models.Habit.id == lapsed['id']).first()
+        habit_obj.streak_count = 5
+        habit_obj.last_completed = datetime.now() - timedelta(days=3)
+        db.commit()
+        
+        listed = {h['id']: h for h in crud.list_habits(db, user_id=1)}
+        assert listed[lapsed['id']]['streak_count'] == 0, "Lapsed streak should read as 0"
+        assert not db.dirty and not db.new, "Listing habits must not modify the session"
+        db.expire_all()
+        stored = db.query(models.Habit).filter(models.Habit.id == lapsed['id']).first()
+        assert stored.streak_count == 5, "Listing habits must not write"
+        
+        crud._streak_swept_users.discard(1)
+        crud.complete_habit(db, user_id=1, habit_id=other['id'])
+        db.expire_all()
+        stored = db.query(models.Habit).filter(models.Habit.id == lapsed['id']).first()
+        assert stored.streak_count == 0, "Completion should reset other lapsed streaks"
+        
+        # Only a committed sweep is remembered, and only for the current day.
+        crud._streak_swept_users.discard(1)
+        crud.reset_broken_streaks(db, 1)
+        db.rollback()
+        assert 1 not in crud._streak_swept_users, "An uncommitted sweep must not suppress the retry"
+        crud.mark_streaks_swept(1, datetime.now().date())
+        crud.mark_streaks_swept(2, (datetime.now() + timedelta(days=1)).date())
+        assert crud._streak_swept_users == {2}, "Date rollover should drop the previous day's users"
+        
+        print("✅ Read-only streak evaluation test passed!")
+        
+    finally:
+        db.close()
+        os.unlink(db_file)
+
 if __name__ == "__main__":
     print("🧪 Running streak calculation tests...\n")
     
@@ -221,6 +266,7 @@ if __name__ == "__main__":
         test_weekly_habit_streak()
         test_monthly_habit_streak()
         test_duplicate_completion_prevention()
+        test_lapsed_streak_read_without_writes()
         
         print("\n🎉 All streak calculation tests passed!")
         
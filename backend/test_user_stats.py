@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Test script to validate the incrementally maintained user_stats counters.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(__file__))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app import models, crud, schemas
+import tempfile
+
+def create_test_db():
+    """Create a temporary test database."""
+    db_file = tempfile.mktemp(suffix='.db')
+    engine = create_engine(f"sqlite:///{db_file}")
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    return SessionLocal(), db_file
+
+def test_counters_follow_writes():
+    """Creates and deletes keep user_stats in step with the source tables."""
+    print("Testing user_stats counters...")
+
+    db, db_file = create_test_db()
+
+    try:
+        db.add(models.User(id=1, username="testuser", email="test@example.com", hashed_password="dummy"))
+        db.commit()
+
+        for _ in range(3):
+            crud.create_chat_message(db, 1, "hello", "hi there", "default", session_id="s1")
+        crud.create_chat_message(db, 1, "no session", "ok", "default")
+        crud.create_journal(db, user_id=1, journal=schemas.JournalCreate(content="entry", mood=5))
+        habit = crud.create_habit(db, user_id=1, habit=schemas.HabitCreate(title="Walk", frequency="daily"))
+        crud.store_milestone(db, 1, {"type": "growth", "recognition": "nice", "source_snippet": "..."})
+
+        stats = crud.get_user_stats(db, 1)
+        print(f"Stats after writes: {stats}")
+        assert stats["total_messages"] == 4
+        assert stats["journal_count"] == 1
+        assert stats["habit_count"] == 1
+        assert stats["milestone_count"] == 1
+        assert stats["first_chat_at"] is not None
+
+        crud.delete_chat_session(db, 1, "s1")
+        crud.delete_habit(db, 1, habit["id"])
+        stats = crud.get_user_stats(db, 1)
+        assert stats["total_messages"] == 1, f"Expected 1 message left, got {stats['total_messages']}"
+        assert stats["habit_count"] == 0
+
+        crud.delete_all_chats(db, 1)
+        assert crud.get_user_chat_stats(db, 1) == {"total_messages": 0, "first_chat_at": None}
+
+        print("✅ user_stats counter test passed!")
+
+    finally:
+        db.close()
+        os.unlink(db_file)
+
+if __name__ == "__main__":
+    print("🧪 Running user_stats tests...\n")
+
+    try:
+        test_counters_follow_writes()
+
+        print("\n🎉 All user_stats tests passed!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Test script to validate the single-writer group-commit queue.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(__file__))
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from app.database import Base, apply_sqlite_pragmas
+from app import models, crud
+from app.write_queue import WriteQueue
+import tempfile
+
+def create_test_engine():
+    """Create a temporary test database with the app's SQLite profile."""
+    db_file = tempfile.mktemp(suffix='.db')
+    engine = create_engine(f"sqlite:///{db_file}", connect_args={"check_same_thread": False})
+    event.listen(engine, "connect", apply_sqlite_pragmas)
+    Base.metadata.create_all(bind=engine)
+    return engine, db_file
+
+def test_group_commit():
+    """Concurrent writes share transactions and callers get refreshed rows back."""
+    print("Testing group commit...")
+
+    engine, db_file = create_test_engine()
+    factory = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    writer = WriteQueue(session_factory=factory, batch_ms=50, max_batch=100)
+    writer.start()
+
+    try:
+        def turn(i):
+            return writer.submit(
+                crud.add_chat_message, 1, f"message {i}", f"reply {i}", "mentor", "s1"
+            ).result(timeout=10)
+
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            messages = list(pool.map(turn, range(40)))
+
+        assert len({m.id for m in messages}) == 40
+        assert all(m.created_at is not None for m in messages)
+        stats = writer.stats()
+        print(f"Stats: {stats}")
+        assert stats["ops_committed"] == 40 and stats["batches"] < 40
+
+        db = factory()
+        try:
+            assert db.query(models.ChatMessage).count() == 40
+            assert db.query(models.ChatSession).one().message_count == 40
+            assert crud.get_user_stats(db, 1)["total_messages"] == 40
+        finally:
+            db.close()
+
+        print("✅ Group commit test passed!")
+
+    finally:
+        writer.stop()
+        engine.dispose()
+        os.unlink(db_file)
+
+def test_failing_op_is_isolated():
+    """A failing op only fails its own future; the rest of its batch commits."""
+    print("\nTesting failure isolation...")
+
+    engine, db_file = create_test_engine()
+    factory = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    writer = WriteQueue(session_factory=factory, batch_ms=200, max_batch=100)
+    writer.start()
+
+    def broken(db):
+        db.add(models.GrowthMilestone(user_id=1, milestone_type=None))  # NOT NULL violation
+        return None
+
+    try:
+        ok_before = writer.submit(crud.add_milestone, 1, {"type": "growth", "source_snippet": "a"})
+        bad = writer.submit(broken)
+        ok_after = writer.submit(crud.add_milestone, 1, {"type": "growth", "source_snippet": "b"})
+
+        assert ok_before.result(timeout=10).id and ok_after.result(timeout=10).id
+        assert bad.exception(timeout=10) is not None
+        stats = writer.stats()
+        assert stats["ops_failed"] == 1 and stats["batch_fallbacks"] == 1
+
+        db = factory()
+        try:
+            assert db.query(models.GrowthMilestone).count() == 2
+        finally:
+            db.close()
+
+        print("✅ Failure isolation test passed!")
+
+    finally:
+        writer.stop()
+        engine.dispose()
+        os.unlink(db_file)
+
+def test_inline_when_stopped():
+    """Without a running writer, ops run inline in their own transaction."""
+    print("\nTesting inline fallback...")
+
+    engine, db_file = create_test_engine()
+    factory = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    writer = WriteQueue(session_factory=factory)
+
+    try:
+        future = writer.submit(crud.add_chat_message, 1, "hi", "hello", "mentor")
+        assert future.done() and future.result().id
+
+        # Submitted from the event loop, the commit runs off the loop thread.
+        commit_threads = []
+        event.listen(engine, "commit", lambda conn: commit_threads.append(threading.get_ident()))
+
+        async def from_loop():
+            loop_thread = threading.get_ident()
+            future = writer.submit(crud.add_chat_message, 1, "async hi", "hello", "mentor")
+            message = await asyncio.wrap_future(future)
+            return loop_thread, message
+
+        loop_thread, message = asyncio.run(from_loop())
+        assert message.id and commit_threads and loop_thread not in commit_threads
+        print("✅ Inline fallback test passed!")
+
+    finally:
+        engine.dispose()
+        os.unlink(db_file)
+
+if __name__ == "__main__":
+    print("🧪 Running write queue tests...\n")
+
+    try:
+        test_group_commit()
+        test_failing_op_is_isolated()
+        test_inline_when_stopped()
+
+        print("\n🎉 All write queue tests passed!")
+
+    except Exception as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
@@ -36,6 +36,21 @@ class LongTermMemory:
         )
         return unique_id
     
+    def add_memories(self, texts: List[str], metadatas: List[dict]) -> List[str]:
+        """Batch form of add_memory: one encryption pass and one collection.add
+        (so one embedding call) for the whole list."""
+        import uuid
+
+        now = str(datetime.datetime.now())
+        ids = [str(uuid.uuid4()) for _ in texts]
+        metadatas = [{**(meta or {}), "encrypted": True, "timestamp": now} for meta in metadatas]
+        self.collection.add(
+            documents=[encryption_utils.encrypt_data(text) for text in texts],
+            metadatas=metadatas,
+            ids=ids,
+        )
+        return ids
+
     def retrieve_memories(
         self,
         query_text: str,
@@ -79,6 +94,22 @@ class LongTermMemory:
         }
         return self.add_memory(content, metadata)
 
+    def store_memories_with_category(
+        self,
+        user_id,
+        contents: List[str],
+        memory_type: str = "conversation",
+        memory_category: str = "conversation",
+    ) -> List[str]:
+        """Batch form of store_memory_with_category."""
+        metadata = {
+            "user_id": str(user_id),
+            "type": memory_type,
+            "category": memory_category,
+            "timestamp": str(datetime.datetime.now()),
+        }
+        return self.add_memories(contents, [dict(metadata) for _ in contents])
+
     def retrieve_memory(
         self,
         query_text: str,
@@ -125,6 +156,33 @@ class LongTermMemory:
         self.collection.delete(ids=[memory_id])
 
 
+def reencrypt_documents(rekey, offset: int, limit: int,
+                        collection_name="mymitra_memory", persist_directory="./chroma_db"):
+    """
+    Key rotation: pass one page of stored documents through ``rekey`` and
+    write back those it returns a new ciphertext for (None = unchanged).
+    Embeddings are passed through, so nothing is re-embedded.
+    Returns (documents read, documents rewritten).
+    """
+    client = chromadb.PersistentClient(path=persist_directory)
+    try:
+        collection = client.get_collection(name=collection_name)
+    except Exception:
+        return 0, 0  # no memories stored yet
+
+    page = collection.get(offset=offset, limit=limit, include=["documents", "embeddings"])
+    ids, documents, embeddings = [], [], []
+    for doc_id, doc, embedding in zip(page["ids"], page["documents"], page["embeddings"]):
+        new_doc = rekey(doc)
+        if new_doc is not None:
+            ids.append(doc_id)
+            documents.append(new_doc)
+            embeddings.append(embedding)
+    if ids:
+        collection.update(ids=ids, documents=documents, embeddings=embeddings)
+    return len(page["ids"]), len(ids)
+
+
 def retrieve_memories(user_id: str, query: str, top_k: int = 4):
     """
     Retrieves memories for a user based on a query.